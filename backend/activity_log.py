@@ -0,0 +1,319 @@
+"""
+Daily activity log and bitmap-based streaks.
+
+Every lesson completion adds to the user's (user_id, day) row in
+daily_activity. For streaks and heatmaps a user's history is loaded once
+into an integer bitmap (bit i = start day + i) and cached; streaks are then
+run-lengths over the bitmap.
+
+This log is the one source of streaks: update-streak, the activity
+calendar, /api/progress/stats and the bulk recompute all go through
+user_streaks(), which bridges gaps with the user's streak freezes. Reads
+only preview that; update-streak spends the freezes (spend_streak_freezes),
+logging each bridged day as an empty active day so it stays bridged.
+
+Usage (bulk streak recompute, e.g. after a streak bug):
+    python activity_log.py --chunk-size 1000
+"""
+
+import argparse
+import base64
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import bindparam, case, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import DailyActivity, UserGamification
+
+# Seconds before a cached bitmap is reloaded. Marks are per process, so this
+# bounds staleness across gunicorn workers.
+ACTIVITY_CACHE_TTL = int(os.getenv("ACTIVITY_CACHE_TTL", "300"))
+ACTIVITY_CACHE_MAX_USERS = int(os.getenv("ACTIVITY_CACHE_MAX_USERS", "10000"))
+
+
+class ActivityBitmap:
+    """A user's active days as an int: bit i is set if start + i days was active"""
+
+    def __init__(self, start: Optional[date] = None, bits: int = 0):
+        self.start = start
+        self.bits = bits
+
+    @classmethod
+    def from_days(cls, days: List[date]) -> "ActivityBitmap":
+        if not days:
+            return cls()
+        start = min(days)
+        bits = 0
+        for day in days:
+            bits |= 1 << (day - start).days
+        return cls(start, bits)
+
+    def mark(self, day: date):
+        if self.start is None:
+            self.start = day
+        elif day < self.start:
+            self.bits <<= (self.start - day).days
+            self.start = day
+        self.bits |= 1 << (day - self.start).days
+
+    def window(self, first: date, last: date) -> bytes:
+        """Days first..last as bytes, least-significant bit first within each byte"""
+        length = (last - first).days + 1
+        if self.start is None or length <= 0:
+            return bytes((max(length, 0) + 7) // 8)
+        offset = (first - self.start).days
+        bits = self.bits >> offset if offset >= 0 else self.bits << -offset
+        bits &= (1 << length) - 1
+        return bits.to_bytes((length + 7) // 8, "little")
+
+
+def run_lengths(bits: int) -> Iterator[int]:
+    """Lengths of the runs of consecutive set bits, lowest first"""
+    while bits:
+        bits >>= (bits & -bits).bit_length() - 1  # Drop trailing zeros
+        run = (~bits & (bits + 1)).bit_length() - 1  # Count trailing ones
+        yield run
+        bits >>= run
+
+
+def bridged_streak(bitmap: ActivityBitmap, today: date, freezes: int = 0) -> Tuple[int, List[date]]:
+    """Days in the streak ending today (or yesterday, if today is not done
+    yet), and the missed days in it.
+
+    Up to `freezes` missed days can be bridged, including the run of missed
+    days up to yesterday; bridged days count towards the streak.
+    """
+    if bitmap.start is None or today < bitmap.start:
+        return 0, []
+    last = (today - bitmap.start).days
+    bits = bitmap.bits & ((1 << (last + 1)) - 1)
+    if not (bits >> last) & 1:
+        last -= 1  # Today is not done yet: the streak ends yesterday
+
+    missed = []
+    end = last  # Covered down to here; `end` itself may be missed
+    while True:
+        # Latest active day at or before `end`, and the missed days after it
+        previous = (bits & ((1 << (end + 1)) - 1)).bit_length() - 1
+        gap = end - previous
+        if previous < 0 or gap > freezes:
+            low = end + 1
+            break
+        freezes -= gap
+        missed.extend(range(previous + 1, end + 1))
+        # Lowest position of the run of ones ending at `previous`
+        low = (~bits & ((1 << (previous + 1)) - 1)).bit_length()
+        if low == 0:
+            break
+        end = low - 1
+
+    return last + 1 - low, [bitmap.start + timedelta(days=day) for day in sorted(missed)]
+
+
+def current_streak(bitmap: ActivityBitmap, today: date, freezes: int = 0) -> int:
+    return bridged_streak(bitmap, today, freezes)[0]
+
+
+def longest_streak(bitmap: ActivityBitmap) -> int:
+    return max(run_lengths(bitmap.bits), default=0)
+
+
+def user_streaks(bitmap: ActivityBitmap, today: date, freezes: int = 0) -> Tuple[int, int]:
+    """(current, longest) streak; the current one may bridge gaps with freezes"""
+    current = current_streak(bitmap, today, freezes)
+    return current, max(longest_streak(bitmap), current)
+
+
+def load_bitmap(db: Session, user_id: int) -> ActivityBitmap:
+    """A user's bitmap straight from daily_activity (one range scan)"""
+    return ActivityBitmap.from_days(list(db.scalars(
+        select(DailyActivity.day).where(DailyActivity.user_id == user_id)
+    )))
+
+
+def streak_freezes(db: Session, user_id: int) -> int:
+    return db.scalar(
+        select(UserGamification.streak_freeze_count).where(UserGamification.user_id == user_id)
+    ) or 0
+
+
+def spend_streak_freezes(db: Session, user_id: int, bitmap: ActivityBitmap, today: date, freezes: int) -> List[date]:
+    """Bridge the missed days in the streak ending today for good.
+
+    Each is logged as an empty active day and marked in bitmap, so the streak
+    no longer needs the freezes. Returns those days; the caller deducts one
+    freeze per day before the commit.
+    """
+    days = bridged_streak(bitmap, today, freezes)[1]
+    for day in days:
+        log_activity(db, user_id, xp=0, lessons=0, day=day)
+        bitmap.mark(day)
+    return days
+
+
+class ActivityBitmapCache:
+    """Per-process LRU of user bitmaps, loaded with one range query per user"""
+
+    def __init__(self, ttl: int = ACTIVITY_CACHE_TTL, max_users: int = ACTIVITY_CACHE_MAX_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._entries: "OrderedDict[int, Tuple[float, ActivityBitmap]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, user_id: int) -> ActivityBitmap:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        bitmap = load_bitmap(db, user_id)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, bitmap)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return bitmap
+
+    def mark(self, user_id: int, day: date):
+        """Record a committed activity in the cached bitmap, if loaded"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry[1].mark(day)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+def log_activity(db: Session, user_id: int, xp: int, lessons: int = 1, day: Optional[date] = None):
+    """Add to the user's row for `day` (UTC today by default). Call before the commit."""
+    day = day or datetime.utcnow().date()
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        raise RuntimeError(f"Activity logging is not supported on {dialect}")
+
+    stmt = insert(DailyActivity).values(user_id=user_id, day=day, xp=xp, lessons=lessons)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["user_id", "day"],
+        set_={
+            "xp": DailyActivity.xp + stmt.excluded.xp,
+            "lessons": DailyActivity.lessons + stmt.excluded.lessons,
+        },
+    ))
+
+
+def activity_calendar(db: Session, user_id: int, first: date, last: date) -> List[DailyActivity]:
+    """Active days in [first, last], one primary-key range scan"""
+    return list(db.scalars(
+        select(DailyActivity)
+        .where(DailyActivity.user_id == user_id, DailyActivity.day.between(first, last))
+        .order_by(DailyActivity.day)
+    ))
+
+
+def heatmap_bitset(bitmap: ActivityBitmap, first: date, last: date) -> str:
+    return base64.b64encode(bitmap.window(first, last)).decode("ascii")
+
+
+def recompute_streaks(db: Session, chunk_size: int = 1000, today: Optional[date] = None) -> int:
+    """Recompute user_gamification streaks from the activity log.
+
+    Users are processed in user_id order, chunk_size users per query and
+    transaction; each user's streaks come from user_streaks() with their
+    streak freezes. Longest streaks never decrease, since the log may not
+    cover older history.
+    Returns the number of users updated.
+    """
+    today = today or datetime.utcnow().date()
+    updated = 0
+    last_user_id = 0
+
+    while True:
+        user_ids = list(db.scalars(
+            select(DailyActivity.user_id)
+            .where(DailyActivity.user_id > last_user_id)
+            .group_by(DailyActivity.user_id)
+            .order_by(DailyActivity.user_id)
+            .limit(chunk_size)
+        ))
+        if not user_ids:
+            break
+        last_user_id = user_ids[-1]
+
+        days: Dict[int, List[date]] = {user_id: [] for user_id in user_ids}
+        for user_id, day in db.execute(
+            select(DailyActivity.user_id, DailyActivity.day)
+            .where(DailyActivity.user_id >= user_ids[0], DailyActivity.user_id <= last_user_id)
+        ):
+            days[user_id].append(day)
+        freezes = dict(db.execute(
+            select(UserGamification.user_id, UserGamification.streak_freeze_count)
+            .where(UserGamification.user_id >= user_ids[0], UserGamification.user_id <= last_user_id)
+        ).all())
+
+        rows = []
+        for user_id, user_days in days.items():
+            current, longest = user_streaks(ActivityBitmap.from_days(user_days), today, freezes.get(user_id) or 0)
+            rows.append({
+                "uid": user_id,
+                "current_streak": current,
+                "longest_streak": longest,
+                "last_activity_date": datetime.combine(max(user_days), datetime.min.time()),
+            })
+
+        table = UserGamification.__table__
+        db.execute(
+            update(table)
+            .where(table.c.user_id == bindparam("uid"))
+            .values(
+                current_streak=bindparam("current_streak"),
+                longest_streak=case(
+                    (table.c.longest_streak > bindparam("longest_streak"), table.c.longest_streak),
+                    else_=bindparam("longest_streak"),
+                ),
+                last_activity_date=bindparam("last_activity_date"),
+            ),
+            rows,
+        )
+        db.commit()
+        updated += len(rows)
+
+    return updated
+
+
+# Global instance
+activity_bitmaps = ActivityBitmapCache()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute streaks from the daily activity log")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Users per transaction")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        count = recompute_streaks(db, args.chunk_size)
+        print(f"Recomputed streaks for {count} users")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
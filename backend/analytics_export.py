@@ -0,0 +1,209 @@
+"""
+Analytics export: dump the user, progress, gamification, activity and lesson
+tables to columnar files, then compute per-lesson completion and funnel
+aggregates from those files.
+
+Tables are read with server-side cursors (yield_per) and written one record
+batch per chunk, so memory stays flat regardless of table size. Point
+ANALYTICS_DATABASE_URL (or --database-url) at a replica or snapshot to keep
+the load off the live API database. Requires pyarrow (pip install pyarrow).
+
+Usage:
+    python analytics_export.py --out analytics/2024-06-01
+    python analytics_export.py --format arrow --chunk-size 50000
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, create_engine, select
+from sqlalchemy.orm import Session
+
+from models import DailyActivity, Lesson, User, UserGamification, UserProgress
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # Only needed by this job, not by the API
+    pa = None
+
+ANALYTICS_DATABASE_URL = os.getenv("ANALYTICS_DATABASE_URL")
+DEFAULT_CHUNK_SIZE = 10000
+
+# Exported columns per table; credentials, emails and code blobs stay behind
+EXPORT_TABLES = {
+    "users": [User.id, User.created_at, User.is_active],
+    "user_progress": [
+        UserProgress.user_id, UserProgress.lesson_id, UserProgress.completed,
+        UserProgress.attempts, UserProgress.completed_at, UserProgress.updated_at,
+    ],
+    "user_gamification": [
+        UserGamification.user_id, UserGamification.current_streak, UserGamification.longest_streak,
+        UserGamification.total_xp, UserGamification.current_level, UserGamification.last_activity_date,
+    ],
+    "daily_activity": [DailyActivity.user_id, DailyActivity.day, DailyActivity.xp, DailyActivity.lessons],
+    "lessons": [Lesson.id, Lesson.track_id, Lesson.order_in_track, Lesson.title, Lesson.resource_profile],
+}
+
+
+def arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column.type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def open_writer(path: Path, schema, file_format: str):
+    if file_format == "parquet":
+        return pq.ParquetWriter(path, schema, compression="zstd")
+    return pa.ipc.new_file(path, schema)
+
+
+def read_table(path: Path, file_format: str):
+    if file_format == "parquet":
+        return pq.read_table(path)
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def export_table(
+    db: Session,
+    name: str,
+    columns: list,
+    out_dir: Path,
+    file_format: str = "parquet",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, int]:
+    """Stream one table to <out_dir>/<name>.<format>, one record batch per chunk"""
+    schema = pa.schema([pa.field(column.key, arrow_type(column)) for column in columns])
+    path = out_dir / f"{name}.{file_format}"
+    rows = 0
+
+    result = db.execute(select(*columns).execution_options(yield_per=chunk_size))
+    with open_writer(path, schema, file_format) as writer:
+        for partition in result.partitions():
+            # Transpose the chunk's rows into columns
+            arrays = [
+                pa.array(values, type=field.type)
+                for values, field in zip(zip(*partition), schema)
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            rows += len(partition)
+
+    return {"rows": rows, "bytes": path.stat().st_size}
+
+
+def lesson_funnel(progress, lessons):
+    """Per-lesson starts, completions, completion rate and mean attempts, plus
+    each lesson's share of its track's first-lesson learners (the funnel)."""
+    per_lesson = progress.group_by("lesson_id").aggregate([
+        ("user_id", "count"),
+        ("completed", "sum"),
+        ("attempts", "mean"),
+    ]).rename_columns(["lesson_id", "started", "completed", "mean_attempts"])
+
+    funnel = lessons.rename_columns(["lesson_id", "track_id", "order_in_track", "title", "resource_profile"])
+    funnel = funnel.join(per_lesson, "lesson_id", join_type="left outer")
+    funnel = funnel.set_column(
+        funnel.schema.get_field_index("started"), "started",
+        pc.fill_null(funnel["started"], 0),
+    )
+    funnel = funnel.set_column(
+        funnel.schema.get_field_index("completed"), "completed",
+        pc.fill_null(pc.cast(funnel["completed"], pa.int64()), 0),
+    )
+    funnel = funnel.sort_by([("track_id", "ascending"), ("order_in_track", "ascending")])
+
+    started = funnel["started"]
+    completed = funnel["completed"]
+    funnel = funnel.append_column(
+        "completion_rate", pc.if_else(pc.equal(started, 0), 0.0, pc.divide(pc.cast(completed, pa.float64()), started))
+    )
+
+    # Learners starting each track = starts on its first lesson
+    first_lessons = funnel.group_by("track_id").aggregate([("order_in_track", "min")])
+    entry = funnel.join(
+        first_lessons.rename_columns(["track_id", "order_in_track"]),
+        ["track_id", "order_in_track"],
+        join_type="inner",
+    ).select(["track_id", "started"]).rename_columns(["track_id", "track_starts"])
+    funnel = funnel.join(entry, "track_id", join_type="left outer").sort_by(
+        [("track_id", "ascending"), ("order_in_track", "ascending")]
+    )
+    track_starts = funnel["track_starts"]
+    return funnel.append_column(
+        "reached_share",
+        pc.if_else(
+            pc.fill_null(pc.equal(track_starts, 0), True),
+            0.0,
+            pc.divide(pc.cast(funnel["started"], pa.float64()), track_starts),
+        ),
+    )
+
+
+def run_export(
+    db: Session,
+    out_dir: Path,
+    file_format: str = "parquet",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    tables: Optional[List[str]] = None,
+) -> Dict[str, Dict[str, int]]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    report = {}
+    for name in tables or EXPORT_TABLES:
+        started = time.perf_counter()
+        report[name] = export_table(db, name, EXPORT_TABLES[name], out_dir, file_format, chunk_size)
+        report[name]["seconds"] = round(time.perf_counter() - started, 3)
+        print(f"  {name}: {report[name]['rows']} rows, {report[name]['bytes']} bytes, {report[name]['seconds']}s")
+
+    if "user_progress" in report and "lessons" in report:
+        funnel = lesson_funnel(
+            read_table(out_dir / f"user_progress.{file_format}", file_format),
+            read_table(out_dir / f"lessons.{file_format}", file_format),
+        )
+        path = out_dir / f"lesson_funnel.{file_format}"
+        with open_writer(path, funnel.schema, file_format) as writer:
+            writer.write_table(funnel)
+        report["lesson_funnel"] = {"rows": funnel.num_rows, "bytes": path.stat().st_size}
+        print(f"  lesson_funnel: {funnel.num_rows} rows")
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export analytics tables to Parquet/Arrow")
+    parser.add_argument("--out", default="analytics", help="Output directory")
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per server-side fetch")
+    parser.add_argument("--tables", nargs="+", choices=list(EXPORT_TABLES), help="Subset of tables")
+    parser.add_argument("--database-url", default=ANALYTICS_DATABASE_URL,
+                        help="Replica/snapshot to read from (defaults to DATABASE_URL)")
+    args = parser.parse_args()
+
+    if pa is None:
+        raise SystemExit("analytics_export requires pyarrow: pip install pyarrow")
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from database import engine
+
+    print(f"Exporting to {args.out} ({args.format})")
+    with Session(engine) as db:
+        run_export(db, Path(args.out), args.format, args.chunk_size, args.tables)
+
+
+if __name__ == "__main__":
+    main()
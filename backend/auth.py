@@ -6,7 +6,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from models import User
-from database import get_db
+from database import get_db, get_read_db, SessionLocal
 
 # Security configuration
 SECRET_KEY = "your-secret-key-change-this-in-production"
@@ -46,25 +46,43 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
         return None
     return user
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+def _token_username(credentials: HTTPAuthorizationCredentials) -> str:
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
-    
+        raise _credentials_exception()
+    return username
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    user = get_user_by_username(db, _token_username(credentials))
+    if user is None:
+        raise _credentials_exception()
+    return user
+
+def get_current_user_read(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_read_db)
+) -> User:
+    """get_current_user for read-only endpoints, looked up on their read session"""
+    username = _token_username(credentials)
     user = get_user_by_username(db, username)
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        # Registered moments ago and not yet on the replica
+        with SessionLocal() as primary:
+            user = get_user_by_username(primary, username)
+    if user is None:
+        raise _credentials_exception()
+    return user
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for DockerExecutor phases.
+
+Times each phase of execute_python_code separately (base/dependency images,
+Dockerfile rendering, build context, image build, container start, output
+capture, container and image removal) across cold, warm and cached-image
+scenarios and several requirement sets.
+
+Runs against the local Docker daemon when one is reachable, otherwise against
+an in-process stub client that only measures executor overhead.
+
+Usage:
+    python bench_docker_executor.py                 # auto-detect docker
+    python bench_docker_executor.py --stub          # force the stub client
+    python bench_docker_executor.py --repeat 5 --json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import docker
+
+from docker_executor import DockerExecutor, RESOURCE_PROFILES
+
+BENCH_CODE = "total = sum(i * i for i in range(10000))\nprint(total)\n"
+
+REQUIREMENT_SETS = {
+    "none": [],
+    "light": ["requests"],
+    "data": ["numpy", "pandas"],
+}
+
+# Matches the system-package layer emitted by _create_base_dockerfile
+APT_LAYER = re.compile(r"RUN apt-get update.*?rm -rf /var/lib/apt/lists/\*\n", re.S)
+
+
+class _StubImage:
+    def __init__(self, tag):
+        self.id = f"sha256:{tag}"
+
+
+class _StubImages:
+    def __init__(self):
+        self.tags = set()
+
+    def build(self, path, tag, **kwargs):
+        self.tags.add(tag)
+        return None, []
+
+    def get(self, tag):
+        if tag not in self.tags:
+            raise docker.errors.ImageNotFound(tag)
+        return _StubImage(tag)
+
+    def remove(self, image, force=False):
+        self.tags.discard(image)
+
+
+class _StubContainer:
+    def put_archive(self, path, data):
+        return True
+
+    def attach(self, **kwargs):
+        return iter([(b"333283335000\n", None)])
+
+    def start(self):
+        return None
+
+    def stats(self, **kwargs):
+        return iter([])
+
+    def wait(self, timeout=None):
+        return {"StatusCode": 0}
+
+    def kill(self):
+        return None
+
+    def remove(self, force=False):
+        return None
+
+
+class _StubContainers:
+    def create(self, image, command=None, **kwargs):
+        return _StubContainer()
+
+
+class StubDockerClient:
+    """Minimal docker client stand-in so phases can be timed without a daemon"""
+
+    def __init__(self):
+        self.images = _StubImages()
+        self.containers = _StubContainers()
+
+    def ping(self):
+        return True
+
+
+@contextmanager
+def timed(timings: Dict[str, List[float]], phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.setdefault(phase, []).append(time.perf_counter() - start)
+
+
+def run_once(
+    executor: DockerExecutor,
+    timings: Dict[str, List[float]],
+    requirements: list,
+    image_tag: Optional[str] = None,
+    nocache: bool = False,
+    keep_image: bool = False,
+) -> str:
+    """Run one submission through every executor phase, recording timings.
+
+    When image_tag is given and already built, the build phases are skipped
+    (cached-image scenario). nocache rebuilds the shared base and dependency
+    images from scratch (cold scenario).
+    """
+    tag = image_tag or f"pylingo-exec-{os.urandom(8).hex()}"
+
+    if image_tag is None:
+        if nocache:
+            with timed(timings, "base_image"):
+                executor._ensure_base_image(nocache=True)
+
+        with timed(timings, "deps_image"):
+            parent_image = executor._ensure_deps_image(requirements, nocache=nocache)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+
+            with timed(timings, "render_dockerfile"):
+                executor._create_dockerfile(parent_image)
+
+            with timed(timings, "write_context"):
+                executor._write_build_context(temp_path, BENCH_CODE, parent_image)
+
+            with timed(timings, "build"):
+                executor._build_image(temp_path, tag)
+
+    with timed(timings, "start"):
+        container, stream = executor._run_container(tag, RESOURCE_PROFILES["standard"], requirements)
+
+    with timed(timings, "capture"):
+        executor._capture_output(container, stream)
+        container.wait(timeout=30)
+
+    with timed(timings, "remove_container"):
+        executor._remove_container(container)
+
+    if not keep_image:
+        with timed(timings, "remove_image"):
+            executor._remove_image(tag)
+
+    return tag
+
+
+def build_base_layer(executor: DockerExecutor, timings: Dict[str, List[float]], strip_apt: bool):
+    """Cold-build the base image under a throwaway tag, optionally without the apt-get layer"""
+    tag = f"pylingo-bench-base-{os.urandom(8).hex()}"
+    dockerfile_content = executor._create_base_dockerfile()
+    if strip_apt:
+        dockerfile_content = APT_LAYER.sub("", dockerfile_content)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        (temp_path / "Dockerfile").write_text(dockerfile_content)
+        with timed(timings, "build"):
+            executor._build_image(temp_path, tag, nocache=True)
+
+    executor._remove_image(tag)
+
+
+def summarize(timings: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for phase, samples in timings.items():
+        summary[phase] = {
+            "n": len(samples),
+            "mean_ms": statistics.mean(samples) * 1000,
+            "min_ms": min(samples) * 1000,
+            "max_ms": max(samples) * 1000,
+        }
+    return summary
+
+
+def run_scenarios(executor: DockerExecutor, repeat: int) -> Dict[str, Dict]:
+    results = {}
+
+    for req_name, requirements in REQUIREMENT_SETS.items():
+        # Cold: base and dependency images rebuilt without layer cache
+        timings: Dict[str, List[float]] = {}
+        for _ in range(repeat):
+            run_once(executor, timings, requirements, nocache=True)
+        results[f"cold/{req_name}"] = summarize(timings)
+
+        # Warm: shared base/dependency images exist, only the code layer is built
+        timings = {}
+        run_once(executor, {}, requirements)  # prime the shared images
+        for _ in range(repeat):
+            run_once(executor, timings, requirements)
+        results[f"warm/{req_name}"] = summarize(timings)
+
+        # Cached image: build once, then only start/capture
+        timings = {}
+        tag = run_once(executor, {}, requirements, keep_image=True)
+        try:
+            for _ in range(repeat):
+                run_once(executor, timings, requirements, image_tag=tag, keep_image=True)
+        finally:
+            executor._remove_image(tag)
+        results[f"cached/{req_name}"] = summarize(timings)
+
+    # Cost of the apt-get layer: cold base-image builds with and without it
+    for label, strip_apt in (("with_apt", False), ("without_apt", True)):
+        timings = {}
+        for _ in range(repeat):
+            build_base_layer(executor, timings, strip_apt)
+        results[f"apt_layer/{label}"] = summarize(timings)
+
+    return results
+
+
+def make_executor(force_stub: bool) -> DockerExecutor:
+    if not force_stub:
+        try:
+            client = docker.from_env()
+            client.ping()
+            return DockerExecutor(client=client)
+        except Exception as e:
+            print(f"Docker not available ({e}), falling back to stub client")
+    return DockerExecutor(client=StubDockerClient())
+
+
+def print_table(results: Dict[str, Dict]):
+    for scenario, phases in results.items():
+        print(f"\n{scenario}")
+        for phase, stats in phases.items():
+            print(
+                f"  {phase:<18} n={stats['n']:<3} mean={stats['mean_ms']:10.2f}ms "
+                f"min={stats['min_ms']:10.2f}ms max={stats['max_ms']:10.2f}ms"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DockerExecutor phases")
+    parser.add_argument("--stub", action="store_true", help="Use the stub client even if Docker is available")
+    parser.add_argument("--repeat", type=int, default=3, help="Samples per scenario")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    executor = make_executor(args.stub)
+    backend = "stub" if isinstance(executor.client, StubDockerClient) else "docker"
+    results = run_scenarios(executor, args.repeat)
+
+    if args.json:
+        print(json.dumps({"backend": backend, "results": results}, indent=2))
+    else:
+        print(f"Backend: {backend}")
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Per-core scaling benchmark for the production server profile.
+
+Starts `gunicorn main:app -c gunicorn.conf.py` with increasing worker counts
+and drives it with keep-alive HTTP clients in separate processes, reporting
+requests per second for each worker count.
+
+Usage:
+    python bench_server.py                          # 1, 2, 4 ... cpu_count workers
+    python bench_server.py --workers 1 2 --path /api/tracks --duration 10
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import List
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+
+def client_loop(args) -> int:
+    """Issue requests over one keep-alive connection until the deadline"""
+    port, path, deadline = args
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    count = 0
+    while time.time() < deadline:
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+        except (ConnectionError, http.client.HTTPException):
+            # Worker recycled (max_requests) or keep-alive expired; reconnect
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            continue
+        if response.status == 200:
+            count += 1
+    conn.close()
+    return count
+
+
+def run_load(port: int, path: str, clients: int, duration: float) -> float:
+    deadline = time.time() + duration
+    with multiprocessing.Pool(clients) as pool:
+        counts = pool.map(client_loop, [(port, path, deadline)] * clients)
+    return sum(counts) / duration
+
+
+def bench_workers(workers: int, path: str, clients: int, duration: float) -> float:
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "main:app", "-c", "gunicorn.conf.py",
+         "--access-logfile", "/dev/null"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(port)
+        run_load(port, path, clients, 1)  # warm up
+        return run_load(port, path, clients, duration)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def default_worker_counts() -> List[int]:
+    counts, n = [], 1
+    while n < multiprocessing.cpu_count():
+        counts.append(n)
+        n *= 2
+    counts.append(multiprocessing.cpu_count())
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API throughput per gunicorn worker count")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_worker_counts())
+    parser.add_argument("--path", default="/api/tracks", help="Endpoint to request")
+    parser.add_argument("--clients", type=int, default=multiprocessing.cpu_count() * 2,
+                        help="Concurrent client processes")
+    parser.add_argument("--duration", type=float, default=5, help="Seconds per measurement")
+    args = parser.parse_args()
+
+    print(f"GET {args.path} with {args.clients} clients, {args.duration}s per run")
+    baseline = None
+    for workers in args.workers:
+        rps = bench_workers(workers, args.path, args.clients, args.duration)
+        baseline = baseline or rps
+        print(f"  workers={workers:<3} {rps:10.1f} req/s  x{rps / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Content-addressed storage for submitted code (code_blobs, code_history).
+
+user_progress.code_hash points at a blob keyed by the sha256 of the text.
+Blobs are compressed (zstd when the zstandard package is installed,
+otherwise zlib) and reference-counted: identical submissions, such as
+untouched starter code, are stored once, and a blob is deleted when the last
+row referencing it moves on. Blobs never change, so decoded text is cached
+per process.
+
+When CODE_HISTORY_LIMIT > 0 the versions a user replaces are kept per lesson
+as reverse deltas: each is compressed with the next newer version as the
+preset dictionary, so an edit costs roughly the size of the change. The
+newest version is the blob itself; older ones are rebuilt by walking back
+from it, and the oldest are dropped past the limit.
+
+Usage:
+    python code_store.py --stats
+"""
+
+import argparse
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import CodeBlob, CodeHistory, UserProgress
+
+try:
+    import zstandard
+except ImportError:  # Optional; zlib is used when zstandard is not installed
+    zstandard = None
+
+CODE_BLOB_CODEC = os.getenv("CODE_BLOB_CODEC", "zstd" if zstandard is not None else "zlib")
+CODE_BLOB_LEVEL = int(os.getenv("CODE_BLOB_LEVEL", "9"))
+CODE_BLOB_CACHE_SIZE = int(os.getenv("CODE_BLOB_CACHE_SIZE", "2048"))
+CODE_HISTORY_LIMIT = int(os.getenv("CODE_HISTORY_LIMIT", "20"))
+# Shorter texts are stored raw; compression framing would outweigh the saving
+MIN_COMPRESS_BYTES = 64
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def compress(raw: bytes, dictionary: bytes = b"") -> Tuple[str, bytes]:
+    """(codec, data) for raw bytes, optionally against a preset dictionary"""
+    if len(raw) < MIN_COMPRESS_BYTES and not dictionary:
+        return "raw", raw
+    if CODE_BLOB_CODEC == "zstd" and zstandard is not None:
+        kwargs = {}
+        if dictionary:
+            kwargs["dict_data"] = zstandard.ZstdCompressionDict(dictionary, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+        return "zstd", zstandard.ZstdCompressor(level=CODE_BLOB_LEVEL, **kwargs).compress(raw)
+    compressor = zlib.compressobj(CODE_BLOB_LEVEL, zdict=dictionary) if dictionary else zlib.compressobj(CODE_BLOB_LEVEL)
+    return "zlib", compressor.compress(raw) + compressor.flush()
+
+
+def decompress(codec: str, data: bytes, dictionary: bytes = b"") -> bytes:
+    if codec == "raw":
+        return data
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Code blob is zstd-compressed but the zstandard package is not installed")
+        kwargs = {}
+        if dictionary:
+            kwargs["dict_data"] = zstandard.ZstdCompressionDict(dictionary, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+        return zstandard.ZstdDecompressor(**kwargs).decompress(data)
+    decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+class CodeStore:
+    """Reads and reference-counted writes of code blobs, with a decoded-text LRU"""
+
+    def __init__(self, cache_size: int = CODE_BLOB_CACHE_SIZE, history_limit: int = CODE_HISTORY_LIMIT):
+        self.cache_size = cache_size
+        self.history_limit = history_limit
+        self._texts: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, digest: str, text: str):
+        with self._lock:
+            self._texts[digest] = text
+            self._texts.move_to_end(digest)
+            while len(self._texts) > self.cache_size:
+                self._texts.popitem(last=False)
+
+    def load_many(self, db: Session, digests: Iterable[Optional[str]]) -> Dict[str, str]:
+        """Text for each hash, from the cache or one query for the rest"""
+        texts = {}
+        missing = []
+        with self._lock:
+            for digest in set(d for d in digests if d):
+                if digest in self._texts:
+                    self._texts.move_to_end(digest)
+                    texts[digest] = self._texts[digest]
+                else:
+                    missing.append(digest)
+        if missing:
+            for digest, codec, data in db.execute(
+                select(CodeBlob.hash, CodeBlob.codec, CodeBlob.data).where(CodeBlob.hash.in_(missing))
+            ):
+                texts[digest] = decompress(codec, data).decode("utf-8")
+                self._remember(digest, texts[digest])
+        return texts
+
+    def load(self, db: Session, digest: Optional[str]) -> Optional[str]:
+        if digest is None:
+            return None
+        return self.load_many(db, [digest]).get(digest)
+
+    def acquire(self, db: Session, code: str) -> str:
+        """Store code (or add a reference to the existing blob) and return its hash"""
+        raw = code.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        dialect = db.bind.dialect.name
+        if dialect == "postgresql":
+            insert = postgresql.insert
+        elif dialect == "sqlite":
+            insert = sqlite.insert
+        else:
+            raise RuntimeError(f"Code blobs are not supported on {dialect}")
+
+        codec, data = compress(raw)
+        stmt = insert(CodeBlob).values(
+            hash=digest, codec=codec, data=data, size=len(raw), ref_count=1, created_at=datetime.utcnow()
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["hash"], set_={"ref_count": CodeBlob.ref_count + 1}
+        ))
+        self._remember(digest, code)
+        return digest
+
+    def release(self, db: Session, digest: Optional[str]):
+        """Drop one reference; the blob is deleted with its last one"""
+        if digest is None:
+            return
+        db.execute(update(CodeBlob).where(CodeBlob.hash == digest).values(ref_count=CodeBlob.ref_count - 1))
+        db.execute(delete(CodeBlob).where(CodeBlob.hash == digest, CodeBlob.ref_count <= 0))
+
+    def save(self, db: Session, progress: UserProgress, code: Optional[str]):
+        """Point a progress row at code. Call before the commit.
+
+        Saving the same text again is free. Otherwise the replaced version
+        goes to the lesson history (when enabled) and its blob is released.
+        """
+        digest = code_hash(code) if code is not None else None
+        if digest == progress.code_hash:
+            return
+        previous_hash = progress.code_hash
+        if self.history_limit > 0 and (previous_hash is not None or progress.id is not None):
+            self._record_history(db, progress, previous_hash, code or "")
+        progress.code_hash = self.acquire(db, code) if code is not None else None
+        self.release(db, previous_hash)
+
+    def _record_history(self, db: Session, progress: UserProgress, previous_hash: Optional[str], current: str):
+        latest = db.scalar(
+            select(func.max(CodeHistory.version))
+            .where(CodeHistory.user_id == progress.user_id, CodeHistory.lesson_id == progress.lesson_id)
+        )
+        if previous_hash is None and latest is None:
+            return
+        # Cleared code is kept as an empty version so the delta chain stays intact
+        version = (latest or 0) + 1
+        raw = (self.load(db, previous_hash) or "").encode("utf-8")
+        codec, delta = compress(raw, current.encode("utf-8"))
+        db.add(CodeHistory(
+            user_id=progress.user_id, lesson_id=progress.lesson_id, version=version,
+            codec=codec, delta=delta, size=len(raw), saved_at=progress.updated_at
+        ))
+        db.execute(delete(CodeHistory).where(
+            CodeHistory.user_id == progress.user_id,
+            CodeHistory.lesson_id == progress.lesson_id,
+            CodeHistory.version <= version - self.history_limit
+        ))
+
+    def history(self, db: Session, user_id: int, lesson_id: int) -> List[Dict[str, Any]]:
+        """Earlier versions of the user's code for a lesson, newest first"""
+        progress = db.query(UserProgress).filter(
+            UserProgress.user_id == user_id, UserProgress.lesson_id == lesson_id
+        ).first()
+        if progress is None:
+            return []
+        newer = (self.load(db, progress.code_hash) or "").encode("utf-8")
+        versions = []
+        for row in db.scalars(
+            select(CodeHistory)
+            .where(CodeHistory.user_id == user_id, CodeHistory.lesson_id == lesson_id)
+            .order_by(CodeHistory.version.desc())
+        ):
+            newer = decompress(row.codec, row.delta, newer)
+            versions.append({"version": row.version, "code": newer.decode("utf-8"), "saved_at": row.saved_at})
+        return versions
+
+    def stats(self, db: Session) -> Dict[str, int]:
+        blobs, references, raw_bytes, stored_bytes, inline_bytes = db.execute(select(
+            func.count(), func.sum(CodeBlob.ref_count), func.sum(CodeBlob.size),
+            func.sum(func.length(CodeBlob.data)), func.sum(CodeBlob.size * CodeBlob.ref_count)
+        )).one()
+        history_rows, history_raw, history_stored = db.execute(
+            select(func.count(), func.sum(CodeHistory.size), func.sum(func.length(CodeHistory.delta)))
+        ).one()
+        return {
+            "blobs": blobs,
+            "references": references or 0,
+            "raw_bytes": raw_bytes or 0,
+            "stored_bytes": stored_bytes or 0,
+            # What user_progress held when every row stored its own copy
+            "inline_bytes": inline_bytes or 0,
+            "history_versions": history_rows,
+            "history_raw_bytes": history_raw or 0,
+            "history_stored_bytes": history_stored or 0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect code blob storage")
+    parser.add_argument("--stats", action="store_true", required=True, help="Print storage totals")
+    parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        for name, value in code_store.stats(db).items():
+            print(f"{name}: {value}")
+    finally:
+        db.close()
+
+
+# Global instance
+code_store = CodeStore()
+
+
+if __name__ == "__main__":
+    main()
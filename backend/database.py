@@ -1,7 +1,10 @@
 import os
-from sqlalchemy import create_engine
+from typing import Optional
+from fastapi import Request
+from jose import JWTError, jwt
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from models import Base
+from replica_router import ReplicaRouter, DATABASE_REPLICA_URLS
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,26 +12,74 @@ load_dotenv()
 # Get database URL from environment
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./pylingo.db")
 
-# Handle SQLite vs PostgreSQL
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL, pool_size=10, max_overflow=20)
+def _create_engine(url: str):
+    # Handle SQLite vs PostgreSQL
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return create_engine(url, pool_size=10, max_overflow=20)
+
+engine = _create_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Bound per request to a replica or the primary (see replica_router.py)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+# Global instance
+replica_router = ReplicaRouter(engine, DATABASE_REPLICA_URLS, _create_engine)
+
+@event.listens_for(SessionLocal, "after_flush")
+def _flushed(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _executed(orm_execute_state):
+    # Core-style insert/update/delete statements bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(SessionLocal, "after_commit")
+def _committed(session):
+    # Keep this user's reads on the primary until replicas have the write
+    if session.info.pop("wrote", False):
+        replica_router.record_write(session.info.get("user"))
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _rolled_back(session):
+    session.info.pop("wrote", None)
 
-def create_tables():
-    """Create tables if they don't exist - safe for existing databases"""
+@event.listens_for(ReadSessionLocal, "before_flush")
+def _read_only_flush(session, flush_context, instances):
+    raise RuntimeError("Read-only session: use get_db for endpoints that write")
+
+@event.listens_for(ReadSessionLocal, "do_orm_execute")
+def _read_only_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        raise RuntimeError("Read-only session: use get_db for endpoints that write")
+
+def request_user(request: Request) -> Optional[str]:
+    """Username in the bearer token, unverified: only used to route reads.
+    Authentication still happens in auth.get_current_user."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
     try:
-        Base.metadata.create_all(bind=engine)
-        print("Database tables created/verified successfully")
-    except Exception as e:
-        print(f"Database table creation warning: {e}")
-        # Don't fail the app if tables already exist
+        return jwt.get_unverified_claims(token).get("sub")
+    except JWTError:
+        return None
 
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["user"] = request_user(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db(request: Request):
+    """Session for read-only endpoints: a replica that has the caller's
+    writes when one is available, otherwise the primary"""
+    db = ReadSessionLocal(bind=replica_router.choose(request_user(request)))
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
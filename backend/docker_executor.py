@@ -1,33 +1,570 @@
 import docker
+import codecs
+import hashlib
+import shutil
+import io
+import tarfile
 import tempfile
+import threading
+import time
 import os
 import json
+import re
+import socket
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from execution_cache import ExecutionCache, execution_cache, is_deterministic
+
+# Output captured per execution; anything past these limits is dropped and
+# the container is stopped, so API memory is bounded by the cap, not user code
+MAX_OUTPUT_BYTES = int(os.getenv("SANDBOX_MAX_OUTPUT_BYTES", str(64 * 1024)))
+MAX_OUTPUT_LINES = int(os.getenv("SANDBOX_MAX_OUTPUT_LINES", "1000"))
+
+# Local directory of pre-built wheels that sandbox images install from with
+# --no-index (populate it once with populate_wheelhouse.py)
+WHEELHOUSE_DIR = Path(os.getenv("SANDBOX_WHEELHOUSE", str(Path(__file__).parent / "wheelhouse")))
+
+# Seconds between background Docker availability probes (see main.lifespan)
+DOCKER_PROBE_INTERVAL = int(os.getenv("DOCKER_PROBE_INTERVAL", "30"))
+
+# Shared image holding the system packages and pip; every sandbox builds on it
+BASE_IMAGE = "pylingo-sandbox-base:latest"
+
+# Framework packages for web-app lessons. Their dependency images are built
+# once (warmed after the first successful probe) and reused for every run.
+WEB_APP_FRAMEWORKS = {
+    "flask": ["flask"],
+    "fastapi": ["fastapi", "uvicorn"],
+}
+WARM_WEB_APP_IMAGES = os.getenv("SANDBOX_WARM_WEB_APP_IMAGES", "true").lower() != "false"
+WEB_APP_MAX_ROUTES = 10
+WEB_APP_MAX_BODY_BYTES = 4096
+# Harness copied into web-app containers next to the learner's main.py
+WEB_PROBE_SCRIPT = Path(__file__).parent / "sandbox_web_probe.py"
+
+# Packages that might need network access during execution
+NETWORK_PACKAGES = {"plotly", "requests"}
+
+# Requirement sets including any of these packages run through a zygote
+# container that keeps them imported (see sandbox_zygote.py). Values are the
+# import names to preload.
+HEAVY_PACKAGES = {
+    "numpy": "numpy",
+    "pandas": "pandas",
+    "scipy": "scipy",
+    "matplotlib": "matplotlib",
+    "seaborn": "seaborn",
+    "scikit-learn": "sklearn",
+    "torch": "torch",
+    "tensorflow": "tensorflow",
+    "transformers": "transformers",
+    "xgboost": "xgboost",
+}
+SANDBOX_ZYGOTE = os.getenv("SANDBOX_ZYGOTE", "true").lower() != "false"
+ZYGOTES_PER_IMAGE = int(os.getenv("SANDBOX_ZYGOTES_PER_IMAGE", "2"))
+# Zygote containers unused for this many seconds are removed
+ZYGOTE_IDLE_TIMEOUT = int(os.getenv("SANDBOX_ZYGOTE_IDLE_TIMEOUT", "600"))
+ZYGOTE_STARTUP_TIMEOUT = 120  # Preloading torch/transformers can take a while
+ZYGOTE_SCRIPT = Path(__file__).parent / "sandbox_zygote.py"
+# Room past the output cap for the zygote's report line, which the capture
+# must still see after sandbox_zygote.py has cut the run's own output
+ZYGOTE_REPORT_BYTES = 4096
+
+# Every per-run container and image carries SANDBOX_LABEL (its role) and
+# OWNER_LABEL (host:pid of the creating worker, see sandbox_owner) so the
+# reaper can find leftovers
+SANDBOX_LABEL = "pylingo.sandbox"
+OWNER_LABEL = "pylingo.owner"
+# Seconds between reaper passes, and the age after which per-run containers
+# and images are treated as orphaned (well above the longest run timeout)
+SANDBOX_REAP_INTERVAL = int(os.getenv("SANDBOX_REAP_INTERVAL", "60"))
+SANDBOX_REAP_AGE = int(os.getenv("SANDBOX_REAP_AGE", "600"))
+# Zygotes are long-lived; past this age even a live owner's zygotes are reaped
+ZYGOTE_MAX_AGE = int(os.getenv("SANDBOX_ZYGOTE_MAX_AGE", str(6 * 3600)))
+# Extra seconds a run gets for interpreter start-up before its deadline kill
+DEADLINE_GRACE = 2
+
+class OutputCapture:
+    """Incrementally decodes stdout/stderr chunks up to a shared byte/line ceiling"""
+    
+    def __init__(self, max_bytes: int = MAX_OUTPUT_BYTES, max_lines: int = MAX_OUTPUT_LINES):
+        self.max_bytes = max_bytes
+        self.max_lines = max_lines
+        self.bytes_read = 0
+        self.lines_read = 0
+        self.truncated = False
+        self._decoders = {
+            "stdout": codecs.getincrementaldecoder("utf-8")(errors="replace"),
+            "stderr": codecs.getincrementaldecoder("utf-8")(errors="replace"),
+        }
+        self._parts = {"stdout": [], "stderr": []}
+    
+    def feed(self, stream: str, chunk: Optional[bytes]) -> bool:
+        """Add a chunk to a stream. Returns False once the ceiling has been hit."""
+        if self.truncated:
+            return False
+        if not chunk:
+            return True
+        
+        remaining = self.max_bytes - self.bytes_read
+        if len(chunk) > remaining:
+            chunk = chunk[:remaining]
+            self.truncated = True
+        self.bytes_read += len(chunk)
+        
+        text = self._decoders[stream].decode(chunk)
+        newlines = text.count("\n")
+        if self.lines_read + newlines > self.max_lines:
+            # Keep everything up to and including the last allowed newline
+            cut = -1
+            for _ in range(self.max_lines - self.lines_read):
+                cut = text.index("\n", cut + 1)
+            text = text[:cut + 1]
+            newlines = self.max_lines - self.lines_read
+            self.truncated = True
+        self.lines_read += newlines
+        
+        self._parts[stream].append(text)
+        return not self.truncated
+    
+    def text(self, stream: str) -> str:
+        """Return everything captured for a stream, flushing any partial character"""
+        tail = self._decoders[stream].decode(b"", final=True)
+        if tail:
+            self._parts[stream].append(tail)
+        return "".join(self._parts[stream])
+
+# Sandbox limits per lesson resource profile (Lesson.resource_profile).
+# pids_limit stops fork bombs; cpus is converted to a CFS quota (nano_cpus).
+RESOURCE_PROFILES = {
+    "basic": {"mem_limit": "128m", "cpus": 0.5, "pids_limit": 64},
+    "standard": {"mem_limit": "512m", "cpus": 1.0, "pids_limit": 128},
+    "ml": {"mem_limit": "2g", "cpus": 2.0, "pids_limit": 256},
+}
+DEFAULT_RESOURCE_PROFILE = "basic"
+
+class ResourceMonitor:
+    """Samples a running container's cgroup stats to record CPU time and peak memory"""
+    
+    def __init__(self, container):
+        self.container = container
+        self.cpu_time_ns = 0
+        self.peak_memory_bytes = 0
+        self.samples = 0
+        self._started_at = None
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+    
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._thread.start()
+    
+    def _sample(self):
+        try:
+            # The stats stream ends once the container stops
+            for stats in self.container.stats(stream=True, decode=True):
+                cpu_usage = (stats.get("cpu_stats") or {}).get("cpu_usage") or {}
+                memory = stats.get("memory_stats") or {}
+                self.cpu_time_ns = max(self.cpu_time_ns, cpu_usage.get("total_usage") or 0)
+                # max_usage is only reported on cgroup v1
+                self.peak_memory_bytes = max(
+                    self.peak_memory_bytes,
+                    memory.get("max_usage") or 0,
+                    memory.get("usage") or 0
+                )
+                self.samples += 1
+        except Exception:
+            pass  # Container removed mid-stream
+    
+    def stop(self) -> Dict[str, Any]:
+        """Stop timing and return the measured usage"""
+        wall_time = time.perf_counter() - self._started_at
+        self._thread.join(timeout=1)
+        return {
+            "wall_time_ms": round(wall_time * 1000, 1),
+            "cpu_time_ms": round(self.cpu_time_ns / 1e6, 1),
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "samples": self.samples
+        }
+
+class Deadline:
+    """Kills a container when its run time is up, whether or not anyone is waiting on it"""
+    
+    def __init__(self, container, seconds: float):
+        self.container = container
+        self.fired = False
+        self._timer = threading.Timer(seconds, self._kill)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def _kill(self):
+        self.fired = True
+        try:
+            self.container.kill()
+        except Exception:
+            pass  # Already exited or removed
+    
+    def cancel(self):
+        self._timer.cancel()
+
+def sandbox_owner() -> str:
+    """OWNER_LABEL value for this process. Read per call, not at import: with
+    gunicorn's preload_app every worker imports this module in the master."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def docker_timestamp(value: str) -> float:
+    """Epoch seconds from a Docker API timestamp ('2024-01-01T12:00:00.123456789Z')"""
+    return datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+
+def requirement_name(requirement: str) -> str:
+    """'scikit-learn>=1.3' -> 'scikit-learn'"""
+    return re.split(r"[<>=!~\[;\s]", requirement.strip(), 1)[0].lower()
+
+def network_disabled(requirements: Optional[list] = None) -> bool:
+    """Sandboxes run without network unless a requirement needs it at runtime"""
+    if not requirements:
+        return True
+    return not any(pkg in NETWORK_PACKAGES for pkg in requirements)
+
+class Zygote:
+    """A long-lived sandbox container running the sandbox_zygote.py fork server"""
+    
+    def __init__(self, container, image_tag: str):
+        self.container = container
+        self.image_tag = image_tag
+        self.lock = threading.Lock()  # Held for the duration of one submission
+        self.started = time.monotonic()
+        self.last_used = self.started
+
+class ZygotePool:
+    """Warm zygote containers per dependency image, one submission at a time each"""
+    
+    def __init__(self, executor: "DockerExecutor", per_image: int = ZYGOTES_PER_IMAGE):
+        self.executor = executor
+        self.per_image = per_image
+        self._zygotes: Dict[str, List[Zygote]] = {}
+        self._lock = threading.Lock()
+    
+    def acquire(self, image_tag: str, requirements: list, limits: Dict[str, Any]) -> Optional[Zygote]:
+        """A locked zygote for the image, starting one if under the limit; None if all are busy"""
+        self.reap_idle()
+        with self._lock:
+            zygotes = self._zygotes.setdefault(image_tag, [])
+            for zygote in zygotes:
+                if zygote.lock.acquire(blocking=False):
+                    return zygote
+            if len(zygotes) >= self.per_image:
+                return None
+            # Reserve the slot while the container starts
+            zygote = Zygote(None, image_tag)
+            zygote.lock.acquire()
+            zygotes.append(zygote)
+        
+        try:
+            zygote.container = self._start(image_tag, requirements, limits)
+        except Exception:
+            self.discard(zygote)
+            raise
+        return zygote
+    
+    def release(self, zygote: Zygote):
+        zygote.last_used = time.monotonic()
+        zygote.lock.release()
+    
+    def discard(self, zygote: Zygote):
+        """Drop a zygote (broken or killed) from the pool and remove its container"""
+        with self._lock:
+            zygotes = self._zygotes.get(zygote.image_tag, [])
+            if zygote in zygotes:
+                zygotes.remove(zygote)
+        if zygote.container is not None:
+            self.executor._remove_container(zygote.container)
+    
+    def reap_idle(self):
+        now = time.monotonic()
+        idle = []
+        with self._lock:
+            for zygotes in self._zygotes.values():
+                for zygote in zygotes:
+                    expired = now - zygote.last_used > ZYGOTE_IDLE_TIMEOUT or now - zygote.started > ZYGOTE_MAX_AGE
+                    if expired and zygote.lock.acquire(blocking=False):
+                        idle.append(zygote)
+        for zygote in idle:
+            self.discard(zygote)
+    
+    def size(self) -> int:
+        with self._lock:
+            return sum(len(zygotes) for zygotes in self._zygotes.values())
+    
+    def shutdown(self):
+        with self._lock:
+            zygotes = [zygote for group in self._zygotes.values() for zygote in group]
+            self._zygotes.clear()
+        for zygote in zygotes:
+            if zygote.container is not None:
+                self.executor._remove_container(zygote.container)
+    
+    def _start(self, image_tag: str, requirements: list, limits: Dict[str, Any]):
+        preload = sorted({
+            HEAVY_PACKAGES[name] for name in map(requirement_name, requirements) if name in HEAVY_PACKAGES
+        })
+        container = self.executor.client.containers.create(
+            image_tag,
+            command="python sandbox_zygote.py serve",
+            mem_limit=limits["mem_limit"],
+            memswap_limit=limits["mem_limit"],
+            nano_cpus=int(limits["cpus"] * 1e9),
+            pids_limit=limits["pids_limit"],
+            environment={"PYTHONHASHSEED": "0", "PYLINGO_PRELOAD": ",".join(preload)},
+            network_disabled=self.executor._should_disable_network(requirements),
+            working_dir="/app",
+            labels={SANDBOX_LABEL: "zygote", OWNER_LABEL: sandbox_owner()}
+        )
+        try:
+            container.put_archive("/app", self.executor._files_archive({"sandbox_zygote.py": ZYGOTE_SCRIPT.read_text()}))
+            container.start()
+            
+            # Wait for the preload to finish. A zygote that hangs without
+            # logging is killed, which ends the log stream.
+            deadline = Deadline(container, ZYGOTE_STARTUP_TIMEOUT)
+            try:
+                for line in container.logs(stream=True, follow=True):
+                    if b"zygote: ready" in line:
+                        return container
+            finally:
+                deadline.cancel()
+            raise RuntimeError("zygote did not become ready")
+        except Exception:
+            self.executor._remove_container(container)
+            raise
+    
+    def execute(self, zygote: Zygote, code: str, timeout: int, limits: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one submission in a forked child of the zygote.
+        
+        The output cap is enforced inside the container, where only the
+        child is killed. Raises when the zygote itself fails to report.
+        """
+        run_id = os.urandom(8).hex()
+        run_dir = f"/tmp/pylingo-run-{run_id}"
+        marker = f"__PYLINGO_RUN_{run_id}__"
+        
+        started = time.perf_counter()
+        zygote.container.put_archive("/tmp", self.executor._files_archive({f"pylingo-run-{run_id}/main.py": code}))
+        _, stream = zygote.container.exec_run(
+            [
+                "python", "/app/sandbox_zygote.py", "run", run_dir, str(timeout), marker,
+                str(self.executor.max_output_bytes), str(self.executor.max_output_lines)
+            ],
+            stream=True,
+            demux=True
+        )
+        # The zygote enforces the run timeout itself; this backstop covers a hung zygote
+        deadline = Deadline(zygote.container, timeout + DEADLINE_GRACE + 5)
+        capture = OutputCapture(
+            self.executor.max_output_bytes + ZYGOTE_REPORT_BYTES, self.executor.max_output_lines + 2
+        )
+        try:
+            for stdout_chunk, stderr_chunk in stream:
+                if not (capture.feed("stdout", stdout_chunk) and capture.feed("stderr", stderr_chunk)):
+                    break  # Past the cap sandbox_zygote.py enforces: the client misbehaved
+        finally:
+            deadline.cancel()
+        wall_time = time.perf_counter() - started
+        
+        report = None
+        stderr_lines = []
+        for line in capture.text("stderr").splitlines():
+            if line.startswith(marker):
+                report = json.loads(line[len(marker):])
+            else:
+                stderr_lines.append(line)
+        if report is None:
+            # The zygote died or hung (and the backstop killed it)
+            raise RuntimeError("zygote run did not report")
+        
+        return {
+            "exit_code": report["exit_code"],
+            "timed_out": report["timed_out"],
+            "stdout": capture.text("stdout"),
+            "stderr": "\n".join(stderr_lines).strip(),
+            "truncated": report["truncated"],
+            "resources": {
+                "wall_time_ms": round(wall_time * 1000, 1),
+                "cpu_time_ms": report["cpu_time_ms"],
+                "peak_memory_bytes": report["peak_memory_bytes"],
+                "samples": 0,
+                "limits": limits,
+                "zygote": True
+            }
+        }
 
 class DockerExecutor:
-    def __init__(self):
+    def __init__(
+        self,
+        client=None,
+        max_output_bytes: int = MAX_OUTPUT_BYTES,
+        max_output_lines: int = MAX_OUTPUT_LINES,
+        result_cache: Optional[ExecutionCache] = None,
+        base_url: Optional[str] = None
+    ):
+        self.max_output_bytes = max_output_bytes
+        self.max_output_lines = max_output_lines
+        self.result_cache = result_cache
+        # A pre-built client (e.g. a stub in benchmarks) can be injected;
+        # otherwise one is created on first use, for base_url (e.g.
+        # tcp://sandbox-2:2376) or from the environment
+        self.base_url = base_url
+        self._client = client
+        self._client_injected = client is not None
+        # None until the first probe; see probe()
+        self.available: Optional[bool] = None
+        self.last_probe: Optional[float] = None
+        self.zygotes = ZygotePool(self) if SANDBOX_ZYGOTE else None
+        self._metrics = {
+            "runs": 0,
+            "deadline_kills": 0,
+            "reaper_runs": 0,
+            "reaped_containers": 0,
+            "reaped_images": 0,
+            "reclaimed_bytes": 0,
+        }
+        self.last_reap: Optional[float] = None
+        self._metrics_lock = threading.Lock()
+    
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = docker.DockerClient(base_url=self.base_url) if self.base_url else docker.from_env()
+        return self._client
+    
+    def probe(self) -> bool:
+        """Ping the Docker daemon and cache the result. Blocking; call it off the event loop."""
         try:
-            self.client = docker.from_env()
-            # Test if Docker is available
             self.client.ping()
-            self.available = True
+            available = True
         except Exception as e:
-            print(f"Docker not available: {e}")
-            self.available = False
+            if self.available is not False:
+                print(f"Docker not available: {e}")
+            available = False
+            if not self._client_injected:
+                self._client = None  # Reconnect on the next probe
+        if available and not self.available and WARM_WEB_APP_IMAGES and not self._client_injected:
+            threading.Thread(target=self.warm_web_app_images, daemon=True).start()
+        self.available = available
+        self.last_probe = time.monotonic()
+        return available
+    
+    def warm_web_app_images(self):
+        """Build the framework images ahead of the first web-app run"""
+        for app_type, requirements in WEB_APP_FRAMEWORKS.items():
+            try:
+                self._ensure_deps_image(requirements)
+            except Exception as e:
+                print(f"Could not warm {app_type} image: {e}")
     
     def is_available(self) -> bool:
-        return self.available
+        """Cached result of the last probe (False until one has run)"""
+        return bool(self.available)
+    
+    def shutdown(self):
+        """Remove warm zygote containers"""
+        if self.zygotes is not None:
+            self.zygotes.shutdown()
+    
+    def _count(self, name: str, amount: int = 1):
+        with self._metrics_lock:
+            self._metrics[name] += amount
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Run, deadline and reaper counters for this process"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["last_reap_age_s"] = round(time.monotonic() - self.last_reap, 1) if self.last_reap else None
+        if self.zygotes is not None:
+            metrics["zygotes"] = self.zygotes.size()
+        if self.result_cache is not None:
+            metrics["result_cache"] = self.result_cache.stats()
+        return metrics
+    
+    def reap(self, max_age: int = SANDBOX_REAP_AGE) -> Dict[str, int]:
+        """Remove orphaned sandbox containers and images.
+        
+        Per-run containers and images older than max_age are removed, as are
+        zygotes older than ZYGOTE_MAX_AGE and other workers' zygotes whose
+        owner on this host has exited. Blocking; call it off the event loop.
+        """
+        now = time.time()
+        reaped = {"containers": 0, "images": 0, "bytes": 0}
+        
+        for container in self.client.containers.list(all=True, filters={"label": SANDBOX_LABEL}):
+            labels = container.labels or {}
+            age = now - docker_timestamp(container.attrs["Created"])
+            if labels.get(SANDBOX_LABEL) == "zygote":
+                owner = labels.get(OWNER_LABEL, "")
+                if age > ZYGOTE_MAX_AGE:
+                    stale = True
+                elif owner == sandbox_owner():
+                    continue  # Our own pool removes idle zygotes
+                else:
+                    stale = not self._owner_alive(owner)
+            else:
+                stale = age > max_age
+            if stale:
+                self._remove_container(container)
+                reaped["containers"] += 1
+        
+        # Labelled run images, plus unlabelled ones from before labels were added
+        images = {
+            image.id: image
+            for filters in ({"label": SANDBOX_LABEL}, {"reference": "pylingo-exec-*"})
+            for image in self.client.images.list(filters=filters)
+        }
+        for image in images.values():
+            if now - docker_timestamp(image.attrs["Created"]) > max_age:
+                try:
+                    self.client.images.remove(image.id, force=True)
+                    reaped["images"] += 1
+                    reaped["bytes"] += image.attrs.get("Size") or 0
+                except Exception:
+                    pass  # In use or already gone
+        
+        # Untagged layers left by failed builds
+        pruned = self.client.images.prune(filters={"dangling": True, "label": SANDBOX_LABEL})
+        reaped["images"] += len(pruned.get("ImagesDeleted") or [])
+        reaped["bytes"] += pruned.get("SpaceReclaimed") or 0
+        
+        self._count("reaper_runs")
+        self._count("reaped_containers", reaped["containers"])
+        self._count("reaped_images", reaped["images"])
+        self._count("reclaimed_bytes", reaped["bytes"])
+        self.last_reap = time.monotonic()
+        if reaped["containers"] or reaped["images"]:
+            print(f"Sandbox reaper removed {reaped['containers']} containers, {reaped['images']} images ({reaped['bytes']} bytes)")
+        return reaped
+    
+    def _owner_alive(self, owner: str) -> bool:
+        """Whether the worker that created a container still runs (unknown hosts count as alive)"""
+        host, _, pid = owner.rpartition(":")
+        if host != socket.gethostname() or not pid.isdigit():
+            return True
+        try:
+            os.kill(int(pid), 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
     
     def execute_python_code(
         self, 
         code: str, 
         timeout: int = 30,
-        requirements: Optional[list] = None
+        requirements: Optional[list] = None,
+        resource_profile: str = DEFAULT_RESOURCE_PROFILE
     ) -> Dict[str, Any]:
         """Execute Python code in a Docker container"""
         
-        if not self.available:
+        if not self.is_available():
             return {
                 "success": False,
                 "output": "",
@@ -39,77 +576,104 @@ class DockerExecutor:
             with tempfile.TemporaryDirectory() as temp_dir:
                 temp_path = Path(temp_dir)
                 
-                # Write Python code to file
-                code_file = temp_path / "main.py"
-                code_file.write_text(code)
-                
-                # Create requirements.txt if needed
-                if requirements:
-                    req_file = temp_path / "requirements.txt"
-                    req_file.write_text("\n".join(requirements))
-                
-                # Create Dockerfile
-                dockerfile_content = self._create_dockerfile(bool(requirements))
-                dockerfile = temp_path / "Dockerfile"
-                dockerfile.write_text(dockerfile_content)
-                
-                # Build Docker image
+                # Build Docker image on top of the shared base/dependency layers
                 image_tag = f"pylingo-exec-{os.urandom(8).hex()}"
                 try:
-                    self.client.images.build(
-                        path=str(temp_path),
-                        tag=image_tag,
-                        rm=True,
-                        quiet=True
-                    )
+                    parent_image = self._ensure_deps_image(requirements)
+                    
+                    # Identical deterministic submissions reuse an earlier result
+                    cache_key = self._result_cache_key(code, requirements, timeout, parent_image, resource_profile)
+                    if cache_key:
+                        cached = self.result_cache.get(cache_key)
+                        if cached is not None:
+                            cached["cached"] = True
+                            return cached
+                    
+                    limits = RESOURCE_PROFILES.get(resource_profile, RESOURCE_PROFILES[DEFAULT_RESOURCE_PROFILE])
+                    
+                    # Heavy requirement sets fork from a warm zygote instead of a fresh interpreter
+                    if self._use_zygote(requirements):
+                        result = self._execute_in_zygote(parent_image, code, timeout, requirements, limits, cache_key)
+                        if result is not None:
+                            return result
+                    
+                    self._write_build_context(temp_path, code, parent_image)
+                    self._build_image(temp_path, image_tag, labels={SANDBOX_LABEL: "exec", OWNER_LABEL: sandbox_owner()})
                 except Exception as e:
+                    # A failed build can still leave a tagged or partial image
+                    self._remove_image(image_tag)
                     return {
                         "success": False,
                         "output": "",
                         "error": f"Failed to build Docker image: {str(e)}"
                     }
                 
-                # Run container
+                # Run container, streaming its output through a bounded capture
+                container = None
+                deadline = None
                 try:
-                    container = self.client.containers.run(
-                        image_tag,
-                        command="python main.py",
-                        remove=True,
-                        detach=False,
-                        stdout=True,
-                        stderr=True,
-                        timeout=timeout,
-                        mem_limit=self._get_memory_limit(requirements),  # Dynamic memory limit
-                        network_disabled=self._should_disable_network(requirements)
-                    )
-                    
-                    output = container.decode('utf-8')
-                    
+                    container, stream = self._run_container(image_tag, limits, requirements)
+                    self._count("runs")
+                    # Enforced here rather than by the client: a silent infinite
+                    # loop would otherwise block the output stream forever
+                    deadline = Deadline(container, timeout + DEADLINE_GRACE)
+                    monitor = ResourceMonitor(container)
+                    monitor.start()
+                    capture = self._capture_output(container, stream)
+                    exit_code = container.wait(timeout=30).get("StatusCode", 1)
+                    resources = monitor.stop()
+                    resources["limits"] = limits
+                finally:
+                    if deadline is not None:
+                        deadline.cancel()
+                    if container is not None:
+                        self._remove_container(container)
                     # Clean up image
-                    try:
-                        self.client.images.remove(image_tag, force=True)
-                    except:
-                        pass  # Image cleanup is not critical
-                    
+                    self._remove_image(image_tag)
+                
+                output = capture.text("stdout")
+                if deadline.fired:
+                    self._count("deadline_kills")
                     return {
-                        "success": True,
+                        "success": False,
                         "output": output.strip(),
-                        "error": ""
+                        "error": f"Execution timed out after {timeout} seconds",
+                        "truncated": capture.truncated,
+                        "resources": resources
                     }
-                    
-                except docker.errors.ContainerError as e:
-                    # Clean up image
-                    try:
-                        self.client.images.remove(image_tag, force=True)
-                    except:
-                        pass
-                    
+                if capture.truncated:
                     return {
                         "success": False,
-                        "output": "",
-                        "error": e.stderr.decode('utf-8') if e.stderr else str(e)
+                        "output": output.strip(),
+                        "error": f"Output limit exceeded ({self.max_output_bytes} bytes / {self.max_output_lines} lines); execution stopped",
+                        "truncated": True,
+                        "resources": resources
                     }
                 
+                if exit_code != 0:
+                    result = {
+                        "success": False,
+                        "output": output.strip(),
+                        "error": capture.text("stderr") or f"Process exited with status {exit_code}",
+                        "truncated": False,
+                        "resources": resources
+                    }
+                    # Only plain tracebacks are cached; OOM kills (137) can depend on host load
+                    if cache_key and exit_code == 1:
+                        self.result_cache.put(cache_key, result)
+                    return result
+                
+                result = {
+                    "success": True,
+                    "output": output.strip(),
+                    "error": "",
+                    "truncated": False,
+                    "resources": resources
+                }
+                if cache_key:
+                    self.result_cache.put(cache_key, result)
+                return result
+                
         except Exception as e:
             return {
                 "success": False,
@@ -117,31 +681,291 @@ class DockerExecutor:
                 "error": f"Execution failed: {str(e)}"
             }
     
-    def _get_memory_limit(self, requirements: Optional[list] = None) -> str:
-        """Get appropriate memory limit based on requirements"""
+    def _use_zygote(self, requirements: Optional[list]) -> bool:
+        return self.zygotes is not None and any(
+            requirement_name(requirement) in HEAVY_PACKAGES for requirement in requirements or []
+        )
+    
+    def _execute_in_zygote(
+        self,
+        parent_image: str,
+        code: str,
+        timeout: int,
+        requirements: list,
+        limits: Dict[str, Any],
+        cache_key: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        """Run through a warm zygote. None when every zygote for the image is busy
+        or broken, in which case the caller falls back to a cold container.
+        Runs that hit the output cap or time out are results, not failures."""
+        try:
+            zygote = self.zygotes.acquire(parent_image, requirements, limits)
+        except Exception as e:
+            print(f"Could not start zygote for {parent_image}: {e}")
+            return None
+        if zygote is None:
+            return None
+        
+        self._count("runs")
+        try:
+            run = self.zygotes.execute(zygote, code, timeout, limits)
+        except Exception as e:
+            print(f"Zygote run failed, falling back to a fresh container: {e}")
+            self.zygotes.discard(zygote)
+            return None
+        self.zygotes.release(zygote)
+        
+        output = run["stdout"].strip()
+        if run["truncated"]:
+            return {
+                "success": False,
+                "output": output,
+                "error": f"Output limit exceeded ({self.max_output_bytes} bytes / {self.max_output_lines} lines); execution stopped",
+                "truncated": True,
+                "resources": run["resources"]
+            }
+        if run["timed_out"]:
+            self._count("deadline_kills")
+            return {
+                "success": False,
+                "output": output,
+                "error": f"Execution timed out after {timeout} seconds",
+                "truncated": False,
+                "resources": run["resources"]
+            }
+        
+        exit_code = run["exit_code"]
+        result = {
+            "success": exit_code == 0,
+            "output": output,
+            "error": "" if exit_code == 0 else run["stderr"] or f"Process exited with status {exit_code}",
+            "truncated": False,
+            "resources": run["resources"]
+        }
+        if cache_key and exit_code in (0, 1):
+            self.result_cache.put(cache_key, result)
+        return result
+    
+    def _result_cache_key(
+        self,
+        code: str,
+        requirements: Optional[list],
+        timeout: int,
+        parent_image: str,
+        resource_profile: str
+    ) -> Optional[str]:
+        """Cache key for a submission, or None if its result must not be cached"""
+        if self.result_cache is None:
+            return None
+        if not self._should_disable_network(requirements) or not is_deterministic(code):
+            return None
+        
+        image_digest = self.client.images.get(parent_image).id
+        return self.result_cache.make_key(code, requirements, timeout, image_digest, resource_profile)
+    
+    # The phases below are split out so they can be timed individually
+    # (see bench_docker_executor.py).
+    
+    def _write_build_context(self, temp_path: Path, code: str, parent_image: str = BASE_IMAGE):
+        """Write main.py and the Dockerfile into the build context"""
+        # Write Python code to file
+        code_file = temp_path / "main.py"
+        code_file.write_text(code)
+        
+        # Create Dockerfile
+        dockerfile_content = self._create_dockerfile(parent_image)
+        dockerfile = temp_path / "Dockerfile"
+        dockerfile.write_text(dockerfile_content)
+    
+    def _image_exists(self, image_tag: str) -> bool:
+        try:
+            self.client.images.get(image_tag)
+            return True
+        except docker.errors.ImageNotFound:
+            return False
+    
+    def _ensure_base_image(self, nocache: bool = False) -> str:
+        """Build the shared base image once; later builds reuse its layers"""
+        if nocache or not self._image_exists(BASE_IMAGE):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                temp_path = Path(temp_dir)
+                (temp_path / "Dockerfile").write_text(self._create_base_dockerfile())
+                self._build_image(temp_path, BASE_IMAGE, nocache=nocache)
+        return BASE_IMAGE
+    
+    def _deps_image_tag(self, requirements: list) -> str:
+        digest = hashlib.sha256("\n".join(sorted(requirements)).encode()).hexdigest()[:16]
+        return f"pylingo-deps-{digest}:latest"
+    
+    def _ensure_deps_image(self, requirements: Optional[list] = None, nocache: bool = False) -> str:
+        """Return an image with the requirements installed, building it once per requirement set"""
+        base_image = self._ensure_base_image()
         if not requirements:
-            return "128m"
+            return base_image
+        
+        image_tag = self._deps_image_tag(requirements)
+        if not nocache and self._image_exists(image_tag):
+            return image_tag
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            (temp_path / "requirements.txt").write_text("\n".join(requirements))
+            
+            use_wheelhouse = self._stage_wheelhouse(temp_path / "wheels")
+            (temp_path / "Dockerfile").write_text(
+                self._create_deps_dockerfile(base_image, use_wheelhouse)
+            )
+            self._build_image(temp_path, image_tag, nocache=nocache)
         
-        # AI/ML packages need more memory
-        ml_packages = {'torch', 'torchvision', 'transformers', 'scikit-learn', 'plotly', 'seaborn'}
-        if any(pkg in ml_packages for pkg in requirements):
-            return "2g"  # 2GB for ML workloads
+        return image_tag
+    
+    def _stage_wheelhouse(self, target: Path) -> bool:
+        """Link the local wheelhouse into a build context. Returns False if it is empty."""
+        wheels = list(WHEELHOUSE_DIR.glob("*.whl")) if WHEELHOUSE_DIR.is_dir() else []
+        if not wheels:
+            return False
+        
+        target.mkdir()
+        for wheel in wheels:
+            try:
+                os.link(wheel, target / wheel.name)
+            except OSError:
+                shutil.copy2(wheel, target / wheel.name)  # Different filesystem
+        return True
+    
+    def populate_wheelhouse(self, requirements: list) -> Dict[str, Any]:
+        """Build wheels for the requirements (and their dependencies) into the wheelhouse.
         
-        # Standard packages
-        return "512m"
+        Runs pip inside the base image so the wheels match the sandbox platform.
+        This is the only step that needs network access.
+        """
+        WHEELHOUSE_DIR.mkdir(parents=True, exist_ok=True)
+        base_image = self._ensure_base_image()
+        try:
+            output = self.client.containers.run(
+                base_image,
+                command=["pip", "wheel", "--wheel-dir", "/wheelhouse", "--find-links", "/wheelhouse", *requirements],
+                user=f"{os.getuid()}:{os.getgid()}",
+                environment={"HOME": "/tmp"},
+                volumes={str(WHEELHOUSE_DIR.resolve()): {"bind": "/wheelhouse", "mode": "rw"}},
+                remove=True
+            )
+            return {"success": True, "output": output.decode("utf-8", errors="replace"), "error": ""}
+        except docker.errors.ContainerError as e:
+            return {
+                "success": False,
+                "output": "",
+                "error": e.stderr.decode("utf-8", errors="replace") if e.stderr else str(e)
+            }
+    
+    def _build_image(
+        self,
+        temp_path: Path,
+        image_tag: str,
+        nocache: bool = False,
+        labels: Optional[Dict[str, str]] = None
+    ):
+        """Build the execution image from a prepared build context"""
+        self.client.images.build(
+            path=str(temp_path),
+            tag=image_tag,
+            rm=True,
+            forcerm=True,  # Remove intermediate containers even when the build fails
+            quiet=True,
+            nocache=nocache,
+            labels=labels
+        )
+    
+    def _run_container(
+        self,
+        image_tag: str,
+        limits: Dict[str, Any],
+        requirements: Optional[list] = None,
+        command: str = "python main.py",
+        environment: Optional[Dict[str, str]] = None,
+        files: Optional[Dict[str, str]] = None,
+        role: str = "exec",
+        user: str = "runner",
+        file_modes: Optional[Dict[str, int]] = None
+    ):
+        """Create and start the execution container with its output stream attached.
+        
+        files ({name: content}) are copied into /app before the start, for
+        runs that reuse an existing image instead of building one; they are
+        root-owned, 0o644 unless file_modes says otherwise, and run as user.
+        """
+        container = self.client.containers.create(
+            image_tag,
+            command=command,
+            mem_limit=limits["mem_limit"],
+            memswap_limit=limits["mem_limit"],  # No swap on top of the memory limit
+            nano_cpus=int(limits["cpus"] * 1e9),
+            pids_limit=limits["pids_limit"],
+            # Stable set/dict ordering across runs
+            environment={"PYTHONHASHSEED": "0", **(environment or {})},
+            network_disabled=self._should_disable_network(requirements),
+            labels={SANDBOX_LABEL: role, OWNER_LABEL: sandbox_owner()},
+            **({"user": user, "working_dir": "/app"} if files else {})
+        )
+        if files:
+            container.put_archive("/app", self._files_archive(files, file_modes))
+        # Attach before starting so no output is missed, even for short runs
+        stream = container.attach(stdout=True, stderr=True, stream=True, logs=True, demux=True)
+        container.start()
+        return container, stream
+    
+    def _files_archive(self, files: Dict[str, str], modes: Optional[Dict[str, int]] = None) -> bytes:
+        """Tar archive of {name: content} for put_archive; names may include one directory"""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as archive:
+            for directory in sorted({name.rsplit("/", 1)[0] for name in files if "/" in name}):
+                info = tarfile.TarInfo(directory)
+                info.type = tarfile.DIRTYPE
+                info.mode = 0o755
+                info.mtime = int(time.time())
+                archive.addfile(info)
+            for name, content in files.items():
+                data = content.encode("utf-8")
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mode = (modes or {}).get(name, 0o644)
+                info.mtime = int(time.time())
+                archive.addfile(info, io.BytesIO(data))
+        return buffer.getvalue()
+    
+    def _capture_output(self, container, stream) -> OutputCapture:
+        """Read the container's output incrementally, stopping it once the cap is hit"""
+        capture = OutputCapture(self.max_output_bytes, self.max_output_lines)
+        for stdout_chunk, stderr_chunk in stream:
+            if not (capture.feed("stdout", stdout_chunk) and capture.feed("stderr", stderr_chunk)):
+                try:
+                    container.kill()
+                except Exception:
+                    pass  # Already exited
+                break
+        return capture
+    
+    def _remove_container(self, container):
+        """Remove an execution container, ignoring failures"""
+        try:
+            container.remove(force=True)
+        except Exception:
+            pass
+    
+    def _remove_image(self, image_tag: str):
+        """Remove an execution image, ignoring failures"""
+        try:
+            self.client.images.remove(image_tag, force=True)
+        except Exception:
+            pass  # Image cleanup is not critical
     
     def _should_disable_network(self, requirements: Optional[list] = None) -> bool:
         """Determine if network should be disabled based on requirements"""
-        if not requirements:
-            return True
-        
-        # Some packages might need network access during execution
-        network_packages = {'plotly', 'requests'}
-        return not any(pkg in network_packages for pkg in requirements)
+        return network_disabled(requirements)
     
-    def _create_dockerfile(self, has_requirements: bool) -> str:
-        """Create Dockerfile content for code execution"""
-        dockerfile = """FROM python:3.11-slim
+    def _create_base_dockerfile(self) -> str:
+        """Create Dockerfile content for the shared sandbox base image"""
+        return """FROM python:3.11-slim
 
 # Install system dependencies for ML packages
 RUN apt-get update && apt-get install -y \\
@@ -152,57 +976,169 @@ RUN apt-get update && apt-get install -y \\
     liblapack-dev \\
     && rm -rf /var/lib/apt/lists/*
 
+# Upgrade pip once here rather than on every build
+RUN pip install --no-cache-dir --upgrade pip
+
+# Set up non-root user for security
+RUN useradd -m -u 1000 runner
+
 # Set working directory
 WORKDIR /app
+"""
+    
+    def _create_deps_dockerfile(self, base_image: str, use_wheelhouse: bool) -> str:
+        """Create Dockerfile content for a requirement-set image"""
+        dockerfile = f"""FROM {base_image}
 
-# Copy files
-COPY . .
-
-# Install requirements if needed
+COPY requirements.txt /tmp/requirements.txt
 """
         
-        if has_requirements:
-            dockerfile += """# Upgrade pip first
-RUN pip install --upgrade pip
-RUN pip install --no-cache-dir -r requirements.txt
+        if use_wheelhouse:
+            # Offline install from the local wheelhouse
+            dockerfile += """COPY wheels /tmp/wheels
+RUN pip install --no-cache-dir --no-index --find-links /tmp/wheels -r /tmp/requirements.txt \\
+    && rm -rf /tmp/wheels
+"""
+        else:
+            dockerfile += """RUN pip install --no-cache-dir -r /tmp/requirements.txt
 """
         
-        dockerfile += """
-# Set up non-root user for security
-RUN useradd -m -u 1000 runner
+        return dockerfile
+    
+    def _create_dockerfile(self, parent_image: str = BASE_IMAGE) -> str:
+        """Create Dockerfile content for code execution"""
+        return f"""FROM {parent_image}
+
+# Copy files
+COPY main.py .
+
 USER runner
 
 # Default command
 CMD ["python", "main.py"]
 """
-        
-        return dockerfile
     
     def execute_web_app(
         self, 
         code: str, 
         app_type: str = "flask",
-        timeout: int = 60
+        timeout: int = 60,
+        routes: Optional[list] = None
     ) -> Dict[str, Any]:
-        """Execute a web application and return status"""
+        """Serve a learner's web app in a sandbox and request its routes.
+        
+        The app runs in the warm framework image (no per-run build) with the
+        network disabled; sandbox_web_probe.py serves it on loopback inside the
+        container and requests each route ({"method", "path", "body",
+        "headers"}), so status, latency and body come back per route.
+        """
         
-        if not self.available:
+        if not self.is_available():
             return {
                 "success": False,
                 "output": "",
                 "error": "Docker is not available"
             }
         
-        requirements = []
-        if app_type == "flask":
-            requirements = ["flask"]
-        elif app_type == "fastapi":
-            requirements = ["fastapi", "uvicorn"]
+        if app_type not in WEB_APP_FRAMEWORKS:
+            return {
+                "success": False,
+                "output": "",
+                "error": f"Unsupported app type '{app_type}'"
+            }
+        
+        routes = (routes or [{"method": "GET", "path": "/"}])[:WEB_APP_MAX_ROUTES]
+        marker = f"__PYLINGO_PROBES_{os.urandom(8).hex()}__"
+        
+        try:
+            image_tag = self._ensure_deps_image(WEB_APP_FRAMEWORKS[app_type])
+        except Exception as e:
+            return {
+                "success": False,
+                "output": "",
+                "error": f"Failed to build Docker image: {str(e)}"
+            }
+        
+        limits = RESOURCE_PROFILES["standard"]
+        container = None
+        deadline = None
+        try:
+            container, stream = self._run_container(
+                image_tag,
+                limits,
+                command="python sandbox_web_probe.py",
+                role="webapp",
+                # The harness stays root so learner code (run as runner) cannot read the marker
+                user="root",
+                environment={
+                    "PYLINGO_FRAMEWORK": app_type,
+                    "PYLINGO_ROUTES": json.dumps(routes),
+                    "PYLINGO_MAX_BODY": str(WEB_APP_MAX_BODY_BYTES),
+                    "PYLINGO_STARTUP_TIMEOUT": str(min(10, timeout)),
+                    # The harness reports and exits on its own before wait() gives up
+                    "PYLINGO_DEADLINE": str(max(1, timeout - 2)),
+                },
+                files={
+                    "main.py": code,
+                    "sandbox_web_probe.py": WEB_PROBE_SCRIPT.read_text(),
+                    ".probe_marker": marker,
+                },
+                file_modes={".probe_marker": 0o400}
+            )
+            self._count("runs")
+            # The harness has its own watchdog; this backstop covers a wedged harness
+            deadline = Deadline(container, timeout + DEADLINE_GRACE)
+            monitor = ResourceMonitor(container)
+            monitor.start()
+            capture = self._capture_output(container, stream)
+            container.wait(timeout=30)
+            resources = monitor.stop()
+            resources["limits"] = limits
+        except Exception as e:
+            return {
+                "success": False,
+                "output": "",
+                "error": f"Execution failed: {str(e)}"
+            }
+        finally:
+            if deadline is not None:
+                deadline.cancel()
+            if container is not None:
+                self._remove_container(container)
+        if deadline.fired:
+            self._count("deadline_kills")
+        
+        # The harness reports on a marker line only learner code cannot know;
+        # the last one wins, since the harness writes it right before exiting
+        report = None
+        stderr_lines = []
+        for line in capture.text("stderr").splitlines():
+            if line.startswith(marker):
+                report = json.loads(line[len(marker):])
+            else:
+                stderr_lines.append(line)
+        app_stderr = "\n".join(stderr_lines).strip()
         
-        # For web apps, we'll just test if they can start without errors
-        test_code = code + "\n\n# Test if app can be created\nprint('Web app created successfully!')"
+        if report is None:
+            error = "Output limit exceeded; execution stopped" if capture.truncated else "App exited before it could be probed"
+            report = {"error": error}
+        probes = report.get("probes", [])
+        error = report.get("error") or ""
+        failed = [p for p in probes if p.get("status") is None or p["status"] >= 500]
+        if failed and not error:
+            error = f"{len(failed)} of {len(probes)} requests failed"
+        if error and app_stderr:
+            error = f"{error}\n{app_stderr}"
         
-        return self.execute_python_code(test_code, timeout, requirements)
+        return {
+            "success": not error,
+            "output": capture.text("stdout").strip(),
+            "error": error,
+            "startup_ms": report.get("startup_ms"),
+            "probes": probes,
+            "truncated": capture.truncated,
+            "resources": resources
+        }
 
-# Global instance
-docker_executor = DockerExecutor()
\ No newline at end of file
+# Global instance; nothing connects to Docker until the first probe
+docker_executor = DockerExecutor(result_cache=execution_cache)
\ No newline at end of file
@@ -0,0 +1,153 @@
+import ast
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+# Cached results expire after this many seconds
+EXECUTION_CACHE_TTL = int(os.getenv("EXECUTION_CACHE_TTL", "3600"))
+# Size bounds; least recently used entries are evicted first
+EXECUTION_CACHE_MAX_ENTRIES = int(os.getenv("EXECUTION_CACHE_MAX_ENTRIES", "2048"))
+EXECUTION_CACHE_MAX_BYTES = int(os.getenv("EXECUTION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Submissions importing any of these can produce different output per run
+NONDETERMINISTIC_MODULES = {
+    "random", "secrets", "uuid", "time", "datetime", "os", "sys", "platform",
+    "socket", "ssl", "http", "urllib", "urllib3", "requests", "httpx", "aiohttp",
+    "subprocess", "threading", "multiprocessing", "asyncio", "concurrent",
+}
+
+# Attribute/function names that pull in randomness or wall-clock time even
+# from otherwise deterministic libraries (np.random, torch.rand, ...)
+NONDETERMINISTIC_NAMES = {
+    "random", "rand", "randn", "randint", "randperm", "shuffle", "seed",
+    "manual_seed", "urandom", "now", "today", "utcnow", "input", "id",
+}
+
+# Timeouts are bucketed so nearby values share cache entries
+TIMEOUT_CLASSES = (10, 30, 60)
+
+
+def is_deterministic(code: str) -> bool:
+    """Conservative AST scan: True only if the code has no obvious source of
+    randomness, time or network access."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        # Let the sandbox report the syntax error
+        return False
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(alias.name.split(".")[0] in NONDETERMINISTIC_MODULES for alias in node.names):
+                return False
+        elif isinstance(node, ast.ImportFrom):
+            module = (node.module or "").split(".")[0]
+            if module in NONDETERMINISTIC_MODULES:
+                return False
+            if any(alias.name in NONDETERMINISTIC_NAMES for alias in node.names):
+                return False
+        elif isinstance(node, ast.Attribute) and node.attr in NONDETERMINISTIC_NAMES:
+            return False
+        elif isinstance(node, ast.Name) and node.id in NONDETERMINISTIC_NAMES:
+            return False
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "__import__":
+            return False
+
+    return True
+
+
+def timeout_class(timeout: int) -> int:
+    for bucket in TIMEOUT_CLASSES:
+        if timeout <= bucket:
+            return bucket
+    return TIMEOUT_CLASSES[-1]
+
+
+class ExecutionCache:
+    """In-process TTL + LRU cache for results of deterministic submissions"""
+
+    def __init__(
+        self,
+        ttl: int = EXECUTION_CACHE_TTL,
+        max_entries: int = EXECUTION_CACHE_MAX_ENTRIES,
+        max_bytes: int = EXECUTION_CACHE_MAX_BYTES
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, size, result)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(
+        code: str,
+        requirements: Optional[list],
+        timeout: int,
+        image_digest: str,
+        resource_profile: str
+    ) -> str:
+        payload = json.dumps(
+            [code, sorted(requirements or []), timeout_class(timeout), image_digest, resource_profile],
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, size, result = entry
+            if expires_at < time.monotonic():
+                self._evict(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(result)
+
+    def put(self, key: str, result: Dict[str, Any]):
+        size = len(result.get("output", "")) + len(result.get("error", ""))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, dict(result))
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+# Global instance
+execution_cache = ExecutionCache()
@@ -0,0 +1,83 @@
+# Sandbox executor service. Runs on hosts with a Docker socket so API
+# workers (main.py with SANDBOX_EXECUTOR_URL set) never block on sandbox
+# builds and runs. Not meant to be exposed publicly.
+import asyncio
+import hmac
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Header, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from docker_executor import DOCKER_PROBE_INTERVAL, SANDBOX_REAP_INTERVAL
+from sandbox_scheduler import sandbox_executor
+from remote_executor import SANDBOX_EXECUTOR_TOKEN
+
+# Without a token anyone who can reach the port can run code, so the service
+# refuses to start unless this is set explicitly (local development only)
+SANDBOX_EXECUTOR_INSECURE = os.getenv("SANDBOX_EXECUTOR_INSECURE", "false").lower() == "true"
+if not SANDBOX_EXECUTOR_TOKEN and not SANDBOX_EXECUTOR_INSECURE:
+    raise RuntimeError("SANDBOX_EXECUTOR_TOKEN is not set (set SANDBOX_EXECUTOR_INSECURE=true to run without one locally)")
+
+async def _probe_docker_periodically():
+    while True:
+        await asyncio.to_thread(sandbox_executor.probe)
+        await asyncio.sleep(DOCKER_PROBE_INTERVAL)
+
+async def _reap_sandboxes_periodically():
+    while True:
+        await asyncio.sleep(SANDBOX_REAP_INTERVAL)
+        if sandbox_executor.is_available():
+            try:
+                await asyncio.to_thread(sandbox_executor.reap)
+            except Exception as e:
+                print(f"Sandbox reaper failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = [
+        asyncio.create_task(_probe_docker_periodically()),
+        asyncio.create_task(_reap_sandboxes_periodically()),
+    ]
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.to_thread(sandbox_executor.shutdown)
+
+app = FastAPI(title="PyLingo Executor", version="0.1.0", lifespan=lifespan)
+
+def verify_token(x_executor_token: str = Header(default="")):
+    if not SANDBOX_EXECUTOR_TOKEN and SANDBOX_EXECUTOR_INSECURE:
+        return
+    if not hmac.compare_digest(x_executor_token.encode(), SANDBOX_EXECUTOR_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid executor token")
+
+@app.get("/status", dependencies=[Depends(verify_token)])
+async def executor_status():
+    return {"available": sandbox_executor.is_available()}
+
+@app.get("/metrics", dependencies=[Depends(verify_token)])
+async def executor_metrics():
+    return sandbox_executor.metrics()
+
+@app.post("/execute/python", dependencies=[Depends(verify_token)])
+async def execute_python(request: dict):
+    return await run_in_threadpool(
+        sandbox_executor.execute_python_code,
+        request.get("code", ""),
+        min(request.get("timeout", 30), 60),
+        request.get("requirements", []),
+        request.get("resource_profile", "basic")
+    )
+
+@app.post("/execute/webapp", dependencies=[Depends(verify_token)])
+async def execute_webapp(request: dict):
+    return await run_in_threadpool(
+        sandbox_executor.execute_web_app,
+        request.get("code", ""),
+        request.get("app_type", "flask"),
+        min(request.get("timeout", 60), 120),
+        request.get("routes") or []
+    )
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8100)
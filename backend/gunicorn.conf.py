@@ -0,0 +1,49 @@
+# Production server profile: gunicorn managing uvicorn workers.
+#
+#   gunicorn main:app -c gunicorn.conf.py                  # API
+#   gunicorn executor_service:app -c gunicorn.conf.py -w 2  # sandbox executor
+#
+# Settings can be overridden with the environment variables below or with
+# command-line flags.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# Comma-separated proxy addresses whose X-Forwarded-For/-Proto headers are
+# trusted. request.client (which the per-IP rate limits key on) is the
+# rightmost X-Forwarded-For entry not added by one of these. The default
+# trusts only a local proxy; list the real proxy addresses in deployment.
+# Never use "*": uvicorn then takes the leftmost, client-supplied entry, so
+# clients could pick their own rate-limit key. See DEPLOYMENT.md.
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+if "*" in [address.strip() for address in forwarded_allow_ips.split(",")]:
+    raise RuntimeError("FORWARDED_ALLOW_IPS must list proxy addresses, not '*' (see DEPLOYMENT.md)")
+
+# Async workers: one event loop per core is enough
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master so workers share its pages copy-on-write
+preload_app = True
+
+# Recycle workers after N requests (with jitter so they don't all restart
+# together) to bound slow memory growth
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# Sandbox runs can take up to a minute on the executor service
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "90"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    # Connections must not be shared across processes; drop any the master
+    # may have opened while preloading
+    from database import engine, replica_router
+    engine.dispose(close=False)
+    replica_router.dispose()
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import orjson
+
+from compression import brotli, compress
+
+# Seconds before a cached track payload is rebuilt. Invalidation is per
+# process, so this bounds staleness across gunicorn workers.
+LESSON_CACHE_TTL = int(os.getenv("LESSON_CACHE_TTL", "300"))
+# Track payloads kept per process; the least recently used is dropped beyond this
+LESSON_CACHE_MAX_TRACKS = int(os.getenv("LESSON_CACHE_MAX_TRACKS", "256"))
+
+class CachedPayload:
+    """A serialized response body with its pre-compressed variants"""
+    
+    def __init__(self, data):
+        self.identity = orjson.dumps(data)
+        self.etag = '"' + hashlib.sha256(self.identity).hexdigest()[:32] + '"'
+        self.variants: Dict[str, bytes] = {"gzip": compress(self.identity, "gzip")}
+        if brotli is not None:
+            self.variants["br"] = compress(self.identity, "br")
+        self.expires_at = time.monotonic() + LESSON_CACHE_TTL
+    
+    def body(self, encoding: Optional[str]) -> bytes:
+        if encoding in self.variants:
+            return self.variants[encoding]
+        return self.identity
+
+class LessonCache:
+    """Per-track cache of /api/tracks/{id}/lessons payloads and the catalog size"""
+    
+    def __init__(self, max_tracks: int = LESSON_CACHE_MAX_TRACKS):
+        self.max_tracks = max_tracks
+        self._payloads: "OrderedDict[int, CachedPayload]" = OrderedDict()
+        self._lesson_count: Optional[int] = None
+        self._lesson_count_expires_at = 0.0
+        self._lock = threading.Lock()
+    
+    def get(self, track_id: int, build: Callable[[], Optional[object]]) -> Optional[CachedPayload]:
+        """Return the cached payload for a track, building it with build() on a miss.
+        
+        build() returns None for a track with no lessons; that is passed on
+        and not cached, so arbitrary track ids cannot fill the cache.
+        """
+        with self._lock:
+            payload = self._payloads.get(track_id)
+            if payload is not None:
+                self._payloads.move_to_end(track_id)
+        if payload is None or payload.expires_at < time.monotonic():
+            data = build()
+            if data is None:
+                return None
+            payload = CachedPayload(data)
+            with self._lock:
+                self._payloads[track_id] = payload
+                self._payloads.move_to_end(track_id)
+                while len(self._payloads) > self.max_tracks:
+                    self._payloads.popitem(last=False)
+        return payload
+    
+    def lesson_count(self, count: Callable[[], int]) -> int:
+        """Total number of lessons in the catalog, recounted with count() on a miss"""
+        if self._lesson_count is None or self._lesson_count_expires_at < time.monotonic():
+            self._lesson_count = count()
+            self._lesson_count_expires_at = time.monotonic() + LESSON_CACHE_TTL
+        return self._lesson_count
+    
+    def invalidate(self, track_id: Optional[int] = None):
+        """Drop one track's payload, or everything when track_id is None"""
+        with self._lock:
+            self._lesson_count = None
+            if track_id is None:
+                self._payloads.clear()
+            else:
+                self._payloads.pop(track_id, None)
+
+# Global instance
+lesson_cache = LessonCache()
@@ -0,0 +1,217 @@
+"""
+Bulk lesson import/export as NDJSON (one LessonCreate object per line).
+
+Imports are validated with the LessonCreate schema and upserted by
+(track_id, order_in_track) in batches, one transaction per batch, so
+re-running an import is idempotent.
+
+Usage:
+    python lesson_io.py import curriculum.ndjson --batch-size 500
+    python lesson_io.py export --track-id 1 > track1.ndjson
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import Lesson, Track
+from schemas import LessonCreate
+from docker_executor import RESOURCE_PROFILES
+
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+# Columns overwritten when a lesson with the same (track_id, order_in_track) exists
+UPSERT_COLUMNS = (
+    "title", "description", "initial_code", "expected_output",
+    "hints", "validation_rules", "concepts", "resource_profile",
+)
+
+
+def lesson_row(lesson: LessonCreate) -> Dict[str, Any]:
+    """Map a validated lesson to a lessons table row (JSON fields stored as text)"""
+    return {
+        "title": lesson.title,
+        "description": lesson.description,
+        "initial_code": lesson.initial_code,
+        "expected_output": lesson.expected_output,
+        "hints": json.dumps(lesson.hints),
+        "validation_rules": json.dumps(lesson.validation_rules),
+        "concepts": json.dumps(lesson.concepts),
+        "order_in_track": lesson.order_in_track,
+        "track_id": lesson.track_id,
+        "resource_profile": lesson.resource_profile,
+    }
+
+
+class LessonImporter:
+    """Streaming NDJSON importer: feed lines, rows are upserted a batch at a time"""
+
+    def __init__(self, db: Session, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self.imported = 0
+        self.batches = 0
+        self.errors: List[Dict[str, Any]] = []
+        self._line_no = 0
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_lines: List[int] = []
+        self._known_tracks = set()
+
+    def add_line(self, line: str):
+        self._line_no += 1
+        line = line.strip()
+        if not line:
+            return
+
+        try:
+            lesson = LessonCreate.model_validate_json(line)
+        except ValidationError as e:
+            self._error(self._line_no, str(e))
+            return
+        if lesson.resource_profile not in RESOURCE_PROFILES:
+            self._error(self._line_no, f"Unknown resource profile '{lesson.resource_profile}'")
+            return
+
+        self._pending.append(lesson_row(lesson))
+        self._pending_lines.append(self._line_no)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def add_lines(self, lines: Iterable[str]):
+        for line in lines:
+            self.add_line(line)
+
+    def flush(self):
+        """Upsert the pending batch in a single transaction"""
+        if not self._pending:
+            return
+
+        rows, line_numbers = self._pending, self._pending_lines
+        self._pending, self._pending_lines = [], []
+
+        # Drop rows pointing at tracks that do not exist
+        missing = self._missing_tracks({row["track_id"] for row in rows})
+        if missing:
+            kept = []
+            for row, line_no in zip(rows, line_numbers):
+                if row["track_id"] in missing:
+                    self._error(line_no, f"Track {row['track_id']} does not exist")
+                else:
+                    kept.append(row)
+            rows = kept
+
+        # Later lines win when a batch repeats the same natural key
+        rows = list({(row["track_id"], row["order_in_track"]): row for row in rows}.values())
+        if not rows:
+            return
+
+        try:
+            self.db.execute(self._upsert_statement(), rows)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        self.imported += len(rows)
+        self.batches += 1
+
+    def finish(self) -> Dict[str, Any]:
+        self.flush()
+        return {
+            "imported": self.imported,
+            "batches": self.batches,
+            "lines": self._line_no,
+            "errors": self.errors,
+        }
+
+    def _upsert_statement(self):
+        dialect = self.db.bind.dialect.name
+        if dialect == "postgresql":
+            insert = postgresql.insert
+        elif dialect == "sqlite":
+            insert = sqlite.insert
+        else:
+            raise RuntimeError(f"Bulk lesson import is not supported on {dialect}")
+
+        stmt = insert(Lesson)
+        return stmt.on_conflict_do_update(
+            index_elements=["track_id", "order_in_track"],
+            set_={column: stmt.excluded[column] for column in UPSERT_COLUMNS},
+        )
+
+    def _missing_tracks(self, track_ids: set) -> set:
+        unknown = track_ids - self._known_tracks
+        if unknown:
+            found = set(self.db.scalars(select(Track.id).where(Track.id.in_(unknown))))
+            self._known_tracks |= found
+            unknown -= found
+        return unknown
+
+    def _error(self, line_no: int, message: str):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_no, "error": message})
+
+
+def export_lessons(db: Session, track_id: Optional[int] = None, chunk_size: int = DEFAULT_BATCH_SIZE) -> Iterator[str]:
+    """Yield lessons as NDJSON lines, reading in server-side chunks"""
+    query = select(Lesson).order_by(Lesson.track_id, Lesson.order_in_track)
+    if track_id is not None:
+        query = query.where(Lesson.track_id == track_id)
+
+    for lesson in db.scalars(query.execution_options(yield_per=chunk_size)):
+        yield json.dumps({
+            "title": lesson.title,
+            "description": lesson.description,
+            "initial_code": lesson.initial_code,
+            "expected_output": lesson.expected_output,
+            "hints": json.loads(lesson.hints) if lesson.hints else [],
+            "validation_rules": json.loads(lesson.validation_rules) if lesson.validation_rules else {},
+            "concepts": json.loads(lesson.concepts) if lesson.concepts else [],
+            "order_in_track": lesson.order_in_track,
+            "track_id": lesson.track_id,
+            "resource_profile": lesson.resource_profile or "basic",
+        }) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk lesson import/export (NDJSON)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Import lessons from an NDJSON file ('-' for stdin)")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    export_parser = subparsers.add_parser("export", help="Export lessons as NDJSON to stdout")
+    export_parser.add_argument("--track-id", type=int)
+
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.command == "import":
+            stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+            with stream:
+                importer = LessonImporter(db, args.batch_size)
+                importer.add_lines(stream)
+                result = importer.finish()
+            print(json.dumps(result, indent=2), file=sys.stderr)
+            if result["errors"]:
+                sys.exit(1)
+        else:
+            for line in export_lessons(db, args.track_id):
+                sys.stdout.write(line)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Full-text lesson search over title, concepts and description.
+
+Backed by the index created in migration 0006: an FTS5 table kept in sync by
+triggers on SQLite, a generated tsvector column with a GIN index on
+PostgreSQL. Words are indexed unstemmed and every query word matches as a
+prefix ("vari" finds "variables"), so results update as the learner types;
+title matches rank above concept matches, which rank above description
+matches.
+
+Usage:
+    python lesson_search.py "for loop" --concept loops
+    python lesson_search.py --rebuild
+"""
+
+import argparse
+import html
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+MAX_QUERY_TERMS = 8
+MAX_FACETS = 20
+# bm25 column weights (SQLite): title, concepts, description
+SQLITE_RANK = "bm25(10.0, 4.0, 1.0)"
+# The database wraps matches in these private-use characters; the snippet is
+# then HTML-escaped and only they become tags, so lesson text (which imports
+# can set) never reaches the client as markup
+HIGHLIGHT = ("\ue000", "\ue001")
+
+# Facet drill-down: lessons whose concepts JSON array contains :concept
+CONCEPT_FILTERS = {
+    "sqlite": " AND EXISTS (SELECT 1 FROM json_each(l.concepts) WHERE value = :concept)",
+    "postgresql": " AND EXISTS (SELECT 1 FROM json_array_elements_text(l.concepts::json) c WHERE c = :concept)",
+}
+
+
+def query_terms(query: str) -> List[str]:
+    """Lower-cased words of a user query; punctuation and operators are dropped"""
+    return re.findall(r"\w+", query.lower())[:MAX_QUERY_TERMS]
+
+
+def highlight_html(snippet: Optional[str]) -> str:
+    """Escaped snippet text with matches wrapped in <mark>"""
+    escaped = html.escape(snippet or "")
+    return escaped.replace(HIGHLIGHT[0], "<mark>").replace(HIGHLIGHT[1], "</mark>")
+
+
+def match_expression(terms: List[str], dialect: str) -> str:
+    """Every term must match as a word prefix"""
+    if dialect == "postgresql":
+        return " & ".join(f"{term}:*" for term in terms)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _sqlite_statements(filters: str) -> Dict[str, str]:
+    # CROSS JOIN keeps lessons_fts as the outer loop (SQLite does not reorder
+    # it), so filters never turn into one MATCH per lessons row
+    matched = (
+        "FROM lessons_fts CROSS JOIN lessons l ON l.id = lessons_fts.rowid "
+        f"WHERE lessons_fts MATCH :match{filters}"
+    )
+    return {
+        # Ordering by the hidden rank column lets FTS5 sort internally, so
+        # snippet() only runs for the rows on the page
+        "hits": (
+            "SELECT l.id, l.track_id, l.order_in_track, l.title, l.concepts, "
+            f"snippet(lessons_fts, 2, '{HIGHLIGHT[0]}', '{HIGHLIGHT[1]}', '…', 16) AS snippet, "
+            "lessons_fts.rank AS rank "
+            f"{matched} AND lessons_fts.rank MATCH '{SQLITE_RANK}' "
+            "ORDER BY lessons_fts.rank LIMIT :limit OFFSET :offset"
+        ),
+        "total": f"SELECT COUNT(*) {matched}",
+        "facets": (
+            "SELECT c.value AS concept, COUNT(*) AS count FROM lessons_fts "
+            "CROSS JOIN lessons l ON l.id = lessons_fts.rowid CROSS JOIN json_each(l.concepts) c "
+            f"WHERE lessons_fts MATCH :match{filters} "
+            "GROUP BY c.value ORDER BY count DESC, concept LIMIT :facets"
+        ),
+    }
+
+
+def _postgres_statements(filters: str) -> Dict[str, str]:
+    matched = f"FROM lessons l, to_tsquery('simple', :match) q WHERE l.search_vector @@ q{filters}"
+    return {
+        # Headlines are only built for the page, not every match
+        "hits": (
+            "SELECT page.id, page.track_id, page.order_in_track, page.title, page.concepts, "
+            "ts_headline('simple', page.description, page.q, "
+            f"'StartSel={HIGHLIGHT[0]}, StopSel={HIGHLIGHT[1]}, MaxWords=16, MinWords=6') AS snippet, "
+            "page.rank FROM ("
+            "SELECT l.id, l.track_id, l.order_in_track, l.title, l.concepts, l.description, q, "
+            f"ts_rank_cd(l.search_vector, q) AS rank {matched} "
+            "ORDER BY rank DESC, l.id LIMIT :limit OFFSET :offset) page ORDER BY page.rank DESC, page.id"
+        ),
+        "total": f"SELECT COUNT(*) {matched}",
+        "facets": (
+            "SELECT c AS concept, COUNT(*) AS count "
+            "FROM lessons l, to_tsquery('simple', :match) q, json_array_elements_text(l.concepts::json) c "
+            f"WHERE l.search_vector @@ q{filters} "
+            "GROUP BY c ORDER BY count DESC, concept LIMIT :facets"
+        ),
+    }
+
+
+def search_lessons(
+    db: Session,
+    query: str,
+    concept: Optional[str] = None,
+    track_id: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> Dict[str, Any]:
+    """Ranked hits for query with highlighted snippets, the total match count
+    and concept facets over all matches (narrowed by concept/track_id)."""
+    terms = query_terms(query)
+    if not terms:
+        return {"query": query, "total": 0, "results": [], "facets": []}
+
+    dialect = "postgresql" if db.bind.dialect.name == "postgresql" else "sqlite"
+    params = {"match": match_expression(terms, dialect), "limit": limit, "offset": offset, "facets": MAX_FACETS}
+
+    filters = ""
+    if track_id is not None:
+        filters += " AND l.track_id = :track_id"
+        params["track_id"] = track_id
+    if concept:
+        filters += CONCEPT_FILTERS[dialect]
+        params["concept"] = concept
+    statements = _postgres_statements(filters) if dialect == "postgresql" else _sqlite_statements(filters)
+
+    hits = db.execute(text(statements["hits"]), params).mappings().all()
+    # Skip the count when the first page already holds every match
+    if offset == 0 and len(hits) < limit:
+        total = len(hits)
+    else:
+        total = db.execute(text(statements["total"]), params).scalar()
+    facets = db.execute(text(statements["facets"]), params).mappings().all()
+
+    return {
+        "query": query,
+        "total": total,
+        "results": [
+            {
+                "id": hit["id"],
+                "track_id": hit["track_id"],
+                "order_in_track": hit["order_in_track"],
+                "title": hit["title"],
+                "concepts": json.loads(hit["concepts"]) if hit["concepts"] else [],
+                "snippet": highlight_html(hit["snippet"]),
+                # bm25 is lower-is-better; report higher-is-better on both backends
+                "score": round(hit["rank"] if dialect == "postgresql" else -hit["rank"], 4),
+            }
+            for hit in hits
+        ],
+        "facets": [{"concept": facet["concept"], "count": facet["count"]} for facet in facets],
+    }
+
+
+def rebuild_index(db: Session):
+    """Re-index every lesson (SQLite only; PostgreSQL's generated column needs no rebuild)"""
+    if db.bind.dialect.name == "sqlite":
+        db.execute(text("INSERT INTO lessons_fts(lessons_fts) VALUES ('rebuild')"))
+        db.execute(text("INSERT INTO lessons_fts(lessons_fts) VALUES ('optimize')"))
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or rebuild the lesson search index")
+    parser.add_argument("query", nargs="?", help="Search terms")
+    parser.add_argument("--concept", help="Only lessons tagged with this concept")
+    parser.add_argument("--track-id", type=int)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--rebuild", action="store_true", help="Re-index all lessons")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.rebuild:
+            rebuild_index(db)
+            print("Lesson search index rebuilt")
+        if args.query:
+            started = time.perf_counter()
+            result = search_lessons(db, args.query, args.concept, args.track_id, args.limit)
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"{result['total']} matches in {elapsed:.1f}ms")
+            for hit in result["results"]:
+                print(f"  [{hit['score']}] {hit['id']}: {hit['title']} — {hit['snippet']}")
+            print("Concepts: " + ", ".join(f"{f['concept']} ({f['count']})" for f in result["facets"]))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,92 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db, create_tables
-from models import Track, Lesson, UserProgress, User, UserPreferences, UserGamification, Achievement, UserAchievement
-from schemas import UserCreate, UserResponse, UserLogin, Token, UserProgressCreate, UserProgressResponse, LessonCreate, LessonResponse, UserPreferencesCreate, UserPreferencesUpdate, UserPreferencesResponse, UserGamificationResponse, AchievementResponse, UserAchievementResponse, StreakUpdateResponse
-from auth import authenticate_user, create_access_token, get_current_user, get_password_hash, get_user_by_username, get_user_by_email
-from docker_executor import docker_executor
+from typing import List, Optional
+from database import get_db, get_read_db, SessionLocal, replica_router
+from replica_router import DATABASE_HEARTBEAT_INTERVAL
+from models import Track, Lesson, LessonPrerequisite, CodeHistory, UserProgress, UserStats, User, UserPreferences, UserGamification, Achievement, UserAchievement
+from schemas import UserCreate, UserResponse, UserLogin, Token, UserProgressCreate, UserProgressResponse, LessonCreate, LessonResponse, UserPreferencesCreate, UserPreferencesUpdate, UserPreferencesResponse, UserGamificationResponse, AchievementResponse, UserAchievementResponse, StreakUpdateResponse, ActivityCalendar, LessonSearchResponse, SkillTreeResponse, LessonPrerequisitesUpdate, RecommendationsResponse, ReviewResult, ReviewItemResponse, UserProgressSummary, UserProgressCode, CodeVersion
+from auth import authenticate_user, create_access_token, get_current_user, get_current_user_read, get_password_hash, get_user_by_username, get_user_by_email
+from docker_executor import RESOURCE_PROFILES, DOCKER_PROBE_INTERVAL, SANDBOX_REAP_INTERVAL
+from sandbox_scheduler import sandbox_executor
+from preflight import preflight_checker, PREFLIGHT_ENABLED
+from remote_executor import RemoteExecutor, SANDBOX_EXECUTOR_URL
+from spaced_repetition import initialize_concepts, record_reviews, due_reviews
+from progress_stats import get_user_stats, record_progress
+from activity_log import activity_bitmaps, activity_calendar, heatmap_bitset, load_bitmap, log_activity, spend_streak_freezes, streak_freezes, user_streaks
+from lesson_io import LessonImporter, export_lessons
+from lesson_search import search_lessons
+from skill_tree import skill_tree_cache, user_skill_tree, set_prerequisites
+from recommendations import recommender
+from code_store import code_store
+from lesson_cache import lesson_cache
+from compression import CompressionMiddleware, negotiate_encoding
+from rate_limit import limit_per_client, limit_per_user
 from datetime import timedelta, datetime
 import json
+import base64
 
-app = FastAPI(title="PyLingo API", version="0.1.0")
+# Sandbox runs go to the executor service when one is configured, otherwise
+# to the local Docker daemon (or the SANDBOX_DOCKER_HOSTS scheduler)
+executor = RemoteExecutor(SANDBOX_EXECUTOR_URL) if SANDBOX_EXECUTOR_URL else sandbox_executor
+
+async def _probe_docker_periodically():
+    """Keep the executor's cached availability fresh without blocking requests"""
+    while True:
+        await asyncio.to_thread(executor.probe)
+        await asyncio.sleep(DOCKER_PROBE_INTERVAL)
+
+def _check_replicas():
+    replica_router.beat()
+    replica_router.check()
+
+async def _check_replicas_periodically():
+    """Stamp the primary's heartbeat and re-measure replica lag"""
+    while True:
+        try:
+            await asyncio.to_thread(_check_replicas)
+        except Exception as e:
+            print(f"Replica lag check failed: {e}")
+        await asyncio.sleep(DATABASE_HEARTBEAT_INTERVAL)
+
+async def _reap_sandboxes_periodically():
+    """Remove orphaned sandbox containers and images (in-process Docker only)"""
+    while True:
+        await asyncio.sleep(SANDBOX_REAP_INTERVAL)
+        if sandbox_executor.is_available():
+            try:
+                await asyncio.to_thread(sandbox_executor.reap)
+            except Exception as e:
+                print(f"Sandbox reaper failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema changes are applied out-of-band with `alembic upgrade head`,
+    # so workers start without touching the database or the Docker socket
+    tasks = [asyncio.create_task(_probe_docker_periodically())]
+    if PREFLIGHT_ENABLED:
+        preflight_checker.warm()
+    if executor is sandbox_executor:
+        tasks.append(asyncio.create_task(_reap_sandboxes_periodically()))
+    if replica_router.replicas:
+        tasks.append(asyncio.create_task(_check_replicas_periodically()))
+    yield
+    for task in tasks:
+        task.cancel()
+    # Warm zygote containers belong to this worker
+    await asyncio.to_thread(sandbox_executor.shutdown)
+    preflight_checker.shutdown()
+
+app = FastAPI(
+    title="PyLingo API",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
 
 import os
 
@@ -36,17 +112,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "Retry-After"],
 )
 
-# Create tables on startup
-create_tables()
+# gzip/brotli for large JSON responses (pre-compressed responses pass through)
+app.add_middleware(CompressionMiddleware)
 
 @app.get("/")
 async def root():
     return {"message": "PyLingo API is running"}
 
 # Authentication endpoints
-@app.post("/api/auth/register", response_model=UserResponse)
+@app.post("/api/auth/register", response_model=UserResponse, dependencies=[Depends(limit_per_client("auth"))])
 async def register(user: UserCreate, db: Session = Depends(get_db)):
     # Check if user already exists
     if get_user_by_username(db, user.username):
@@ -73,7 +150,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     
     return db_user
 
-@app.post("/api/auth/login", response_model=Token)
+@app.post("/api/auth/login", response_model=Token, dependencies=[Depends(limit_per_client("auth"))])
 async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     user = authenticate_user(db, user_credentials.username, user_credentials.password)
     if not user:
@@ -95,17 +172,18 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     }
 
 @app.get("/api/auth/me", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user_read)):
     return current_user
 
 @app.get("/api/tracks")
-async def get_tracks(db: Session = Depends(get_db)):
+async def get_tracks(db: Session = Depends(get_read_db)):
     tracks = db.query(Track).all()
     return {"tracks": tracks}
 
-@app.get("/api/tracks/{track_id}/lessons")
-async def get_track_lessons(track_id: int, db: Session = Depends(get_db)):
+def _format_track_lessons(db: Session, track_id: int) -> Optional[dict]:
     lessons = db.query(Lesson).filter(Lesson.track_id == track_id).order_by(Lesson.order_in_track).all()
+    if not lessons:
+        return None
     
     # Convert JSON strings back to objects
     formatted_lessons = []
@@ -126,6 +204,24 @@ async def get_track_lessons(track_id: int, db: Session = Depends(get_db)):
     
     return {"lessons": formatted_lessons}
 
+@app.get("/api/tracks/{track_id}/lessons")
+async def get_track_lessons(track_id: int, request: Request, db: Session = Depends(get_read_db)):
+    # Served from pre-serialized, pre-compressed cache entries
+    payload = lesson_cache.get(track_id, lambda: _format_track_lessons(db, track_id))
+    if payload is None:
+        # Empty and unknown tracks are answered uncached
+        if db.get(Track, track_id) is None:
+            raise HTTPException(status_code=404, detail="Track not found")
+        return {"lessons": []}
+    if request.headers.get("if-none-match") == payload.etag:
+        return Response(status_code=304, headers={"ETag": payload.etag})
+    
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    headers = {"ETag": payload.etag, "Vary": "Accept-Encoding"}
+    if encoding in payload.variants:
+        headers["Content-Encoding"] = encoding
+    return Response(payload.body(encoding), media_type="application/json", headers=headers)
+
 @app.post("/api/tracks/{track_id}/seed")
 async def seed_track_data(track_id: int, db: Session = Depends(get_db)):
     """Seed the database with initial lesson data"""
@@ -186,10 +282,12 @@ async def seed_track_data(track_id: int, db: Session = Depends(get_db)):
         db.add(lesson)
     
     db.commit()
+    lesson_cache.invalidate(track_id)
+    skill_tree_cache.invalidate()
     return {"message": "Track seeded successfully"}
 
 # User progress endpoints
-@app.post("/api/progress", response_model=UserProgressResponse)
+@app.post("/api/progress", response_model=UserProgressResponse, dependencies=[Depends(limit_per_user("progress"))])
 async def save_progress(
     progress: UserProgressCreate,
     current_user: User = Depends(get_current_user),
@@ -203,12 +301,17 @@ async def save_progress(
     
     if existing_progress:
         # Update existing progress
+        completed_delta = int(bool(progress.completed)) - int(bool(existing_progress.completed))
         existing_progress.completed = progress.completed
-        existing_progress.last_code = progress.last_code
+        code_store.save(db, existing_progress, progress.last_code)
         existing_progress.attempts += 1
         if progress.completed and not existing_progress.completed_at:
             existing_progress.completed_at = datetime.utcnow()
+            _start_concept_reviews(db, current_user.id, progress.lesson_id)
+        record_progress(db, current_user.id, progress.lesson_id, completed_delta)
+        recommender.record_progress(db, current_user.id, progress.lesson_id, completed_delta)
         db.commit()
+        recommender.invalidate(current_user.id)
         db.refresh(existing_progress)
         return existing_progress
     else:
@@ -217,44 +320,146 @@ async def save_progress(
             user_id=current_user.id,
             lesson_id=progress.lesson_id,
             completed=progress.completed,
-            last_code=progress.last_code,
             attempts=1,
             completed_at=datetime.utcnow() if progress.completed else None
         )
+        code_store.save(db, db_progress, progress.last_code)
         db.add(db_progress)
+        if progress.completed:
+            _start_concept_reviews(db, current_user.id, progress.lesson_id)
+        record_progress(db, current_user.id, progress.lesson_id, int(bool(progress.completed)))
+        recommender.record_progress(db, current_user.id, progress.lesson_id, int(bool(progress.completed)))
         db.commit()
+        recommender.invalidate(current_user.id)
         db.refresh(db_progress)
         return db_progress
 
+def _start_concept_reviews(db: Session, user_id: int, lesson_id: int):
+    """Queue a completed lesson's concepts for spaced repetition"""
+    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+    if lesson and lesson.concepts:
+        initialize_concepts(db, user_id, json.loads(lesson.concepts), lesson_id=lesson_id)
+
 @app.get("/api/progress", response_model=List[UserProgressResponse])
 async def get_user_progress(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    since: Optional[datetime] = None,
+    include_code: bool = False,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
 ):
-    progress = db.query(UserProgress).filter(UserProgress.user_id == current_user.id).all()
-    return progress
+    """Progress rows; code is referenced by hash unless include_code is set"""
+    query = db.query(UserProgress).filter(UserProgress.user_id == current_user.id)
+    if since is not None:
+        query = query.filter(UserProgress.updated_at > since)
+    rows = query.all()
+    if not include_code:
+        return rows
+    
+    codes = code_store.load_many(db, (row.code_hash for row in rows))
+    return [
+        dict(UserProgressResponse.model_validate(row).model_dump(), last_code=codes.get(row.code_hash))
+        for row in rows
+    ]
+
+@app.get("/api/progress/summary", response_model=UserProgressSummary)
+async def get_progress_summary(
+    since: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
+):
+    """Compact progress listing (no code); with ?since= only rows changed after it"""
+    synced_at = datetime.utcnow()
+    query = db.query(
+        UserProgress.lesson_id, UserProgress.completed, UserProgress.attempts
+    ).filter(UserProgress.user_id == current_user.id)
+    if since is not None:
+        query = query.filter(UserProgress.updated_at > since)
+    rows = query.order_by(UserProgress.lesson_id).all()
+    
+    bitset = bytearray((len(rows) + 7) // 8)
+    for i, row in enumerate(rows):
+        if row.completed:
+            bitset[i // 8] |= 1 << (i % 8)
+    
+    return {
+        "lesson_ids": [row.lesson_id for row in rows],
+        "completed_bitset": base64.b64encode(bytes(bitset)).decode("ascii"),
+        "attempts": [row.attempts or 0 for row in rows],
+        "synced_at": synced_at
+    }
+
+@app.get("/api/progress/{lesson_id}/code", response_model=UserProgressCode)
+async def get_progress_code(
+    lesson_id: int,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
+):
+    """The user's last saved code for one lesson"""
+    progress = db.query(UserProgress).filter(
+        UserProgress.user_id == current_user.id,
+        UserProgress.lesson_id == lesson_id
+    ).first()
+    if not progress:
+        raise HTTPException(status_code=404, detail="No progress for this lesson")
+    return {"lesson_id": lesson_id, "last_code": code_store.load(db, progress.code_hash)}
+
+@app.get("/api/progress/{lesson_id}/history", response_model=List[CodeVersion])
+async def get_code_history(
+    lesson_id: int,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
+):
+    """Earlier versions of the user's code for one lesson, newest first"""
+    return code_store.history(db, current_user.id, lesson_id)
 
 @app.get("/api/progress/stats")
 async def get_progress_stats(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
 ):
-    total_lessons = db.query(Lesson).count()
-    completed_lessons = db.query(UserProgress).filter(
-        UserProgress.user_id == current_user.id,
-        UserProgress.completed == True
-    ).count()
-    
-    # Calculate streak (simplified - would need daily tracking)
-    streak = 1  # Placeholder
+    # Aggregates are maintained on every progress write (see progress_stats.py)
+    stats = db.get(UserStats, current_user.id)
+    if stats is None:
+        # The first visit builds the row, which needs the primary
+        with SessionLocal(expire_on_commit=False) as primary:
+            stats = get_user_stats(primary, current_user.id)
+    total_lessons = lesson_cache.lesson_count(lambda: db.query(Lesson).count())
+    completed_lessons = stats.completed_lessons
+    # Same streaks as update-streak and the activity calendar
+    current, longest = user_streaks(
+        activity_bitmaps.get(db, current_user.id), datetime.utcnow().date(), streak_freezes(db, current_user.id)
+    )
     
     return {
         "total_lessons": total_lessons,
         "completed_lessons": completed_lessons,
-        "current_streak": streak,
+        "completed_by_track": stats.completed_by_track or {},
+        "current_streak": current,
+        "longest_streak": longest,
         "completion_percentage": (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
     }
 
+# Spaced repetition endpoints
+@app.get("/api/reviews/due", response_model=List[ReviewItemResponse])
+async def get_due_reviews(
+    limit: int = 20,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
+):
+    """Get the next concepts due for review, most overdue first"""
+    return due_reviews(db, current_user.id, min(limit, 100))
+
+@app.post("/api/reviews", response_model=List[ReviewItemResponse])
+async def submit_reviews(
+    results: List[ReviewResult],
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Record review results and reschedule the reviewed concepts"""
+    items = record_reviews(db, current_user.id, {result.concept: result.quality for result in results})
+    db.commit()
+    return items
+
 # Gamification endpoints
 @app.get("/api/user/gamification", response_model=UserGamificationResponse)
 async def get_user_gamification(
@@ -288,10 +493,10 @@ async def update_user_streak(
     db: Session = Depends(get_db)
 ):
     """Update user streak when they complete a lesson"""
-    # Get or create gamification record
+    # Get or create gamification record; locked, since freezes are spent below
     gamification = db.query(UserGamification).filter(
         UserGamification.user_id == current_user.id
-    ).first()
+    ).with_for_update().first()
     
     if not gamification:
         gamification = UserGamification(
@@ -304,40 +509,35 @@ async def update_user_streak(
         )
         db.add(gamification)
     
-    # Calculate streak logic
+    # Streaks come from the activity log, with today counted (see activity_log.py)
     today = datetime.utcnow().date()
     last_activity = gamification.last_activity_date.date() if gamification.last_activity_date else None
+    bitmap = load_bitmap(db, current_user.id)
+    bitmap.mark(today)
+    # Freezes are spent when a completion closes the gap they bridge
+    frozen_days = spend_streak_freezes(db, current_user.id, bitmap, today, gamification.streak_freeze_count or 0)
+    gamification.streak_freeze_count = (gamification.streak_freeze_count or 0) - len(frozen_days)
+    current, longest = user_streaks(bitmap, today)
     
     xp_earned = 10  # Base XP for lesson completion
     level_up = False
     new_level = None
     
-    if last_activity is None:
-        # First activity
-        gamification.current_streak = 1
+    if last_activity != today:
         gamification.last_activity_date = datetime.utcnow()
-    elif last_activity == today:
-        # Already completed lesson today, no streak increase but still earn XP
-        pass
-    elif (today - last_activity).days == 1:
-        # Consecutive day - increase streak
-        gamification.current_streak += 1
-        gamification.last_activity_date = datetime.utcnow()
-        xp_earned += 5  # Bonus XP for maintaining streak
-        
-        # Check for streak milestone bonuses
-        if gamification.current_streak % 7 == 0:  # Weekly milestone
-            xp_earned += 20
-        elif gamification.current_streak % 30 == 0:  # Monthly milestone
-            xp_earned += 100
-    else:
-        # Streak broken - reset
-        gamification.current_streak = 1
-        gamification.last_activity_date = datetime.utcnow()
-    
-    # Update longest streak
-    if gamification.current_streak > gamification.longest_streak:
-        gamification.longest_streak = gamification.current_streak
+        if current > 1:
+            # Streak continued (consecutive day, or a gap bridged by freezes)
+            xp_earned += 5  # Bonus XP for maintaining streak
+            
+            # Check for streak milestone bonuses
+            if current % 7 == 0:  # Weekly milestone
+                xp_earned += 20
+            elif current % 30 == 0:  # Monthly milestone
+                xp_earned += 100
+    
+    gamification.current_streak = current
+    # The log may not cover older history, so the longest streak never drops
+    gamification.longest_streak = max(gamification.longest_streak or 0, longest)
     
     # Add XP and check for level up
     old_level = gamification.current_level
@@ -358,7 +558,10 @@ async def update_user_streak(
         xp_earned += 25  # Level up bonus
         gamification.total_xp += 25
     
+    log_activity(db, current_user.id, xp_earned, lessons=1, day=today)
     db.commit()
+    for day in frozen_days + [today]:
+        activity_bitmaps.mark(current_user.id, day)
     
     return StreakUpdateResponse(
         current_streak=gamification.current_streak,
@@ -368,6 +571,27 @@ async def update_user_streak(
         new_level=new_level
     )
 
+@app.get("/api/user/activity", response_model=ActivityCalendar)
+async def get_user_activity(
+    days: int = 365,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
+):
+    """Activity calendar (heatmap) for the last `days` days"""
+    end = datetime.utcnow().date()
+    start = end - timedelta(days=max(1, min(days, 366 * 5)) - 1)
+    bitmap = activity_bitmaps.get(db, current_user.id)
+    current, longest = user_streaks(bitmap, end, streak_freezes(db, current_user.id))
+    
+    return ActivityCalendar(
+        start=start,
+        end=end,
+        active_bitset=heatmap_bitset(bitmap, start, end),
+        days=activity_calendar(db, current_user.id, start, end),
+        current_streak=current,
+        longest_streak=longest
+    )
+
 # Lesson creation endpoints (admin only for now)
 @app.post("/api/lessons", response_model=LessonResponse)
 async def create_lesson(
@@ -378,6 +602,12 @@ async def create_lesson(
     # For now, any authenticated user can create lessons
     # In production, you'd want admin role checking
     
+    if lesson.resource_profile not in RESOURCE_PROFILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown resource profile '{lesson.resource_profile}'"
+        )
+    
     db_lesson = Lesson(
         title=lesson.title,
         description=lesson.description,
@@ -387,20 +617,70 @@ async def create_lesson(
         validation_rules=json.dumps(lesson.validation_rules),
         concepts=json.dumps(lesson.concepts),
         order_in_track=lesson.order_in_track,
-        track_id=lesson.track_id
+        track_id=lesson.track_id,
+        resource_profile=lesson.resource_profile
     )
     
     db.add(db_lesson)
     db.commit()
     db.refresh(db_lesson)
+    lesson_cache.invalidate(db_lesson.track_id)
+    skill_tree_cache.invalidate()
     
     return db_lesson
 
+@app.post("/api/lessons/import")
+async def import_lessons(
+    request: Request,
+    batch_size: int = 500,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Bulk import/upsert lessons from an NDJSON request body"""
+    importer = LessonImporter(db, max(1, min(batch_size, 5000)))
+    
+    # Feed complete lines to the importer as the body streams in. Its batch
+    # upserts block, so they run in the threadpool, one call at a time.
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if lines:
+            await run_in_threadpool(importer.add_lines, [line.decode("utf-8") for line in lines])
+    if buffer:
+        await run_in_threadpool(importer.add_line, buffer.decode("utf-8"))
+    
+    result = await run_in_threadpool(importer.finish)
+    lesson_cache.invalidate()
+    skill_tree_cache.invalidate()
+    return result
+
+@app.get("/api/lessons/export")
+async def export_lessons_ndjson(
+    track_id: int = None,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
+):
+    """Stream lessons as NDJSON"""
+    return StreamingResponse(export_lessons(db, track_id), media_type="application/x-ndjson")
+
+@app.get("/api/lessons/search", response_model=LessonSearchResponse)
+async def search_lessons_endpoint(
+    q: str,
+    concept: Optional[str] = None,
+    track_id: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0,
+    db: Session = Depends(get_read_db)
+):
+    """Ranked full-text lesson search with prefix matching and concept facets"""
+    return search_lessons(db, q, concept, track_id, max(1, min(limit, 50)), max(0, offset))
+
 @app.get("/api/lessons", response_model=List[LessonResponse])
 async def get_all_lessons(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     lessons = db.query(Lesson).offset(skip).limit(limit).all()
     return lessons
@@ -415,15 +695,58 @@ async def delete_lesson(
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
     
+    db.query(LessonPrerequisite).filter(
+        (LessonPrerequisite.lesson_id == lesson_id) | (LessonPrerequisite.prerequisite_id == lesson_id)
+    ).delete(synchronize_session=False)
+    db.query(CodeHistory).filter(CodeHistory.lesson_id == lesson_id).delete(synchronize_session=False)
     db.delete(lesson)
     db.commit()
+    lesson_cache.invalidate(lesson.track_id)
+    skill_tree_cache.invalidate()
     return {"message": "Lesson deleted successfully"}
 
+@app.put("/api/lessons/{lesson_id}/prerequisites")
+async def update_lesson_prerequisites(
+    lesson_id: int,
+    update: LessonPrerequisitesUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Replace a lesson's prerequisites; an empty list restores the track order"""
+    if not db.query(Lesson.id).filter(Lesson.id == lesson_id).first():
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    
+    try:
+        set_prerequisites(db, lesson_id, update.prerequisite_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"lesson_id": lesson_id, "prerequisite_ids": sorted(set(update.prerequisite_ids))}
+
+@app.get("/api/skill-tree", response_model=SkillTreeResponse)
+async def get_skill_tree(
+    track_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
+):
+    """Lesson prerequisite graph with the user's completed and unlocked lessons"""
+    return user_skill_tree(db, current_user.id, track_id)
+
+@app.get("/api/recommendations", response_model=RecommendationsResponse)
+async def get_recommendations(
+    limit: int = 4,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """The user's precomputed next lessons, best first (see recommendations.py)"""
+    result = recommender.get(db, current_user.id)
+    return {"items": result["items"][:max(0, limit)], "computed_at": result["computed_at"]}
+
 # Docker execution endpoints
-@app.post("/api/execute/docker")
+@app.post("/api/execute/docker", dependencies=[Depends(limit_per_user("execute"))])
 async def execute_docker_code(
     request: dict,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """Execute Python code in a Docker container for advanced lessons"""
     
@@ -434,18 +757,35 @@ async def execute_docker_code(
     if not code.strip():
         return {"success": False, "output": "", "error": "No code provided"}
     
+    # Syntax errors and disallowed imports are reported without a sandbox run;
+    # requirements are inferred from imports when none are given
+    check = await preflight_checker.check(code, requirements)
+    if not check["ok"]:
+        return {"success": False, "output": "", "error": check["error"], "diagnostics": check["diagnostics"]}
+    requirements = check["requirements"]
+    
+    # Sandbox limits come from the lesson's metadata, not from the client
+    lesson = None
+    if request.get("lesson_id") is not None:
+        lesson = db.query(Lesson).filter(Lesson.id == request["lesson_id"]).first()
+    if lesson and lesson.resource_profile:
+        resource_profile = lesson.resource_profile
+    else:
+        resource_profile = "standard" if requirements else "basic"
+    
     # Check if Docker is available
-    if not docker_executor.is_available():
+    if not executor.is_available():
         return {
             "success": False,
             "output": "",
             "error": "Docker execution is not available on this server. Please use browser execution for this lesson."
         }
     
-    result = docker_executor.execute_python_code(code, timeout, requirements)
+    # Sandbox calls block for seconds; keep them off the event loop
+    result = await run_in_threadpool(executor.execute_python_code, code, timeout, requirements, resource_profile)
     return result
 
-@app.post("/api/execute/webapp")
+@app.post("/api/execute/webapp", dependencies=[Depends(limit_per_user("execute"))])
 async def execute_web_app(
     request: dict,
     current_user: User = Depends(get_current_user)
@@ -454,29 +794,52 @@ async def execute_web_app(
     
     code = request.get("code", "")
     app_type = request.get("app_type", "flask")
+    timeout = min(request.get("timeout", 60), 120)
     
     if not code.strip():
         return {"success": False, "output": "", "error": "No code provided"}
     
-    if not docker_executor.is_available():
+    # Web apps need sockets, so only syntax is checked
+    check = await preflight_checker.check(code, network_rules=False)
+    if not check["ok"]:
+        return {"success": False, "output": "", "error": check["error"], "diagnostics": check["diagnostics"]}
+    
+    # Routes to request once the app is serving, e.g. [{"method": "GET", "path": "/"}]
+    routes = request.get("routes") or []
+    if not isinstance(routes, list) or not all(
+        isinstance(route, dict)
+        and str(route.get("path", "")).startswith("/")
+        and str(route.get("method", "GET")).upper() in ("GET", "POST", "PUT", "PATCH", "DELETE")
+        for route in routes
+    ):
+        raise HTTPException(status_code=400, detail="routes must be a list of {method, path} with paths starting with '/'")
+    
+    if not executor.is_available():
         return {
             "success": False,
             "output": "",
             "error": "Docker execution is not available. Web app lessons require Docker."
         }
     
-    result = docker_executor.execute_web_app(code, app_type)
+    result = await run_in_threadpool(executor.execute_web_app, code, app_type, timeout, routes)
     return result
 
 @app.get("/api/docker/status")
 async def docker_status():
     """Check if Docker is available for advanced lessons"""
+    available = executor.is_available()
     return {
-        "available": docker_executor.is_available(),
-        "message": "Docker available for advanced Python lessons" if docker_executor.is_available() 
+        "available": available,
+        "message": "Docker available for advanced Python lessons" if available
                   else "Docker not available - advanced lessons will be limited"
     }
 
+@app.get("/api/docker/metrics")
+async def docker_metrics(current_user: User = Depends(get_current_user)):
+    """Sandbox run, deadline-kill, reaper and pre-flight counters"""
+    metrics = await run_in_threadpool(executor.metrics)
+    return dict(metrics, preflight=preflight_checker.metrics())
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint for load balancers"""
@@ -498,7 +861,9 @@ async def save_user_preferences(
         for field, value in preferences.dict(exclude_unset=True).items():
             setattr(existing_prefs, field, value)
         existing_prefs.updated_at = datetime.utcnow()
+        recommender.refresh(db, current_user.id)
         db.commit()
+        recommender.invalidate(current_user.id)
         db.refresh(existing_prefs)
         return existing_prefs
     else:
@@ -508,14 +873,16 @@ async def save_user_preferences(
             **preferences.dict()
         )
         db.add(db_preferences)
+        recommender.refresh(db, current_user.id)
         db.commit()
+        recommender.invalidate(current_user.id)
         db.refresh(db_preferences)
         return db_preferences
 
 @app.get("/api/preferences", response_model=UserPreferencesResponse)
 async def get_user_preferences(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
 ):
     """Get user preferences"""
     preferences = db.query(UserPreferences).filter(UserPreferences.user_id == current_user.id).first()
@@ -544,7 +911,9 @@ async def update_user_preferences(
             setattr(db_preferences, field, value)
     
     db_preferences.updated_at = datetime.utcnow()
+    recommender.refresh(db, current_user.id)
     db.commit()
+    recommender.invalidate(current_user.id)
     db.refresh(db_preferences)
     return db_preferences
 
@@ -568,6 +937,7 @@ async def get_database_info(db: Session = Depends(get_db)):
         
         return {
             "database_type": "SQLite" if "sqlite" in str(db.bind.url) else "PostgreSQL",
+            "read_routing": replica_router.metrics(),
             "stats": {
                 "users": user_count,
                 "lessons": lesson_count,
@@ -590,4 +960,11 @@ async def get_database_info(db: Session = Depends(get_db)):
 
 if __name__ == "__main__":
     import uvicorn
+    from alembic import command
+    from alembic.config import Config
+    # Local development convenience; deployments run `alembic upgrade head`
+    here = os.path.dirname(os.path.abspath(__file__))
+    config = Config(os.path.join(here, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(here, "migrations"))
+    command.upgrade(config, "head")
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,96 @@
+from logging.config import fileConfig
+
+from alembic import context
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+
+from database import engine
+from models import Base
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Full-text search objects created by raw SQL in 0006; not in the models
+SEARCH_INDEX_OBJECTS = {"lessons_fts", "search_vector", "ix_lessons_search_vector"}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Keep autogenerate from proposing to drop the search index objects"""
+    return not (reflected and compare_to is None and (name in SEARCH_INDEX_OBJECTS or name.startswith("lessons_fts_")))
+
+
+# Tables that only migrations after 0002 create; create_tables() never built them
+POST_BASELINE_TABLES = {
+    "user_stats", "daily_activity", "lesson_prerequisites", "user_recommendations",
+    "code_blobs", "replication_heartbeat",
+}
+
+
+def pre_alembic_revision(connection):
+    """Revision a schema built by create_all() before Alembic matches, or None.
+
+    None when the database is empty or already stamped. Revisions 0002a, 0002b
+    and 0002 were model changes create_all() could have picked up too, so the
+    newest one whose object exists is the one to stamp.
+    """
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    if "alembic_version" in tables or "lessons" not in tables:
+        return None
+    if tables & POST_BASELINE_TABLES:
+        raise RuntimeError(
+            "Database has tables from later migrations but no alembic_version; "
+            "run `alembic stamp <revision>` for the revision it matches"
+        )
+    unique = {constraint["name"] for constraint in inspector.get_unique_constraints("lessons")}
+    if "uq_lessons_track_order" in unique:
+        return "0002"
+    if "review_items" in tables:
+        return "0002b"
+    if "resource_profile" in {column["name"] for column in inspector.get_columns("lessons")}:
+        return "0002a"
+    return "0001"
+
+
+def run_migrations_offline() -> None:
+    """Emit SQL to stdout instead of running against a database"""
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+        render_as_batch=engine.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            # SQLite cannot ALTER constraints in place
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+
+        with context.begin_transaction():
+            baseline = pre_alembic_revision(connection)
+            if baseline is not None:
+                # One-time adoption of a database create_tables() built
+                print(f"Stamping unversioned database at {baseline}")
+                context.get_context().stamp(ScriptDirectory.from_config(config), baseline)
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
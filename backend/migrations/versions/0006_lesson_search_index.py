@@ -0,0 +1,74 @@
+"""lesson search index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 15:49:31.420727
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Title, concepts (JSON text) and description, weighted in that order by
+# lesson_search.py. Unstemmed, since queries are prefix matches.
+SQLITE_COLUMNS = "title, concepts, description"
+
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(concepts, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        # Generated column: kept in sync by Postgres on every insert/update
+        op.execute(f"ALTER TABLE lessons ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({POSTGRES_VECTOR}) STORED")
+        op.execute("CREATE INDEX ix_lessons_search_vector ON lessons USING GIN (search_vector)")
+        return
+
+    # External-content FTS5 table over lessons, maintained by triggers so API
+    # writes, bulk upserts and deletes all stay indexed
+    op.execute(
+        f"CREATE VIRTUAL TABLE lessons_fts USING fts5({SQLITE_COLUMNS}, "
+        "content='lessons', content_rowid='id', tokenize='unicode61', prefix='2 3')"
+    )
+    op.execute(
+        "CREATE TRIGGER lessons_fts_insert AFTER INSERT ON lessons BEGIN "
+        f"INSERT INTO lessons_fts(rowid, {SQLITE_COLUMNS}) VALUES (new.id, new.title, new.concepts, new.description); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER lessons_fts_delete AFTER DELETE ON lessons BEGIN "
+        f"INSERT INTO lessons_fts(lessons_fts, rowid, {SQLITE_COLUMNS}) "
+        "VALUES ('delete', old.id, old.title, old.concepts, old.description); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER lessons_fts_update AFTER UPDATE ON lessons BEGIN "
+        f"INSERT INTO lessons_fts(lessons_fts, rowid, {SQLITE_COLUMNS}) "
+        "VALUES ('delete', old.id, old.title, old.concepts, old.description); "
+        f"INSERT INTO lessons_fts(rowid, {SQLITE_COLUMNS}) VALUES (new.id, new.title, new.concepts, new.description); "
+        "END"
+    )
+    op.execute("INSERT INTO lessons_fts(lessons_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX ix_lessons_search_vector")
+        op.execute("ALTER TABLE lessons DROP COLUMN search_vector")
+        return
+
+    for trigger in ("lessons_fts_insert", "lessons_fts_delete", "lessons_fts_update"):
+        op.execute(f"DROP TRIGGER {trigger}")
+    op.execute("DROP TABLE lessons_fts")
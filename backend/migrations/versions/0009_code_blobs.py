@@ -0,0 +1,149 @@
+"""code blobs
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 16:05:40.212728
+
+"""
+import hashlib
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Existing code is moved with zlib, which code_store.py always reads; blobs
+# below code_store.MIN_COMPRESS_BYTES stay raw
+MIN_COMPRESS_BYTES = 64
+CHUNK_SIZE = 1000
+
+user_progress = sa.table(
+    'user_progress',
+    sa.column('id', sa.Integer),
+    sa.column('last_code', sa.Text),
+    sa.column('code_hash', sa.String),
+)
+code_blobs = sa.table(
+    'code_blobs',
+    sa.column('hash', sa.String),
+    sa.column('codec', sa.String),
+    sa.column('data', sa.LargeBinary),
+    sa.column('size', sa.Integer),
+    sa.column('ref_count', sa.Integer),
+)
+
+
+def _upsert_blobs(bind, blobs) -> None:
+    """Insert a chunk's blobs, adding to ref_count for hashes an earlier chunk stored"""
+    if bind.dialect.name == 'postgresql':
+        insert = postgresql.insert
+    elif bind.dialect.name == 'sqlite':
+        insert = sqlite.insert
+    else:
+        raise RuntimeError(f"Code blobs are not supported on {bind.dialect.name}")
+    stmt = insert(code_blobs).values(list(blobs.values()))
+    bind.execute(stmt.on_conflict_do_update(
+        index_elements=['hash'],
+        set_={'ref_count': code_blobs.c.ref_count + stmt.excluded.ref_count},
+    ))
+
+
+def _move_code_to_blobs(bind) -> None:
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(user_progress.c.id, user_progress.c.last_code)
+            .where(user_progress.c.id > last_id, user_progress.c.last_code.isnot(None))
+            .order_by(user_progress.c.id).limit(CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        blobs = {}  # hash -> row, for this chunk only
+        updates = []
+        for row_id, code in rows:
+            raw = code.encode('utf-8')
+            digest = hashlib.sha256(raw).hexdigest()
+            if digest in blobs:
+                blobs[digest]['ref_count'] += 1
+            else:
+                compressed = len(raw) >= MIN_COMPRESS_BYTES
+                blobs[digest] = {
+                    'hash': digest,
+                    'codec': 'zlib' if compressed else 'raw',
+                    'data': zlib.compress(raw, 9) if compressed else raw,
+                    'size': len(raw),
+                    'ref_count': 1,
+                }
+            updates.append({'row_id': row_id, 'digest': digest})
+        _upsert_blobs(bind, blobs)
+        bind.execute(
+            user_progress.update().where(user_progress.c.id == sa.bindparam('row_id'))
+            .values(code_hash=sa.bindparam('digest')),
+            updates
+        )
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    op.create_table('code_blobs',
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('codec', sa.String(length=8), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('hash')
+    )
+    op.create_table('code_history',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('lesson_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('codec', sa.String(length=8), nullable=False),
+    sa.Column('delta', sa.LargeBinary(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('saved_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['lesson_id'], ['lessons.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'lesson_id', 'version')
+    )
+    with op.batch_alter_table('user_progress', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('code_hash', sa.String(length=64), nullable=True))
+
+    _move_code_to_blobs(op.get_bind())
+
+    with op.batch_alter_table('user_progress', schema=None) as batch_op:
+        batch_op.create_foreign_key('fk_user_progress_code_hash', 'code_blobs', ['code_hash'], ['hash'])
+        batch_op.drop_column('last_code')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user_progress', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_code', sa.TEXT(), nullable=True))
+
+    bind = op.get_bind()
+    for digest, codec, data in bind.execute(sa.select(code_blobs.c.hash, code_blobs.c.codec, code_blobs.c.data)):
+        if codec == 'zstd':
+            import zstandard
+            raw = zstandard.ZstdDecompressor().decompress(data)
+        else:
+            raw = zlib.decompress(data) if codec == 'zlib' else data
+        bind.execute(
+            user_progress.update().where(user_progress.c.code_hash == digest)
+            .values(last_code=raw.decode('utf-8'))
+        )
+
+    with op.batch_alter_table('user_progress', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_user_progress_code_hash', type_='foreignkey')
+        batch_op.drop_column('code_hash')
+
+    op.drop_table('code_history')
+    op.drop_table('code_blobs')
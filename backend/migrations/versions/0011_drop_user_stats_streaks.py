@@ -0,0 +1,33 @@
+"""drop user stats streaks
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 17:02:13.408215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Streaks now come from daily_activity (activity_log.user_streaks)
+    with op.batch_alter_table('user_stats', schema=None) as batch_op:
+        batch_op.drop_column('last_active_date')
+        batch_op.drop_column('longest_streak')
+        batch_op.drop_column('current_streak')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user_stats', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('current_streak', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('longest_streak', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('last_active_date', sa.Date(), nullable=True))
@@ -0,0 +1,31 @@
+"""review items keyset index
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 17:20:45.518364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The rescheduling job pages by (next_review, user_id, concept)
+    with op.batch_alter_table('review_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_review_items_next_review')
+        batch_op.create_index('ix_review_items_next_review', ['next_review', 'user_id', 'concept'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('review_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_review_items_next_review')
+        batch_op.create_index('ix_review_items_next_review', ['next_review'], unique=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, SmallInteger, String, Boolean, Date, DateTime, Float, Text, ForeignKey, JSON, Index, LargeBinary, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -45,11 +45,24 @@ class Lesson(Base):
     concepts = Column(Text)  # JSON string
     order_in_track = Column(Integer, nullable=False)
     track_id = Column(Integer, ForeignKey("tracks.id"), nullable=False)
+    resource_profile = Column(String(20), default="basic")  # Sandbox limits: basic, standard, ml
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     track = relationship("Track", back_populates="lessons")
     user_progress = relationship("UserProgress", back_populates="lesson")
+    
+    __table_args__ = (
+        # Natural key used for idempotent bulk imports
+        UniqueConstraint("track_id", "order_in_track", name="uq_lessons_track_order"),
+    )
+
+class LessonPrerequisite(Base):
+    """Directed edge: lesson_id requires prerequisite_id (see skill_tree.py)"""
+    __tablename__ = "lesson_prerequisites"
+    
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), primary_key=True)
+    prerequisite_id = Column(Integer, ForeignKey("lessons.id"), primary_key=True, index=True)
 
 class UserProgress(Base):
     __tablename__ = "user_progress"
@@ -60,11 +73,39 @@ class UserProgress(Base):
     completed = Column(Boolean, default=False)
     completed_at = Column(DateTime)
     attempts = Column(Integer, default=0)
-    last_code = Column(Text)  # Save user's last attempt
+    code_hash = Column(String(64), ForeignKey("code_blobs.hash"))  # User's last attempt (see code_store.py)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # For delta sync
     
     # Relationships
     user = relationship("User", back_populates="progress")
     lesson = relationship("Lesson", back_populates="user_progress")
+    
+    __table_args__ = (
+        Index("ix_user_progress_user_updated", "user_id", "updated_at"),
+    )
+
+class CodeBlob(Base):
+    """Content-addressed, compressed source text shared by every row that references it"""
+    __tablename__ = "code_blobs"
+    
+    hash = Column(String(64), primary_key=True)  # sha256 of the UTF-8 text
+    codec = Column(String(8), nullable=False)  # raw, zlib or zstd
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)  # Uncompressed bytes
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class CodeHistory(Base):
+    """Earlier versions of a user's code for a lesson, newest kept, reverse-delta encoded"""
+    __tablename__ = "code_history"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), primary_key=True)
+    version = Column(Integer, primary_key=True)
+    codec = Column(String(8), nullable=False)
+    delta = Column(LargeBinary, nullable=False)  # Compressed with the next newer version as dictionary
+    size = Column(Integer, nullable=False)
+    saved_at = Column(DateTime)  # When this version was submitted
 
 class UserPreferences(Base):
     __tablename__ = "user_preferences"
@@ -125,4 +166,62 @@ class UserAchievement(Base):
     
     # Relationships
     user = relationship("User")
-    achievement = relationship("Achievement")
\ No newline at end of file
+    achievement = relationship("Achievement")
+
+class ReviewItem(Base):
+    """Spaced-repetition state for one concept a user has learned (SM-2)"""
+    __tablename__ = "review_items"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    concept = Column(String(64), primary_key=True)
+    lesson_id = Column(Integer, ForeignKey("lessons.id"))  # Lesson that introduced the concept
+    difficulty = Column(Float, default=0.5)  # 0.1 (easy) to 1.0 (hard)
+    interval = Column(Integer, default=1)  # Days until next review
+    repetition = Column(SmallInteger, default=0)  # Consecutive successful reviews
+    ease_factor = Column(Float, default=2.5)  # 1.3 - 2.5
+    last_quality = Column(SmallInteger, default=0)  # Last response quality (0-5)
+    total_reviews = Column(Integer, default=0)
+    successful_reviews = Column(Integer, default=0)
+    last_reviewed = Column(DateTime)
+    next_review = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        # Per-user due queue: range scan on (user_id, next_review <= now)
+        Index("ix_review_items_user_next_review", "user_id", "next_review"),
+        # Overdue range for the nightly rescheduling job, in its keyset order
+        Index("ix_review_items_next_review", "next_review", "user_id", "concept"),
+    )
+
+class UserStats(Base):
+    """Per-user progress aggregates, maintained in the same transaction as progress writes"""
+    __tablename__ = "user_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    completed_lessons = Column(Integer, default=0, nullable=False)
+    completed_by_track = Column(JSON)  # {"<track_id>": completed count}
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class UserRecommendation(Base):
+    """Precomputed top-K next lessons per user, refreshed on progress and preference writes"""
+    __tablename__ = "user_recommendations"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    items = Column(JSON)  # [{"lesson_id", "score", "reason"}], best first
+    catalog_version = Column(String(32))  # Lesson graph fingerprint the items were scored against
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+class DailyActivity(Base):
+    """Append-only activity log: one row per user per active UTC day"""
+    __tablename__ = "daily_activity"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)  # (user_id, day) key doubles as the calendar range index
+    xp = Column(Integer, default=0, nullable=False)
+    lessons = Column(Integer, default=0, nullable=False)
+
+class ReplicationHeartbeat(Base):
+    """Single row stamped on the primary; its age on a replica is that replica's lag"""
+    __tablename__ = "replication_heartbeat"
+    
+    id = Column(Integer, primary_key=True)
+    written_at = Column(Float, nullable=False)  # Unix time on the writing API server
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Populate the sandbox wheelhouse.
+
+Builds wheels for the given packages (and their dependencies) into
+SANDBOX_WHEELHOUSE so sandbox images can install them offline with
+--no-index. Run this once on a host with network access.
+
+Usage:
+    python populate_wheelhouse.py numpy pandas flask
+    python populate_wheelhouse.py -r lesson-requirements.txt
+"""
+
+import argparse
+import sys
+
+from docker_executor import DockerExecutor, WHEELHOUSE_DIR
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Populate the sandbox wheelhouse")
+    parser.add_argument("packages", nargs="*", help="Packages to build wheels for")
+    parser.add_argument("-r", "--requirements", help="Requirements file to read packages from")
+    args = parser.parse_args()
+
+    packages = list(args.packages)
+    if args.requirements:
+        with open(args.requirements) as f:
+            packages += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    if not packages:
+        parser.error("no packages given")
+
+    executor = DockerExecutor()
+    if not executor.probe():
+        sys.exit("Docker is required to build wheels for the sandbox platform")
+
+    print(f"Building wheels for {len(packages)} package(s) into {WHEELHOUSE_DIR}")
+    result = executor.populate_wheelhouse(packages)
+    if not result["success"]:
+        sys.exit(result["error"])
+    print(result["output"])
+
+
+if __name__ == "__main__":
+    main()
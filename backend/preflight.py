@@ -0,0 +1,182 @@
+import ast
+import asyncio
+import multiprocessing
+import os
+import resource
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from docker_executor import HEAVY_PACKAGES, WEB_APP_FRAMEWORKS, network_disabled
+
+PREFLIGHT_ENABLED = os.getenv("PREFLIGHT_ENABLED", "true").lower() != "false"
+PREFLIGHT_WORKERS = int(os.getenv("PREFLIGHT_WORKERS", "2"))
+# Analysis taking longer than this is skipped and the run goes to the sandbox as before
+PREFLIGHT_TIMEOUT = float(os.getenv("PREFLIGHT_TIMEOUT", "2"))
+PREFLIGHT_MAX_CODE_BYTES = int(os.getenv("PREFLIGHT_MAX_CODE_BYTES", str(256 * 1024)))
+# Address space per worker; pathological inputs fail there, not in the API process
+PREFLIGHT_WORKER_MEMORY = 512 * 1024 * 1024
+
+# Modules with no use in a sandbox started without network access
+OFFLINE_DISALLOWED_MODULES = {"socket", "ssl", "subprocess"}
+
+# Import name -> requirement, for picking the image when the request lists none
+IMPORT_REQUIREMENTS = {module: package for package, module in HEAVY_PACKAGES.items()}
+IMPORT_REQUIREMENTS.update({package: package for packages in WEB_APP_FRAMEWORKS.values() for package in packages})
+IMPORT_REQUIREMENTS.update({"requests": "requests", "plotly": "plotly"})
+
+
+def _limit_worker():
+    resource.setrlimit(resource.RLIMIT_AS, (PREFLIGHT_WORKER_MEMORY, PREFLIGHT_WORKER_MEMORY))
+
+
+def _diagnostic(line: Optional[int], column: Optional[int], message: str, **extra) -> Dict[str, Any]:
+    return dict({"line": line, "column": column, "message": message}, **extra)
+
+
+def analyze(code: str) -> Dict[str, Any]:
+    """Parse and compile code as the sandbox would. Runs in a pool worker.
+
+    Returns syntax diagnostics (with the traceback text Python would print)
+    and every statically visible import with its position.
+    """
+    try:
+        tree = ast.parse(code, "main.py")
+        compile(tree, "main.py", "exec")
+    except SyntaxError as e:
+        # CPython fills e.text by reading "main.py" from the working directory;
+        # quote the submission's own line instead
+        lines = code.splitlines()
+        e.text = lines[e.lineno - 1] + "\n" if e.lineno and 0 < e.lineno <= len(lines) else None
+        return {
+            "diagnostics": [_diagnostic(
+                e.lineno, e.offset, e.msg,
+                end_line=e.end_lineno, end_column=e.end_offset, type=type(e).__name__
+            )],
+            "traceback": "".join(traceback.format_exception_only(type(e), e)),
+            "imports": [],
+        }
+    except (RecursionError, MemoryError, ValueError) as e:
+        # Nesting too deep for the compiler, or null bytes in the source
+        return {
+            "diagnostics": [_diagnostic(None, None, str(e) or type(e).__name__, type=type(e).__name__)],
+            "traceback": f"{type(e).__name__}: {e}\n",
+            "imports": [],
+        }
+
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend((alias.name, node.lineno, node.col_offset) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            imports.append((node.module, node.lineno, node.col_offset))
+        elif (
+            isinstance(node, ast.Call) and node.args
+            and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)
+            and (
+                (isinstance(node.func, ast.Name) and node.func.id == "__import__")
+                or (isinstance(node.func, ast.Attribute) and node.func.attr == "import_module")
+            )
+        ):
+            imports.append((node.args[0].value, node.lineno, node.col_offset))
+
+    return {"diagnostics": [], "traceback": "", "imports": imports}
+
+
+class PreflightChecker:
+    """Rejects submissions that cannot run before they take sandbox capacity.
+
+    Code is parsed and compiled in a small process pool (forkserver, memory
+    capped) so hostile input cannot stall or exhaust the API worker. Syntax
+    errors come back with the same message and caret Python would print;
+    imports of OFFLINE_DISALLOWED_MODULES are rejected when the run would
+    have no network. When the request lists no requirements, they are
+    inferred from imports so the right dependency image is used. If the pool
+    is busy or broken the check is skipped rather than failing the run.
+    """
+
+    def __init__(self, workers: int = PREFLIGHT_WORKERS, timeout: float = PREFLIGHT_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.stats = {"checked": 0, "syntax_errors": 0, "disallowed_imports": 0, "skipped": 0}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=_limit_worker
+            )
+        return self._pool
+
+    def warm(self):
+        """Start the workers ahead of the first submission"""
+        pool = self._get_pool()
+        for _ in range(self.workers):
+            pool.submit(analyze, "")
+
+    async def _analyze(self, code: str) -> Optional[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(self._get_pool(), analyze, code), self.timeout)
+        except asyncio.TimeoutError:
+            print(f"Pre-flight check took over {self.timeout}s; skipping")
+        except BrokenProcessPool as e:
+            print(f"Pre-flight pool failed, restarting: {e}")
+            self.shutdown()
+        return None
+
+    async def check(self, code: str, requirements: Optional[List[str]] = None, network_rules: bool = True) -> Dict[str, Any]:
+        """{"ok", "error", "diagnostics", "imports", "requirements"} for a submission"""
+        requirements = list(requirements or [])
+        passed = {"ok": True, "error": "", "diagnostics": [], "imports": [], "requirements": requirements}
+        if not PREFLIGHT_ENABLED:
+            return passed
+        if len(code.encode("utf-8")) > PREFLIGHT_MAX_CODE_BYTES:
+            return dict(passed, ok=False, error=f"Code is too large ({PREFLIGHT_MAX_CODE_BYTES} bytes maximum)")
+
+        self.stats["checked"] += 1
+        analysis = await self._analyze(code)
+        if analysis is None:
+            self.stats["skipped"] += 1
+            return passed
+
+        if analysis["diagnostics"]:
+            self.stats["syntax_errors"] += 1
+            return dict(passed, ok=False, error=analysis["traceback"], diagnostics=analysis["diagnostics"])
+
+        modules = sorted({name.split(".")[0] for name, _, _ in analysis["imports"]})
+        if not requirements:
+            requirements = sorted({IMPORT_REQUIREMENTS[name] for name in modules if name in IMPORT_REQUIREMENTS})
+        passed.update(imports=modules, requirements=requirements)
+
+        if network_rules and network_disabled(requirements):
+            diagnostics = [
+                _diagnostic(
+                    line, column + 1,
+                    f"Importing '{name}' is not allowed: this sandbox runs without network access",
+                    type="DisallowedImport"
+                )
+                for name, line, column in analysis["imports"]
+                if name.split(".")[0] in OFFLINE_DISALLOWED_MODULES
+            ]
+            if diagnostics:
+                self.stats["disallowed_imports"] += 1
+                error = "\n".join(f"Line {d['line']}: {d['message']}" for d in diagnostics)
+                return dict(passed, ok=False, error=error, diagnostics=diagnostics)
+
+        return passed
+
+    def metrics(self) -> Dict[str, int]:
+        return dict(self.stats)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Global instance
+preflight_checker = PreflightChecker()
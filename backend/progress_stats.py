@@ -0,0 +1,143 @@
+"""
+Materialized per-user progress aggregates (user_stats).
+
+The row is updated in the same transaction as each progress write, so
+/api/progress/stats is a single primary-key read. rebuild_user_stats()
+recomputes a row from user_progress (used lazily for users who have no row
+yet, and by the CLI after data fixes). Streaks are not kept here; they come
+from the daily activity log (activity_log.user_streaks).
+
+Usage:
+    python progress_stats.py --rebuild            # every user, in chunks
+    python progress_stats.py --rebuild --user 42
+"""
+
+import argparse
+from typing import Dict
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import Lesson, UserProgress, UserStats, User
+
+
+def rebuild_user_stats(db: Session, user_id: int) -> UserStats:
+    """Recompute a user's aggregate row from user_progress"""
+    by_track: Dict[str, int] = {
+        str(track_id): count
+        for track_id, count in db.execute(
+            select(Lesson.track_id, func.count())
+            .join(UserProgress, UserProgress.lesson_id == Lesson.id)
+            .where(UserProgress.user_id == user_id, UserProgress.completed == True)
+            .group_by(Lesson.track_id)
+        )
+    }
+    stats = db.get(UserStats, user_id)
+    if stats is None:
+        stats = UserStats(user_id=user_id)
+        db.add(stats)
+    stats.completed_lessons = sum(by_track.values())
+    stats.completed_by_track = by_track
+    return stats
+
+
+def insert_if_missing(db: Session, user_id: int) -> bool:
+    """Create an empty row unless the user has one; True if this call created it.
+
+    ON CONFLICT DO NOTHING waits for a concurrent transaction creating the
+    same row instead of failing with an IntegrityError.
+    """
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        raise RuntimeError(f"User stats are not supported on {dialect}")
+
+    result = db.execute(
+        insert(UserStats)
+        .values(user_id=user_id, completed_lessons=0, completed_by_track={})
+        .on_conflict_do_nothing(index_elements=["user_id"])
+    )
+    return result.rowcount == 1
+
+
+def get_user_stats(db: Session, user_id: int) -> UserStats:
+    """Primary-key read, building the row the first time a user is seen"""
+    stats = db.get(UserStats, user_id)
+    if stats is None:
+        if insert_if_missing(db, user_id):
+            rebuild_user_stats(db, user_id)
+        db.commit()
+        stats = db.get(UserStats, user_id)
+    return stats
+
+
+def record_progress(db: Session, user_id: int, lesson_id: int, completed_delta: int):
+    """Apply one progress write to the user's aggregates. Call before the commit.
+
+    completed_delta is +1 when the lesson became completed, -1 when it was
+    un-completed, 0 otherwise (nothing to do).
+    """
+    if not completed_delta:
+        return
+    stats = db.get(UserStats, user_id, with_for_update=True)
+    if stats is None:
+        # Flush so a rebuild sees this write, then the row is already current.
+        # If a concurrent write created the row first, lock theirs and add to it.
+        db.flush()
+        if insert_if_missing(db, user_id):
+            rebuild_user_stats(db, user_id)
+            return
+        stats = db.get(UserStats, user_id, with_for_update=True, populate_existing=True)
+
+    track_id = db.scalar(select(Lesson.track_id).where(Lesson.id == lesson_id))
+    by_track = dict(stats.completed_by_track or {})
+    key = str(track_id)
+    by_track[key] = max(0, by_track.get(key, 0) + completed_delta)
+    stats.completed_by_track = by_track  # Reassign so the JSON change is persisted
+    stats.completed_lessons = max(0, (stats.completed_lessons or 0) + completed_delta)
+
+
+def rebuild_all(db: Session, chunk_size: int = 1000) -> int:
+    """Rebuild every user's row, committing per chunk of users"""
+    rebuilt = 0
+    last_id = 0
+    while True:
+        user_ids = list(db.scalars(
+            select(User.id).where(User.id > last_id).order_by(User.id).limit(chunk_size)
+        ))
+        if not user_ids:
+            break
+        for user_id in user_ids:
+            rebuild_user_stats(db, user_id)
+        db.commit()
+        rebuilt += len(user_ids)
+        last_id = user_ids[-1]
+    return rebuilt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain user_stats aggregates")
+    parser.add_argument("--rebuild", action="store_true", required=True, help="Recompute from user_progress")
+    parser.add_argument("--user", type=int, help="Only this user")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.user is not None:
+            rebuild_user_stats(db, args.user)
+            db.commit()
+            print(f"Rebuilt stats for user {args.user}")
+        else:
+            print(f"Rebuilt stats for {rebuild_all(db)} users")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response, status
+
+from auth import get_current_user
+from models import User
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Memory buckets only
+    aioredis = None
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false"
+# Shared buckets across gunicorn workers; without it each worker limits on its own
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", os.getenv("REDIS_URL", ""))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# After a Redis error, use memory buckets for this many seconds before retrying
+RATE_LIMIT_REDIS_RETRY = 30
+
+
+def parse_quota(value: str) -> Tuple[int, float]:
+    """"10/60" -> burst of 10 requests, refilled at 10 per 60 seconds"""
+    capacity, _, seconds = value.partition("/")
+    return int(capacity), int(capacity) / float(seconds or 1)
+
+
+# Route quotas as (capacity, tokens per second)
+RATE_LIMITS: Dict[str, Tuple[int, float]] = {
+    "execute": parse_quota(os.getenv("RATE_LIMIT_EXECUTE", "10/60")),  # Sandbox runs per user
+    "progress": parse_quota(os.getenv("RATE_LIMIT_PROGRESS", "10/5")),  # Autosaves per user
+    "auth": parse_quota(os.getenv("RATE_LIMIT_AUTH", "10/60")),  # Login/register per client IP
+}
+
+# KEYS[1] = bucket; ARGV = capacity, rate, cost. Refill and take atomically,
+# using the Redis clock so workers agree on time.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+
+class MemoryTokenBuckets:
+    """Per-process token buckets, bounded LRU by key"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float, cost: int = 1) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+
+class RateLimiter:
+    """Token buckets in Redis when configured, falling back to process memory"""
+
+    def __init__(self, redis_url: str = RATE_LIMIT_REDIS_URL):
+        self.memory = MemoryTokenBuckets()
+        self.redis = None
+        self._script = None
+        self._redis_down_until = 0.0
+        if redis_url and aioredis is not None:
+            self.redis = aioredis.from_url(redis_url, socket_timeout=0.25, socket_connect_timeout=0.25)
+            self._script = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, capacity: int, rate: float, cost: int = 1) -> Tuple[bool, float]:
+        if self._script is not None and self._redis_down_until < time.monotonic():
+            try:
+                allowed, tokens = await self._script(keys=[f"ratelimit:{key}"], args=[capacity, rate, cost])
+                return bool(allowed), float(tokens)
+            except Exception as e:
+                # Fall back to per-process limits rather than rejecting requests
+                print(f"Rate limit Redis error, using memory buckets for {RATE_LIMIT_REDIS_RETRY}s: {e}")
+                self._redis_down_until = time.monotonic() + RATE_LIMIT_REDIS_RETRY
+        return self.memory.take(key, capacity, rate, cost)
+
+    async def check(self, rule: str, identity: str, response: Optional[Response] = None):
+        """Take one token for identity under rule; raise 429 when the bucket is empty"""
+        if not RATE_LIMIT_ENABLED:
+            return
+        capacity, rate = RATE_LIMITS[rule]
+        allowed, tokens = await self.take(f"{rule}:{identity}", capacity, rate)
+
+        headers = {
+            "RateLimit-Limit": str(capacity),
+            "RateLimit-Remaining": str(int(tokens)),
+            "RateLimit-Reset": str(math.ceil((capacity - tokens) / rate)),  # Seconds until full
+        }
+        if not allowed:
+            headers["Retry-After"] = str(max(1, math.ceil((1 - tokens) / rate)))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded, please slow down",
+                headers=headers
+            )
+        if response is not None:
+            response.headers.update(headers)
+
+
+def limit_per_user(rule: str):
+    """Dependency: rate limit the authenticated user under rule"""
+    async def dependency(response: Response, current_user: User = Depends(get_current_user)):
+        await rate_limiter.check(rule, f"user:{current_user.id}", response)
+    return dependency
+
+
+def limit_per_client(rule: str):
+    """Dependency: rate limit the client IP under rule (for unauthenticated routes).
+
+    request.client is the address uvicorn resolved from X-Forwarded-For for
+    proxies listed in forwarded_allow_ips (gunicorn.conf.py). The limit is
+    only as good as that list: an unlisted proxy puts every user in one
+    bucket, and trusting clients lets them pick their key.
+    """
+    async def dependency(request: Request, response: Response):
+        client = request.client.host if request.client else "unknown"
+        await rate_limiter.check(rule, f"ip:{client}", response)
+    return dependency
+
+
+# Global instance
+rate_limiter = RateLimiter()
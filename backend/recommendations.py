@@ -0,0 +1,326 @@
+"""
+Personalized next-lesson recommendations (user_recommendations).
+
+Candidates are the lessons a user has unlocked but not completed (the
+skill-tree frontier). Each is scored from the user's progress (lessons
+already attempted, the track they are working in), their preferences
+(goals, skill level against track difficulty, how many new concepts fit
+their daily time) and concept coverage (concepts of completed lessons), and
+the best RECOMMENDATION_TOP_K are stored per user.
+
+Rows are precomputed by the batch job below, refreshed for one user in the
+same transaction as that user's progress and preference writes, and served
+from a per-process LRU. Each row records the catalog fingerprint it was
+scored against; rows from an older catalog are recomputed on read.
+
+Usage:
+    python recommendations.py --rebuild            # every user, in chunks
+    python recommendations.py --rebuild --user 42
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Lesson, Track, User, UserPreferences, UserProgress, UserRecommendation
+from skill_tree import PrerequisiteGraph, skill_tree_cache
+
+RECOMMENDATION_TOP_K = int(os.getenv("RECOMMENDATION_TOP_K", "10"))
+# Seconds a user's list is served from memory. Rows are refreshed by whichever
+# worker handled the write, so this bounds staleness across gunicorn workers.
+RECOMMENDATION_CACHE_TTL = int(os.getenv("RECOMMENDATION_CACHE_TTL", "60"))
+RECOMMENDATION_CACHE_MAX_USERS = int(os.getenv("RECOMMENDATION_CACHE_MAX_USERS", "10000"))
+
+# Score contributions
+WEIGHTS = {
+    "in_progress": 3.0,  # Attempted but not completed
+    "continue": 2.5,  # Directly follows the user's current lesson
+    "current_track": 1.5,  # In the track the user is working through
+    "goal": 1.0,  # Per matching goal, up to MAX_GOAL_MATCHES
+    "new_concepts": 0.5,  # Per uncovered concept within the session budget
+    "overload": -0.5,  # Per uncovered concept beyond it
+    "too_hard": -1.0,  # Per level the track is above the user
+    "too_easy": -0.5,  # Per level the track is below the user
+}
+MAX_GOAL_MATCHES = 2
+
+SKILL_LEVELS = {"beginner": 0.0, "beginner-plus": 0.5, "intermediate": 1.0, "advanced": 2.0}
+# New concepts that fit in one session for each time_commitment
+NEW_CONCEPT_BUDGET = {"15min": 1, "30min": 2, "1hour": 3, "2hours": 4}
+DEFAULT_NEW_CONCEPT_BUDGET = 2
+
+# Onboarding goal -> concepts/track words that serve it
+GOAL_KEYWORDS = {
+    "data-science": {"data", "pandas", "numpy", "matplotlib", "visualization", "statistics", "dataframes", "csv"},
+    "ai-ml": {"ai", "ml", "machine", "learning", "pytorch", "tensorflow", "sklearn", "neural", "transformers", "numpy"},
+    "web-dev": {"web", "flask", "fastapi", "django", "http", "api", "html", "json", "requests"},
+    "automation": {"automation", "files", "os", "regex", "scripting", "csv", "requests", "subprocess"},
+    "academic": {"algorithms", "recursion", "math", "statistics", "numpy", "complexity"},
+}
+GOAL_KEYWORDS["web-development"] = GOAL_KEYWORDS["web-dev"]
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", (name or "").lower()).strip("-")
+
+
+class RecommendationCatalog:
+    """Per-lesson scoring inputs for one PrerequisiteGraph snapshot"""
+
+    def __init__(self, graph: PrerequisiteGraph, rows: Iterable[Any]):
+        self.graph = graph
+        self.concepts: Dict[int, FrozenSet[str]] = {}
+        self.goals: Dict[int, FrozenSet[str]] = {}
+        self.track_slugs: Dict[int, str] = {}
+        self.track_levels: Dict[int, float] = {}
+
+        digest = hashlib.blake2b(digest_size=16)
+        for lesson_id, concepts, track_id, track_name, difficulty in sorted(rows, key=lambda row: row[0]):
+            self.concepts[lesson_id] = frozenset(json.loads(concepts) if concepts else [])
+            self.track_slugs[track_id] = _slug(track_name)
+            self.track_levels[track_id] = SKILL_LEVELS.get(difficulty, 0.0)
+            words = self.concepts[lesson_id] | set(self.track_slugs[track_id].split("-"))
+            self.goals[lesson_id] = frozenset(goal for goal, keywords in GOAL_KEYWORDS.items() if words & keywords)
+            digest.update(f"{lesson_id}:{track_id}:{difficulty}:{concepts}\n".encode())
+        for lesson_id in graph.order:
+            digest.update(f"{lesson_id}<{sorted(graph.requires[lesson_id])}\n".encode())
+        self.version = digest.hexdigest()
+
+    def current_tracks(self, preferences: Optional[UserPreferences], recent_lesson_id: Optional[int]) -> set:
+        """Tracks the user is working through: their chosen track, the track of
+        their current lesson and of their latest progress write"""
+        tracks = set()
+        preferred = _slug(preferences.current_track) if preferences and preferences.current_track else ""
+        if preferred:
+            tracks.update(t for t, slug in self.track_slugs.items() if preferred == slug or preferred in slug.split("-"))
+        for lesson_id in (preferences.current_lesson_id if preferences else None, recent_lesson_id):
+            if lesson_id in self.graph.lessons:
+                tracks.add(self.graph.lessons[lesson_id].track_id)
+        return tracks
+
+    def score(self, progress: List[Tuple[int, bool, Optional[datetime]]], preferences: Optional[UserPreferences], top_k: int) -> List[Dict[str, Any]]:
+        """Top-k {"lesson_id", "score", "reason"} for a user's progress rows
+        (lesson_id, completed, updated_at) and preferences"""
+        graph = self.graph
+        completed_ids = [lesson_id for lesson_id, completed, _ in progress if completed]
+        completed = graph.completed_mask(completed_ids)
+        attempted = {lesson_id for lesson_id, completed, _ in progress if not completed}
+        recent = max(progress, key=lambda row: row[2] or datetime.min)[0] if progress else None
+
+        covered = set()
+        for lesson_id in completed_ids:
+            covered |= self.concepts.get(lesson_id, frozenset())
+        tracks = self.current_tracks(preferences, recent)
+        current_lesson = preferences.current_lesson_id if preferences else None
+        goals = set(preferences.goals or []) if preferences else set()
+        level = SKILL_LEVELS.get(preferences.skill_level) if preferences else None
+        budget = NEW_CONCEPT_BUDGET.get(preferences.time_commitment if preferences else None, DEFAULT_NEW_CONCEPT_BUDGET)
+
+        scored = []
+        for lesson_id in graph.frontier(completed_ids, completed):
+            lesson = graph.lessons[lesson_id]
+            parts = {}
+            if lesson_id in attempted:
+                parts["in_progress"] = WEIGHTS["in_progress"]
+            if current_lesson is not None and (lesson_id == current_lesson or current_lesson in graph.requires[lesson_id]):
+                parts["continue"] = WEIGHTS["continue"]
+            if lesson.track_id in tracks:
+                parts["current_track"] = WEIGHTS["current_track"]
+            matched = len(goals & self.goals.get(lesson_id, frozenset()))
+            if matched:
+                parts["goal"] = WEIGHTS["goal"] * min(matched, MAX_GOAL_MATCHES)
+            new = len(self.concepts.get(lesson_id, frozenset()) - covered)
+            if new:
+                parts["new_concepts"] = WEIGHTS["new_concepts"] * min(new, budget)
+                if new > budget:
+                    parts["overload"] = WEIGHTS["overload"] * (new - budget)
+            if level is not None:
+                gap = self.track_levels.get(lesson.track_id, 0.0) - level
+                if gap > 0:
+                    parts["too_hard"] = WEIGHTS["too_hard"] * gap
+                elif gap < 0:
+                    parts["too_easy"] = WEIGHTS["too_easy"] * -gap
+
+            reason = max(parts, key=parts.get) if parts and max(parts.values()) > 0 else "next_up"
+            scored.append((round(sum(parts.values()), 3), lesson_id, reason))
+
+        # Ties keep curriculum (topological) order
+        best = heapq.nsmallest(top_k, scored, key=lambda s: (-s[0], graph.index[s[1]]))
+        return [{"lesson_id": lesson_id, "score": score, "reason": reason} for score, lesson_id, reason in best]
+
+
+class Recommender:
+    """Scores, stores and caches each user's top-K next lessons"""
+
+    def __init__(self, top_k: int = RECOMMENDATION_TOP_K, ttl: int = RECOMMENDATION_CACHE_TTL,
+                 max_users: int = RECOMMENDATION_CACHE_MAX_USERS):
+        self.top_k = top_k
+        self.ttl = ttl
+        self.max_users = max_users
+        self._catalog: Optional[RecommendationCatalog] = None
+        self._entries: "OrderedDict[int, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def catalog(self, db: Session) -> RecommendationCatalog:
+        """Catalog for the current skill-tree graph, rebuilt whenever the graph is"""
+        graph = skill_tree_cache.get(db)
+        catalog = self._catalog
+        if catalog is None or catalog.graph is not graph:
+            rows = db.execute(
+                select(Lesson.id, Lesson.concepts, Lesson.track_id, Track.name, Track.difficulty)
+                .join(Track, Track.id == Lesson.track_id)
+            ).all()
+            catalog = RecommendationCatalog(graph, rows)
+            with self._lock:
+                self._catalog = catalog
+        return catalog
+
+    def _load(self, db: Session, user_ids: List[int]):
+        """Progress rows and preferences for a batch of users, one query each"""
+        progress: Dict[int, list] = {user_id: [] for user_id in user_ids}
+        for user_id, lesson_id, completed, updated_at in db.execute(
+            select(UserProgress.user_id, UserProgress.lesson_id, UserProgress.completed, UserProgress.updated_at)
+            .where(UserProgress.user_id.in_(user_ids))
+        ):
+            progress[user_id].append((lesson_id, bool(completed), updated_at))
+        preferences = {
+            p.user_id: p for p in db.scalars(select(UserPreferences).where(UserPreferences.user_id.in_(user_ids)))
+        }
+        return progress, preferences
+
+    def _store(self, db: Session, user_id: int, items: List[Dict[str, Any]], version: str,
+               row: Optional[UserRecommendation] = None) -> UserRecommendation:
+        row = row or db.get(UserRecommendation, user_id)
+        if row is None:
+            row = UserRecommendation(user_id=user_id)
+            db.add(row)
+        row.items = items
+        row.catalog_version = version
+        row.computed_at = datetime.utcnow()
+        return row
+
+    def refresh(self, db: Session, user_id: int) -> UserRecommendation:
+        """Recompute one user's row. Call before the commit, then invalidate()."""
+        db.flush()  # Score against this transaction's progress writes
+        catalog = self.catalog(db)
+        progress, preferences = self._load(db, [user_id])
+        items = catalog.score(progress[user_id], preferences.get(user_id), self.top_k)
+        return self._store(db, user_id, items, catalog.version)
+
+    def record_progress(self, db: Session, user_id: int, lesson_id: int, completed_delta: int):
+        """Apply one progress write. Call before the commit, then invalidate().
+
+        Saving another attempt at the lesson already ranked first changes
+        nothing, so the common "save code while working" write skips scoring.
+        """
+        if not completed_delta:
+            row = db.get(UserRecommendation, user_id)
+            if (
+                row is not None and row.items and row.items[0]["lesson_id"] == lesson_id
+                and row.catalog_version == self.catalog(db).version
+            ):
+                return
+        self.refresh(db, user_id)
+
+    def get(self, db: Session, user_id: int) -> Dict[str, Any]:
+        """{"items", "computed_at"} with lesson titles, from memory, the stored
+        row, or computed now when the row is missing or from an older catalog"""
+        catalog = self.catalog(db)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] >= time.monotonic() and entry[1] == catalog.version:
+                self._entries.move_to_end(user_id)
+                return entry[2]
+
+        row = db.get(UserRecommendation, user_id)
+        if row is None or row.catalog_version != catalog.version:
+            row = self.refresh(db, user_id)
+            db.commit()
+
+        lessons = catalog.graph.lessons
+        result = {
+            "items": [
+                dict(item, track_id=lessons[item["lesson_id"]].track_id, title=lessons[item["lesson_id"]].title)
+                for item in row.items or [] if item["lesson_id"] in lessons
+            ],
+            "computed_at": row.computed_at,
+        }
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, catalog.version, result)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return result
+
+    def invalidate(self, user_id: Optional[int] = None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def rebuild_all(self, db: Session, chunk_size: int = 500) -> int:
+        """Recompute every user's row, committing per chunk of users"""
+        catalog = self.catalog(db)
+        rebuilt = 0
+        last_id = 0
+        while True:
+            user_ids = list(db.scalars(
+                select(User.id).where(User.id > last_id).order_by(User.id).limit(chunk_size)
+            ))
+            if not user_ids:
+                break
+            progress, preferences = self._load(db, user_ids)
+            rows = {
+                row.user_id: row
+                for row in db.scalars(select(UserRecommendation).where(UserRecommendation.user_id.in_(user_ids)))
+            }
+            for user_id in user_ids:
+                items = catalog.score(progress[user_id], preferences.get(user_id), self.top_k)
+                self._store(db, user_id, items, catalog.version, rows.get(user_id))
+            db.commit()
+            rebuilt += len(user_ids)
+            last_id = user_ids[-1]
+        self.invalidate()
+        return rebuilt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute user_recommendations")
+    parser.add_argument("--rebuild", action="store_true", required=True, help="Recompute from progress and preferences")
+    parser.add_argument("--user", type=int, help="Only this user")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        if args.user is not None:
+            recommender.refresh(db, args.user)
+            db.commit()
+            print(f"Rebuilt recommendations for user {args.user}")
+        else:
+            count = recommender.rebuild_all(db)
+            print(f"Rebuilt recommendations for {count} users in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+# Global instance
+recommender = Recommender()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, Any, Optional
+
+# Base URL of the sandbox executor service (executor_service.py). When set,
+# API workers forward runs there instead of talking to Docker themselves.
+SANDBOX_EXECUTOR_URL = os.getenv("SANDBOX_EXECUTOR_URL", "")
+# Shared secret sent to the executor service
+SANDBOX_EXECUTOR_TOKEN = os.getenv("SANDBOX_EXECUTOR_TOKEN", "")
+
+class RemoteExecutor:
+    """DockerExecutor stand-in that forwards runs to the executor service over HTTP.
+    
+    Calls block, so run them off the event loop like DockerExecutor's.
+    """
+    
+    def __init__(self, base_url: str, token: str = SANDBOX_EXECUTOR_TOKEN):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.available: Optional[bool] = None
+        self.last_probe: Optional[float] = None
+    
+    def _request(self, path: str, payload: Optional[dict] = None, timeout: float = 5) -> Dict[str, Any]:
+        request = urllib.request.Request(
+            f"{self.base_url}{path}",
+            data=json.dumps(payload).encode("utf-8") if payload is not None else None,
+            headers={"Content-Type": "application/json", "X-Executor-Token": self.token},
+            method="POST" if payload is not None else "GET"
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+    
+    def probe(self) -> bool:
+        try:
+            available = bool(self._request("/status").get("available"))
+        except Exception as e:
+            if self.available is not False:
+                print(f"Executor service not available: {e}")
+            available = False
+        self.available = available
+        self.last_probe = time.monotonic()
+        return available
+    
+    def is_available(self) -> bool:
+        return bool(self.available)
+    
+    def metrics(self) -> Dict[str, Any]:
+        try:
+            return self._request("/metrics")
+        except Exception as e:
+            return {"error": f"Executor service unavailable: {e}"}
+    
+    def _execute(self, path: str, payload: dict, timeout: int) -> Dict[str, Any]:
+        try:
+            # Allow for image builds on top of the run timeout
+            return self._request(path, payload, timeout=timeout + 60)
+        except (urllib.error.URLError, TimeoutError) as e:
+            return {
+                "success": False,
+                "output": "",
+                "error": f"Executor service unavailable: {e}"
+            }
+    
+    def execute_python_code(
+        self,
+        code: str,
+        timeout: int = 30,
+        requirements: Optional[list] = None,
+        resource_profile: str = "basic"
+    ) -> Dict[str, Any]:
+        return self._execute("/execute/python", {
+            "code": code,
+            "timeout": timeout,
+            "requirements": requirements or [],
+            "resource_profile": resource_profile
+        }, timeout)
+    
+    def execute_web_app(
+        self,
+        code: str,
+        app_type: str = "flask",
+        timeout: int = 60,
+        routes: Optional[list] = None
+    ) -> Dict[str, Any]:
+        return self._execute("/execute/webapp", {
+            "code": code,
+            "app_type": app_type,
+            "timeout": timeout,
+            "routes": routes or []
+        }, timeout)
@@ -0,0 +1,185 @@
+"""
+Read-replica routing for database sessions.
+
+Requests that may write use the primary (database.get_db). Read-only
+endpoints use database.get_read_db, which is bound to a replica from
+DATABASE_REPLICA_URLS when one is healthy and current enough for the caller:
+
+- Lag: the primary stamps replication_heartbeat every
+  DATABASE_HEARTBEAT_INTERVAL seconds, and a replica's lag is the age of the
+  stamp it has replayed. Replicas that fail or fall more than
+  DATABASE_MAX_REPLICA_LAG behind are skipped until a later check.
+- Read-your-writes: when a session that wrote commits, the user's write time
+  is recorded (in Redis when configured, so every worker sees it). The
+  user's reads stay on the primary until a replica has replayed a heartbeat
+  stamped after that write.
+
+With no replicas configured every read goes to the primary.
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from models import ReplicationHeartbeat
+
+try:
+    import redis
+except ImportError:  # Per-process write log only
+    redis = None
+
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+DATABASE_HEARTBEAT_INTERVAL = float(os.getenv("DATABASE_HEARTBEAT_INTERVAL", "1"))
+DATABASE_MAX_REPLICA_LAG = float(os.getenv("DATABASE_MAX_REPLICA_LAG", "10"))
+# Shared write log across gunicorn workers; without it stickiness is per worker
+DATABASE_STICKY_REDIS_URL = os.getenv("DATABASE_STICKY_REDIS_URL", os.getenv("REDIS_URL", ""))
+DATABASE_STICKY_MAX_USERS = int(os.getenv("DATABASE_STICKY_MAX_USERS", "100000"))
+# A write older than this is on every replica still in rotation
+STICKY_TTL = DATABASE_MAX_REPLICA_LAG + 2 * DATABASE_HEARTBEAT_INTERVAL
+# After a Redis error, use the per-process log for this many seconds before retrying
+STICKY_REDIS_RETRY = 30
+
+
+class Replica:
+    """One read replica and what the last lag check saw"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.healthy = False  # Until the first check
+        self.heartbeat: Optional[float] = None  # Latest primary stamp replayed here
+        self.lag: Optional[float] = None
+        self.error = ""
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "url": self.engine.url.render_as_string(hide_password=True),
+            "healthy": self.healthy,
+            "lag": round(self.lag, 3) if self.lag is not None else None,
+            "error": self.error,
+        }
+
+
+class WriteLog:
+    """Last commit time per user, in Redis when configured, else process memory"""
+
+    def __init__(self, redis_url: str = DATABASE_STICKY_REDIS_URL, max_users: int = DATABASE_STICKY_MAX_USERS):
+        self.max_users = max_users
+        self._memory: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis_down_until = 0.0
+        self.redis = None
+        if redis_url and redis is not None:
+            self.redis = redis.Redis.from_url(redis_url, socket_timeout=0.25, socket_connect_timeout=0.25)
+
+    def _redis_ok(self) -> bool:
+        return self.redis is not None and self._redis_down_until < time.monotonic()
+
+    def _redis_failed(self, e: Exception):
+        print(f"Replica write log Redis error, using process memory for {STICKY_REDIS_RETRY}s: {e}")
+        self._redis_down_until = time.monotonic() + STICKY_REDIS_RETRY
+
+    def record(self, key: str, written_at: float):
+        with self._lock:
+            self._memory[key] = written_at
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_users:
+                self._memory.popitem(last=False)
+        if self._redis_ok():
+            try:
+                self.redis.set(f"lastwrite:{key}", repr(written_at), px=int(STICKY_TTL * 1000))
+            except Exception as e:
+                self._redis_failed(e)
+
+    def last(self, key: str) -> Optional[float]:
+        if self._redis_ok():
+            try:
+                value = self.redis.get(f"lastwrite:{key}")
+                return float(value) if value is not None else None
+            except Exception as e:
+                self._redis_failed(e)
+        with self._lock:
+            written_at = self._memory.get(key)
+        if written_at is not None and written_at < time.time() - STICKY_TTL:
+            return None
+        return written_at
+
+
+class ReplicaRouter:
+    """Picks the engine for read sessions and keeps replica lag current"""
+
+    def __init__(self, primary: Engine, replica_urls: List[str], create_engine: Callable[[str], Engine]):
+        self.primary = primary
+        self.replicas = [Replica(create_engine(url)) for url in replica_urls]
+        self.writes = WriteLog()
+        self._next = itertools.count()
+        self.stats = {"replica_reads": 0, "primary_reads": 0, "sticky_reads": 0}
+
+    def beat(self):
+        """Stamp the heartbeat row on the primary"""
+        now = time.time()
+        with self.primary.begin() as connection:
+            updated = connection.execute(
+                update(ReplicationHeartbeat).where(ReplicationHeartbeat.id == 1).values(written_at=now)
+            ).rowcount
+        if not updated:
+            try:
+                with self.primary.begin() as connection:
+                    connection.execute(insert(ReplicationHeartbeat).values(id=1, written_at=now))
+            except IntegrityError:
+                pass  # Another worker created it first
+
+    def check(self):
+        """Measure every replica's lag from the heartbeat it has replayed"""
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as connection:
+                    heartbeat = connection.scalar(
+                        select(ReplicationHeartbeat.written_at).where(ReplicationHeartbeat.id == 1)
+                    )
+            except Exception as e:
+                if replica.healthy or not replica.error:
+                    print(f"Replica {replica.status()['url']} unavailable: {e}")
+                replica.healthy = False
+                replica.error = str(e)
+                continue
+            replica.error = ""
+            replica.heartbeat = heartbeat
+            replica.lag = time.time() - heartbeat if heartbeat is not None else None
+            was_healthy = replica.healthy
+            replica.healthy = replica.lag is not None and replica.lag <= DATABASE_MAX_REPLICA_LAG
+            if was_healthy != replica.healthy:
+                print(f"Replica {replica.status()['url']} {'back in' if replica.healthy else 'out of'} rotation (lag {replica.lag})")
+
+    def record_write(self, key: Optional[str]):
+        if key and self.replicas:
+            self.writes.record(key, time.time())
+
+    def choose(self, key: Optional[str] = None) -> Engine:
+        """A healthy replica that has the caller's last write, else the primary"""
+        candidates = [replica for replica in self.replicas if replica.healthy]
+        if candidates and key:
+            written_at = self.writes.last(key)
+            if written_at is not None:
+                current = [r for r in candidates if r.heartbeat is not None and r.heartbeat >= written_at]
+                if len(current) < len(candidates):
+                    self.stats["sticky_reads"] += 1
+                candidates = current
+        if not candidates:
+            self.stats["primary_reads"] += 1
+            return self.primary
+        self.stats["replica_reads"] += 1
+        return candidates[next(self._next) % len(candidates)].engine
+
+    def dispose(self):
+        for replica in self.replicas:
+            replica.engine.dispose(close=False)
+
+    def metrics(self) -> Dict[str, Any]:
+        return dict(self.stats, replicas=[replica.status() for replica in self.replicas])
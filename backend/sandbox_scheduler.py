@@ -0,0 +1,241 @@
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from docker_executor import (
+    BASE_IMAGE,
+    DEFAULT_RESOURCE_PROFILE,
+    RESOURCE_PROFILES,
+    SANDBOX_REAP_AGE,
+    WEB_APP_FRAMEWORKS,
+    DockerExecutor,
+    docker_executor,
+)
+from execution_cache import execution_cache
+
+# Comma-separated Docker endpoints to spread sandbox runs over, e.g.
+# "unix:///var/run/docker.sock,tcp://sandbox-2:2376". Unset = local daemon only.
+SANDBOX_DOCKER_HOSTS = [url.strip() for url in os.getenv("SANDBOX_DOCKER_HOSTS", "").split(",") if url.strip()]
+# How much extra load (running jobs per CPU) a host holding the job's image is
+# still preferred over an idle host that would have to build it
+SANDBOX_AFFINITY_WEIGHT = float(os.getenv("SANDBOX_AFFINITY_WEIGHT", "0.5"))
+# Consecutive infrastructure failures before a host is drained until its next good probe
+SANDBOX_HOST_MAX_FAILURES = int(os.getenv("SANDBOX_HOST_MAX_FAILURES", "3"))
+
+# Errors DockerExecutor reports for daemon/infrastructure problems rather than user code
+INFRASTRUCTURE_ERRORS = ("Failed to build Docker image", "Execution failed:", "Docker is not available")
+
+MEMORY_UNITS = {"": 1, "b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def memory_bytes(limit: str) -> int:
+    """'512m' -> 536870912"""
+    number, unit = re.fullmatch(r"(\d+)([bkmg]?)", limit.lower()).groups()
+    return int(number) * MEMORY_UNITS[unit]
+
+
+class SandboxHost:
+    """One Docker endpoint with the scheduler's view of its load"""
+
+    def __init__(self, name: str, executor: DockerExecutor):
+        self.name = name
+        self.executor = executor
+        self.healthy = False
+        self.drained = False  # Set by an operator; excluded until undrained
+        self.failures = 0
+        self.cpus = 1
+        self.memory_total = 0
+        self.running = 0
+        self.reserved_memory = 0
+        self.jobs = 0
+        self.images = set()
+
+    @property
+    def schedulable(self) -> bool:
+        return self.healthy and not self.drained
+
+    @property
+    def load(self) -> float:
+        return self.running / self.cpus
+
+    @property
+    def memory_headroom(self) -> int:
+        return self.memory_total - self.reserved_memory
+
+    def refresh(self):
+        """Probe the daemon and reload its capacity and cached images. Blocking."""
+        if not self.executor.probe():
+            self.healthy = False
+            return
+        info = self.executor.client.info()
+        self.cpus = max(1, info.get("NCPU") or 1)
+        self.memory_total = info.get("MemTotal") or 0
+        self.images = {
+            tag
+            for image in self.executor.client.images.list(filters={"reference": "pylingo-*"})
+            for tag in image.tags
+        }
+        self.failures = 0
+        self.healthy = True
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "drained": self.drained,
+            "running": self.running,
+            "cpus": self.cpus,
+            "memory_total": self.memory_total,
+            "memory_headroom": self.memory_headroom,
+            "cached_images": len(self.images),
+            "jobs": self.jobs,
+            "failures": self.failures,
+        }
+
+
+class SandboxScheduler:
+    """Spreads sandbox runs over several Docker hosts.
+
+    Each job goes to the schedulable host with the lowest running-jobs-per-CPU
+    load, discounted by SANDBOX_AFFINITY_WEIGHT when the host already has the
+    job's image, among hosts with memory headroom for the job's profile.
+    Hosts that fail their probe, or return SANDBOX_HOST_MAX_FAILURES
+    infrastructure errors in a row, get no new jobs until a probe succeeds.
+    Exposes the DockerExecutor methods the API uses.
+    """
+
+    def __init__(self, hosts: Dict[str, DockerExecutor]):
+        self.hosts = [SandboxHost(name, executor) for name, executor in hosts.items()]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_urls(cls, urls: List[str]) -> "SandboxScheduler":
+        return cls({url: DockerExecutor(result_cache=execution_cache, base_url=url) for url in urls})
+
+    def probe(self) -> bool:
+        for host in self.hosts:
+            try:
+                host.refresh()
+            except Exception as e:
+                print(f"Sandbox host {host.name} unhealthy: {e}")
+                host.healthy = False
+        return self.is_available()
+
+    def is_available(self) -> bool:
+        return any(host.schedulable for host in self.hosts)
+
+    def drain(self, name: str, drained: bool = True):
+        for host in self.hosts:
+            if host.name == name:
+                host.drained = drained
+
+    def _acquire(self, image: str, memory: int, exclude: Optional[SandboxHost] = None) -> Optional[SandboxHost]:
+        with self._lock:
+            candidates = [
+                host for host in self.hosts
+                if host.schedulable and host is not exclude
+                and (not host.memory_total or host.memory_headroom >= memory)
+            ]
+            if not candidates:
+                return None
+            host = min(
+                candidates,
+                key=lambda h: (h.load - (SANDBOX_AFFINITY_WEIGHT if image in h.images else 0), -h.memory_headroom)
+            )
+            host.running += 1
+            host.reserved_memory += memory
+            host.jobs += 1
+            return host
+
+    def _release(self, host: SandboxHost, memory: int, image: str, result: Dict[str, Any]):
+        with self._lock:
+            host.running -= 1
+            host.reserved_memory -= memory
+            if str(result.get("error", "")).startswith(INFRASTRUCTURE_ERRORS):
+                host.failures += 1
+                if host.failures >= SANDBOX_HOST_MAX_FAILURES:
+                    print(f"Draining sandbox host {host.name} after {host.failures} failures")
+                    host.healthy = False
+            else:
+                host.failures = 0
+                host.images.add(image)  # Built or reused by this run
+
+    def _dispatch(self, image: str, memory: int, run) -> Dict[str, Any]:
+        """Run on the best host, retrying once elsewhere after an infrastructure failure"""
+        tried = None
+        result = None
+        for _ in range(2):
+            host = self._acquire(image, memory, exclude=tried)
+            if host is None:
+                break
+            result = {}
+            try:
+                result = run(host.executor)
+            finally:
+                self._release(host, memory, image, result)
+            if not str(result.get("error", "")).startswith(INFRASTRUCTURE_ERRORS):
+                return result
+            tried = host
+        return result or {
+            "success": False,
+            "output": "",
+            "error": "No sandbox host has capacity right now, please try again"
+        }
+
+    def execute_python_code(
+        self,
+        code: str,
+        timeout: int = 30,
+        requirements: Optional[list] = None,
+        resource_profile: str = DEFAULT_RESOURCE_PROFILE
+    ) -> Dict[str, Any]:
+        image = self.hosts[0].executor._deps_image_tag(requirements) if requirements else BASE_IMAGE
+        limits = RESOURCE_PROFILES.get(resource_profile, RESOURCE_PROFILES[DEFAULT_RESOURCE_PROFILE])
+        return self._dispatch(
+            image,
+            memory_bytes(limits["mem_limit"]),
+            lambda executor: executor.execute_python_code(code, timeout, requirements, resource_profile)
+        )
+
+    def execute_web_app(
+        self,
+        code: str,
+        app_type: str = "flask",
+        timeout: int = 60,
+        routes: Optional[list] = None
+    ) -> Dict[str, Any]:
+        requirements = WEB_APP_FRAMEWORKS.get(app_type, [])
+        image = self.hosts[0].executor._deps_image_tag(requirements) if requirements else BASE_IMAGE
+        return self._dispatch(
+            image,
+            memory_bytes(RESOURCE_PROFILES["standard"]["mem_limit"]),
+            lambda executor: executor.execute_web_app(code, app_type, timeout, routes)
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "hosts": [dict(host.status(), **host.executor.metrics()) for host in self.hosts]
+        }
+
+    def reap(self, max_age: int = SANDBOX_REAP_AGE) -> Dict[str, int]:
+        totals = {"containers": 0, "images": 0, "bytes": 0}
+        for host in self.hosts:
+            if host.healthy:
+                for key, value in host.executor.reap(max_age).items():
+                    totals[key] += value
+        return totals
+
+    def shutdown(self):
+        for host in self.hosts:
+            host.executor.shutdown()
+
+
+# Global instance: the scheduler when several hosts are configured, an executor
+# for the one configured host, otherwise the local DockerExecutor itself
+if len(SANDBOX_DOCKER_HOSTS) > 1:
+    sandbox_executor = SandboxScheduler.from_urls(SANDBOX_DOCKER_HOSTS)
+elif SANDBOX_DOCKER_HOSTS:
+    sandbox_executor = DockerExecutor(result_cache=execution_cache, base_url=SANDBOX_DOCKER_HOSTS[0])
+else:
+    sandbox_executor = docker_executor
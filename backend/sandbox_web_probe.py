@@ -0,0 +1,191 @@
+"""
+Runs inside a web-app sandbox container (see DockerExecutor.execute_web_app).
+
+The harness starts as root and never shares a process with learner code. It
+reads the per-run report marker from a root-only file next to this script and
+deletes it, then starts `python sandbox_web_probe.py serve` as the runner
+user: that child imports the learner's main.py and serves its module-level
+`app` on loopback. The root parent requests each declared route with urllib
+and writes the results as one JSON line (prefixed with the marker) to
+stderr, then exits. Learner code cannot read the marker, so it cannot forge
+a report. Only the standard library and the framework itself are used.
+"""
+
+import importlib
+import json
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import time
+import traceback
+import urllib.error
+import urllib.request
+
+HOST = "127.0.0.1"
+PORT = 8000
+MARKER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".probe_marker")
+RUNNER_UID = 1000
+RUNNER_GID = 1000
+
+
+def drop_privileges():
+    """preexec_fn for the app process: own session, runner user"""
+    os.setsid()
+    os.setgroups([])
+    os.setgid(RUNNER_GID)
+    os.setuid(RUNNER_UID)
+
+
+def serve_app():
+    """Child (runner user): import main.py and serve its app until killed.
+
+    Failures are written as JSON to the status fd; the parent only trusts
+    what it can observe on the port, so a forged status just fails the run.
+    """
+    status = os.fdopen(int(os.environ.pop("PYLINGO_STATUS_FD")), "w")
+
+    def fail(message):
+        status.write(json.dumps({"error": message}))
+        status.flush()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(1)
+
+    framework = os.environ.get("PYLINGO_FRAMEWORK", "flask")
+    sys.path.insert(0, os.getcwd())
+    try:
+        module = importlib.import_module("main")
+    except BaseException as e:
+        traceback.print_exc()
+        fail(f"App failed to load: {e!r}")
+    app = getattr(module, "app", None)
+    if app is None:
+        fail("No module-level 'app' object found in your code")
+
+    try:
+        if framework == "fastapi":
+            import uvicorn
+
+            uvicorn.Server(uvicorn.Config(app, host=HOST, port=PORT, log_level="warning")).run()
+        else:
+            from werkzeug.serving import make_server
+
+            make_server(HOST, PORT, app, threaded=True).serve_forever()
+    except BaseException as e:
+        traceback.print_exc()
+        fail(f"App failed to start: {e!r}")
+    fail("App stopped serving before it was probed")
+
+
+def start_app():
+    """The app process and the read end of its status pipe"""
+    status_r, status_w = os.pipe()
+    env = dict(os.environ)
+    env.update(PYLINGO_STATUS_FD=str(status_w), HOME="/home/runner", USER="runner")
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "serve"],
+        env=env,
+        pass_fds=[status_w],
+        preexec_fn=drop_privileges,
+    )
+    os.close(status_w)
+    return process, status_r
+
+
+def wait_until_listening(process, status_r, timeout):
+    """None once the port accepts connections, else the error that stopped the app"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((HOST, PORT), timeout=0.2).close()
+            return None
+        except OSError:
+            pass
+        if process.poll() is not None or select.select([status_r], [], [], 0.02)[0]:
+            message = os.read(status_r, 65536)
+            try:
+                return json.loads(message)["error"]
+            except (ValueError, KeyError, TypeError):
+                return "App exited before it started listening"
+    return f"App did not start listening within {timeout:g}s"
+
+
+def probe(route, max_body, timeout):
+    body = route.get("body")
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    headers = dict(route.get("headers") or {})
+    if data is not None:
+        headers.setdefault("Content-Type", "application/json")
+    request = urllib.request.Request(
+        f"http://{HOST}:{PORT}{route.get('path', '/')}",
+        data=data,
+        method=route.get("method", "GET").upper(),
+        headers=headers,
+    )
+
+    result = {"method": request.get_method(), "path": route.get("path", "/")}
+    started = time.perf_counter()
+    try:
+        response = urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        response = e
+    except Exception as e:
+        result.update(status=None, latency_ms=round((time.perf_counter() - started) * 1000, 1), error=str(e))
+        return result
+
+    with response:
+        content = response.read(max_body + 1)
+    result.update(
+        status=response.status if hasattr(response, "status") else response.code,
+        latency_ms=round((time.perf_counter() - started) * 1000, 1),
+        content_type=response.headers.get("Content-Type", ""),
+        body=content[:max_body].decode("utf-8", errors="replace"),
+        truncated=len(content) > max_body,
+    )
+    return result
+
+
+def main():
+    with open(MARKER_FILE) as f:
+        marker = f.read().strip()
+    os.unlink(MARKER_FILE)
+
+    routes = json.loads(os.environ.get("PYLINGO_ROUTES", "[]")) or [{"method": "GET", "path": "/"}]
+    max_body = int(os.environ.get("PYLINGO_MAX_BODY", "4096"))
+    startup_timeout = float(os.environ.get("PYLINGO_STARTUP_TIMEOUT", "10"))
+    request_timeout = float(os.environ.get("PYLINGO_REQUEST_TIMEOUT", "5"))
+    deadline = time.monotonic() + float(os.environ.get("PYLINGO_DEADLINE", "30"))
+
+    process, status_r = start_app()
+    started = time.perf_counter()
+    error = wait_until_listening(process, status_r, min(startup_timeout, max(0.0, deadline - time.monotonic())))
+    if error:
+        payload = {"error": error}
+    else:
+        payload = {"startup_ms": round((time.perf_counter() - started) * 1000, 1), "probes": []}
+        for route in routes:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                payload["error"] = "App did not finish within the time limit"
+                break
+            payload["probes"].append(probe(route, max_body, min(request_timeout, remaining)))
+
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except OSError:
+        pass  # Already exited
+    process.wait()
+    sys.stdout.flush()
+    sys.stderr.write("\n" + marker + json.dumps(payload) + "\n")
+    sys.stderr.flush()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["serve"]:
+        serve_app()
+    else:
+        main()
@@ -0,0 +1,275 @@
+"""
+Zygote fork server for sandbox containers with heavy requirement sets.
+
+`python sandbox_zygote.py serve` runs as root in a long-lived container. It
+pre-imports PYLINGO_PRELOAD (comma-separated module names) once, then listens
+on a unix socket. `python sandbox_zygote.py run <dir> <timeout> <marker>
+<max_bytes> <max_lines>` (started with docker exec per submission) connects
+and hands over the write ends of two pipes, and the server forks a child that
+drops to the runner user, applies its own rlimits and executes <dir>/main.py
+with the modules already imported. The client copies the child's output to
+its own stdout/stderr up to the byte/line cap and kills the child's process
+group past it, so a runaway run never takes the zygote down. The child's exit
+status and rusage come back to the client, which writes them to stderr as
+one JSON line prefixed with <marker>.
+
+Only the standard library is used.
+"""
+
+import importlib
+import json
+import os
+import resource
+import selectors
+import shutil
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+
+SOCKET_PATH = "/run/pylingo-zygote.sock"
+RUNNER_UID = 1000
+RUNNER_GID = 1000
+CHILD_RLIMITS = {
+    resource.RLIMIT_FSIZE: 16 * 1024 * 1024,  # Largest file a submission may write
+    resource.RLIMIT_NOFILE: 256,
+    resource.RLIMIT_CORE: 0,
+}
+SCRATCH_DIRS = ("/tmp", "/dev/shm")
+
+
+def preload(modules):
+    loaded = []
+    for name in modules:
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except Exception as e:
+            print(f"zygote: could not preload {name}: {e!r}", file=sys.stderr)
+    return loaded
+
+
+def run_child(run_dir, timeout, stdout_fd, stderr_fd):
+    """In the forked child: isolate, drop privileges and execute main.py. Never returns."""
+    status = 1
+    try:
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        # Drop the server socket and other clients' connections
+        os.closerange(3, resource.getrlimit(resource.RLIMIT_NOFILE)[0])
+        sys.stdin = open(0, closefd=False)
+        sys.stdout = open(1, "w", buffering=1, closefd=False)
+        sys.stderr = open(2, "w", buffering=1, closefd=False)
+
+        # CPU seconds are capped at the run timeout; the server also kills on wall time
+        resource.setrlimit(resource.RLIMIT_CPU, (timeout, timeout + 1))
+        for limit, value in CHILD_RLIMITS.items():
+            resource.setrlimit(limit, (value, value))
+
+        os.chdir(run_dir)
+        os.setgroups([])
+        os.setgid(RUNNER_GID)
+        os.setuid(RUNNER_UID)
+        os.environ.update(HOME=run_dir, TMPDIR=run_dir, USER="runner")
+
+        # Forked children would otherwise share the zygote's random state
+        import random
+        random.seed()
+
+        sys.argv = ["main.py"]
+        sys.path[0] = run_dir
+        path = os.path.join(run_dir, "main.py")
+        with open(path) as f:
+            code = compile(f.read(), path, "exec")
+        exec(code, {"__name__": "__main__", "__file__": path, "__builtins__": __builtins__})
+        status = 0
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        if not isinstance(e.code, (int, type(None))):
+            print(e.code, file=sys.stderr)
+    except BaseException as e:
+        # Skip this function's frame so the traceback starts in main.py
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        status = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+        os._exit(status)
+
+
+def cleanup_runner():
+    """Kill anything the previous submission left running and clear its scratch files"""
+    for pid in os.listdir("/proc"):
+        if pid.isdigit():
+            try:
+                if os.stat(f"/proc/{pid}").st_uid == RUNNER_UID:
+                    os.kill(int(pid), signal.SIGKILL)
+            except OSError:
+                pass
+    for scratch in SCRATCH_DIRS:
+        try:
+            entries = os.listdir(scratch)
+        except OSError:
+            continue
+        for name in entries:
+            path = os.path.join(scratch, name)
+            try:
+                if os.lstat(path).st_uid == RUNNER_UID:
+                    if os.path.isdir(path) and not os.path.islink(path):
+                        shutil.rmtree(path, ignore_errors=True)
+                    else:
+                        os.unlink(path)
+            except OSError:
+                pass
+
+
+def handle(conn, lock):
+    with conn:
+        request_line, fds, _, _ = socket.recv_fds(conn, 65536, 2)
+        request = json.loads(request_line.decode("utf-8"))
+        run_dir = request["dir"]
+        timeout = int(request["timeout"])
+
+        # One submission at a time: memory and pid limits are per container
+        with lock:
+            os.chown(run_dir, RUNNER_UID, RUNNER_GID)
+            started = time.perf_counter()
+            pid = os.fork()
+            if pid == 0:
+                run_child(run_dir, timeout, fds[0], fds[1])
+            for fd in fds:
+                os.close(fd)
+            # The client kills the child's process group when it hits the output cap
+            conn.sendall(json.dumps({"pid": pid}).encode("utf-8") + b"\n")
+
+            killed = threading.Event()
+            
+            def kill_on_timeout():
+                killed.set()
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except OSError:
+                    pass  # Already exited
+
+            timer = threading.Timer(timeout, kill_on_timeout)
+            timer.start()
+            try:
+                _, status, usage = os.wait4(pid, 0)
+            finally:
+                timer.cancel()
+            wall_time = time.perf_counter() - started
+            timed_out = killed.is_set() or (os.WIFSIGNALED(status) and os.WTERMSIG(status) == signal.SIGXCPU)
+            cleanup_runner()
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+        conn.sendall(json.dumps({
+            "exit_code": os.waitstatus_to_exitcode(status),
+            "timed_out": timed_out,
+            "wall_time_ms": round(wall_time * 1000, 1),
+            "cpu_time_ms": round((usage.ru_utime + usage.ru_stime) * 1000, 1),
+            "peak_memory_bytes": usage.ru_maxrss * 1024,
+        }).encode("utf-8"))
+
+
+def serve():
+    modules = [name for name in os.environ.get("PYLINGO_PRELOAD", "").split(",") if name]
+    started = time.perf_counter()
+    loaded = preload(modules)
+    print(f"zygote: preloaded {loaded} in {time.perf_counter() - started:.2f}s", flush=True)
+
+    if os.path.exists(SOCKET_PATH):
+        os.unlink(SOCKET_PATH)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(SOCKET_PATH)
+    os.chmod(SOCKET_PATH, 0o600)  # Root (docker exec) only; children run as runner
+    server.listen(16)
+    print("zygote: ready", flush=True)
+
+    lock = threading.Lock()
+    while True:
+        conn, _ = server.accept()
+        threading.Thread(target=handle, args=(conn, lock), daemon=True).start()
+
+
+class OutputLimit:
+    """Shared byte/line ceiling over stdout and stderr (as OutputCapture in docker_executor.py)"""
+
+    def __init__(self, max_bytes, max_lines):
+        self.bytes_left = max_bytes
+        self.lines_left = max_lines
+        self.truncated = False
+
+    def take(self, chunk):
+        """The part of chunk that fits under the ceiling"""
+        if len(chunk) > self.bytes_left:
+            chunk = chunk[:self.bytes_left]
+            self.truncated = True
+        if chunk.count(b"\n") > self.lines_left:
+            # Keep everything up to and including the last allowed newline
+            cut = -1
+            for _ in range(self.lines_left):
+                cut = chunk.index(b"\n", cut + 1)
+            chunk = chunk[:cut + 1]
+            self.truncated = True
+        self.bytes_left -= len(chunk)
+        self.lines_left -= chunk.count(b"\n")
+        return chunk
+
+
+def run(run_dir, timeout, marker, max_bytes, max_lines):
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(SOCKET_PATH)
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+    request = json.dumps({"dir": run_dir, "timeout": timeout}).encode("utf-8")
+    socket.send_fds(client, [request], [stdout_w, stderr_w])
+    os.close(stdout_w)
+    os.close(stderr_w)
+
+    replies = client.makefile("rb")
+    pid = json.loads(replies.readline())["pid"]
+
+    limit = OutputLimit(max_bytes, max_lines)
+    selector = selectors.DefaultSelector()
+    selector.register(stdout_r, selectors.EVENT_READ, sys.stdout.fileno())
+    selector.register(stderr_r, selectors.EVENT_READ, sys.stderr.fileno())
+    while selector.get_map() and not limit.truncated:
+        for key, _ in selector.select():
+            chunk = os.read(key.fd, 65536)
+            if not chunk:
+                selector.unregister(key.fd)
+                continue
+            chunk = limit.take(chunk)
+            while chunk:
+                chunk = chunk[os.write(key.data, chunk):]
+            if limit.truncated:
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except OSError:
+                    pass  # Already exited
+                break
+    selector.close()
+    os.close(stdout_r)
+    os.close(stderr_r)
+
+    report = json.loads(replies.read().decode("utf-8"))
+    report["truncated"] = limit.truncated
+    sys.stderr.write("\n" + marker + json.dumps(report) + "\n")
+    sys.stderr.flush()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["serve"]:
+        serve()
+    elif sys.argv[1:2] == ["run"] and len(sys.argv) == 7:
+        run(sys.argv[2], int(sys.argv[3]), sys.argv[4], int(sys.argv[5]), int(sys.argv[6]))
+    else:
+        sys.exit("usage: sandbox_zygote.py serve | run <dir> <timeout> <marker> <max_bytes> <max_lines>")
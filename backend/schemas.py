@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional, Any
-from datetime import datetime
+from datetime import date, datetime
 
 # User schemas
 class UserBase(BaseModel):
@@ -40,11 +40,35 @@ class UserProgressResponse(BaseModel):
     completed: bool
     completed_at: Optional[datetime]
     attempts: int
+    code_hash: Optional[str]  # Content hash of the saved code
+    last_code: Optional[str] = None  # Only with ?include_code=true
+    
+    class Config:
+        from_attributes = True
+
+class UserProgressSummary(BaseModel):
+    """Compact progress listing without code blobs.
+    
+    Entry i describes lesson_ids[i]; bit i of completed_bitset (base64,
+    least-significant bit first within each byte) is its completed flag.
+    """
+    lesson_ids: List[int]
+    completed_bitset: str
+    attempts: List[int]
+    synced_at: datetime  # Pass back as ?since= for the next delta
+
+class UserProgressCode(BaseModel):
+    lesson_id: int
     last_code: Optional[str]
     
     class Config:
         from_attributes = True
 
+class CodeVersion(BaseModel):
+    version: int
+    code: str
+    saved_at: Optional[datetime]
+
 # Lesson schemas
 class LessonCreate(BaseModel):
     title: str
@@ -56,6 +80,7 @@ class LessonCreate(BaseModel):
     concepts: List[str] = []
     order_in_track: int
     track_id: int
+    resource_profile: str = "basic"
 
 class LessonResponse(BaseModel):
     id: int
@@ -68,11 +93,60 @@ class LessonResponse(BaseModel):
     concepts: List[str]
     order_in_track: int
     track_id: int
+    resource_profile: Optional[str] = "basic"
     created_at: datetime
     
     class Config:
         from_attributes = True
 
+class LessonSearchHit(BaseModel):
+    id: int
+    track_id: int
+    order_in_track: int
+    title: str
+    concepts: List[str]
+    snippet: str  # Description excerpt with matches wrapped in <mark>
+    score: float
+
+class ConceptFacet(BaseModel):
+    concept: str
+    count: int
+
+class LessonSearchResponse(BaseModel):
+    query: str
+    total: int
+    results: List[LessonSearchHit]
+    facets: List[ConceptFacet]
+
+class SkillTreeNode(BaseModel):
+    lesson_id: int
+    track_id: int
+    title: str
+    depth: int  # Longest prerequisite chain below this lesson
+    prerequisites: List[int]
+    completed: bool
+    unlocked: bool  # Every transitive prerequisite completed
+    missing_prerequisites: int
+
+class SkillTreeResponse(BaseModel):
+    nodes: List[SkillTreeNode]  # Topological order
+    completed: int
+    unlocked: int  # Unlocked and not yet completed
+
+class LessonPrerequisitesUpdate(BaseModel):
+    prerequisite_ids: List[int]
+
+class RecommendedLesson(BaseModel):
+    lesson_id: int
+    track_id: int
+    title: str
+    score: float
+    reason: str  # in_progress, continue, current_track, goal, new_concepts or next_up
+
+class RecommendationsResponse(BaseModel):
+    items: List[RecommendedLesson]  # Best first
+    computed_at: Optional[datetime]
+
 # Track schemas
 class TrackCreate(BaseModel):
     name: str
@@ -171,4 +245,43 @@ class StreakUpdateResponse(BaseModel):
     longest_streak: int
     xp_earned: int
     level_up: bool
-    new_level: Optional[int] = None
\ No newline at end of file
+    new_level: Optional[int] = None
+
+class ActivityDay(BaseModel):
+    day: date
+    xp: int
+    lessons: int  # 0 on a missed day a streak freeze bridged
+    
+    class Config:
+        from_attributes = True
+
+class ActivityCalendar(BaseModel):
+    """Activity for start..end. Bit i of active_bitset (base64, least-significant
+    bit first within each byte) is set if start + i days was active."""
+    start: date
+    end: date
+    active_bitset: str
+    days: List[ActivityDay]
+    current_streak: int
+    longest_streak: int
+
+# Spaced repetition schemas
+class ReviewResult(BaseModel):
+    concept: str = Field(min_length=1, max_length=64)
+    quality: int = Field(ge=0, le=5)  # SM-2 recall grade
+
+class ReviewItemResponse(BaseModel):
+    concept: str
+    lesson_id: Optional[int]
+    difficulty: float
+    interval: int
+    repetition: int
+    ease_factor: float
+    last_quality: int
+    total_reviews: int
+    successful_reviews: int
+    last_reviewed: Optional[datetime]
+    next_review: datetime
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,230 @@
+"""
+Lesson prerequisite graph for the skill tree.
+
+Edges come from lesson_prerequisites; a lesson with no explicit row requires
+the previous lesson in its track (the order_in_track sequence). The graph is
+loaded once per process into dense bitsets: lessons are numbered in
+topological order and each one keeps the set of all its transitive
+prerequisites, so "is this lesson unlocked for this user" is a mask-and
+against the user's completed-lesson bitset instead of a recursive query.
+"""
+
+import heapq
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Lesson, LessonPrerequisite, UserProgress
+
+# Seconds before the graph is reloaded. Invalidation is per process, so this
+# bounds staleness across gunicorn workers.
+SKILL_TREE_TTL = int(os.getenv("SKILL_TREE_TTL", "300"))
+
+
+class PrerequisiteGraph:
+    """Immutable snapshot of the lesson graph in topological order"""
+
+    def __init__(self, lessons: List[Any], edges: Iterable[Any]):
+        explicit: Dict[int, Set[int]] = {}
+        for lesson_id, prerequisite_id in edges:
+            explicit.setdefault(lesson_id, set()).add(prerequisite_id)
+
+        self.lessons = {lesson.id: lesson for lesson in lessons}
+        self.requires: Dict[int, Set[int]] = {}
+        previous: Dict[int, int] = {}
+        for lesson in sorted(lessons, key=lambda l: (l.track_id, l.order_in_track)):
+            if lesson.id in explicit:
+                self.requires[lesson.id] = {p for p in explicit[lesson.id] if p in self.lessons}
+            elif lesson.track_id in previous:
+                self.requires[lesson.id] = {previous[lesson.track_id]}
+            else:
+                self.requires[lesson.id] = set()
+            previous[lesson.track_id] = lesson.id
+
+        self.dependents: Dict[int, List[int]] = {lesson_id: [] for lesson_id in self.lessons}
+        for lesson_id, requires in self.requires.items():
+            for prerequisite in requires:
+                self.dependents[prerequisite].append(lesson_id)
+
+        self.order = self._topological_order()
+        self.index = {lesson_id: i for i, lesson_id in enumerate(self.order)}
+        self.roots = [lesson_id for lesson_id in self.order if not self.requires[lesson_id]]
+
+        # closure[i] is the bitset of all transitive prerequisites of lesson i,
+        # stored shifted right by base[i] (its lowest set bit) so it only
+        # spans the window its ancestors occupy, not every earlier lesson
+        self.base: List[int] = []
+        self.closure: List[int] = []
+        self.depth: List[int] = []
+        for lesson_id in self.order:
+            closure = 0
+            depth = 0
+            for prerequisite in self.requires[lesson_id]:
+                p = self.index[prerequisite]
+                closure |= (self.closure[p] << self.base[p]) | (1 << p)
+                depth = max(depth, self.depth[p] + 1)
+            base = (closure & -closure).bit_length() - 1 if closure else 0
+            self.base.append(base)
+            self.closure.append(closure >> base)
+            self.depth.append(depth)
+
+    def _topological_order(self) -> List[int]:
+        """Kahn's algorithm, emitting ready lessons by (track, order_in_track).
+        Edges closing a cycle are dropped so the rest of the tree still loads."""
+        pending = {lesson_id: len(requires) for lesson_id, requires in self.requires.items()}
+
+        def key(lesson_id):
+            lesson = self.lessons[lesson_id]
+            return (lesson.track_id, lesson.order_in_track, lesson_id)
+
+        ready = [key(lesson_id) for lesson_id, count in pending.items() if count == 0]
+        heapq.heapify(ready)
+        order = []
+        while len(order) < len(self.lessons):
+            if not ready:
+                # Everything left is on a cycle: release the first lesson by
+                # forgetting its unresolved prerequisites
+                stuck = min((key(l) for l, count in pending.items() if count > 0))
+                lesson_id = stuck[2]
+                print(f"Skill tree: prerequisite cycle through lesson {lesson_id}; ignoring its unmet edges")
+                self.requires[lesson_id] = {p for p in self.requires[lesson_id] if pending[p] == -1}
+                pending[lesson_id] = 0
+                heapq.heappush(ready, stuck)
+            lesson_id = heapq.heappop(ready)[2]
+            pending[lesson_id] = -1  # Emitted
+            order.append(lesson_id)
+            for dependent in self.dependents[lesson_id]:
+                if pending[dependent] > 0:
+                    pending[dependent] -= 1
+                    if pending[dependent] == 0:
+                        heapq.heappush(ready, key(dependent))
+        return order
+
+    def frontier(self, completed_ids: Iterable[int], completed: int) -> List[int]:
+        """Unlocked, uncompleted lessons, found from the completed lessons'
+        dependents instead of a scan over the whole catalog"""
+        seen = set()
+        frontier = []
+        candidates = [l for c in completed_ids if c in self.dependents for l in self.dependents[c]]
+        for lesson_id in self.roots + candidates:
+            if lesson_id in seen:
+                continue
+            seen.add(lesson_id)
+            i = self.index[lesson_id]
+            if not completed >> i & 1 and self.missing(i, completed) == 0:
+                frontier.append(lesson_id)
+        return frontier
+
+    def completed_mask(self, lesson_ids: Iterable[int]) -> int:
+        mask = 0
+        for lesson_id in lesson_ids:
+            if lesson_id in self.index:
+                mask |= 1 << self.index[lesson_id]
+        return mask
+
+    def missing(self, i: int, completed: int) -> int:
+        """Bitset (shifted by base[i]) of lesson i's prerequisites not in completed"""
+        return self.closure[i] & ~(completed >> self.base[i])
+
+    def is_unlocked(self, lesson_id: int, completed: int) -> bool:
+        """All transitive prerequisites completed"""
+        return self.missing(self.index[lesson_id], completed) == 0
+
+    def requires_transitively(self, lesson_id: int, prerequisite_id: int) -> bool:
+        i, p = self.index[lesson_id], self.index[prerequisite_id]
+        return p >= self.base[i] and bool(self.closure[i] >> (p - self.base[i]) & 1)
+
+    def would_cycle(self, lesson_id: int, prerequisite_ids: Iterable[int]) -> bool:
+        """True if lesson_id requiring prerequisite_ids closes a cycle"""
+        return any(p == lesson_id or self.requires_transitively(p, lesson_id) for p in prerequisite_ids)
+
+    def tree(self, completed: int, track_id: Optional[int] = None) -> Dict[str, Any]:
+        """Skill-tree nodes in topological order with per-user state"""
+        nodes = []
+        for i, lesson_id in enumerate(self.order):
+            lesson = self.lessons[lesson_id]
+            if track_id is not None and lesson.track_id != track_id:
+                continue
+            missing = self.missing(i, completed)
+            nodes.append({
+                "lesson_id": lesson_id,
+                "track_id": lesson.track_id,
+                "title": lesson.title,
+                "depth": self.depth[i],
+                "prerequisites": sorted(self.requires[lesson_id]),
+                "completed": bool(completed >> i & 1),
+                "unlocked": missing == 0,
+                "missing_prerequisites": missing.bit_count(),
+            })
+        return {
+            "nodes": nodes,
+            "completed": sum(node["completed"] for node in nodes),
+            "unlocked": sum(node["unlocked"] and not node["completed"] for node in nodes),
+        }
+
+
+class SkillTreeCache:
+    """Process-wide PrerequisiteGraph, rebuilt after TTL or invalidate()"""
+
+    def __init__(self):
+        self._graph: Optional[PrerequisiteGraph] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> PrerequisiteGraph:
+        graph = self._graph
+        if graph is None or self._expires_at < time.monotonic():
+            with self._lock:
+                if self._graph is graph:  # Not rebuilt by another thread meanwhile
+                    lessons = db.execute(
+                        select(Lesson.id, Lesson.track_id, Lesson.order_in_track, Lesson.title)
+                    ).all()
+                    edges = db.execute(
+                        select(LessonPrerequisite.lesson_id, LessonPrerequisite.prerequisite_id)
+                    ).all()
+                    self._graph = PrerequisiteGraph(lessons, edges)
+                    self._expires_at = time.monotonic() + SKILL_TREE_TTL
+                graph = self._graph
+        return graph
+
+    def invalidate(self):
+        with self._lock:
+            self._graph = None
+
+
+def user_skill_tree(db: Session, user_id: int, track_id: Optional[int] = None) -> Dict[str, Any]:
+    graph = skill_tree_cache.get(db)
+    completed_ids = db.scalars(
+        select(UserProgress.lesson_id).where(UserProgress.user_id == user_id, UserProgress.completed == True)
+    )
+    return graph.tree(graph.completed_mask(completed_ids), track_id)
+
+
+def set_prerequisites(db: Session, lesson_id: int, prerequisite_ids: List[int]):
+    """Replace a lesson's explicit prerequisites. Raises ValueError on unknown
+    lessons or cycles. An empty list restores the implicit track order."""
+    graph = skill_tree_cache.get(db)
+    if any(l not in graph.index for l in [lesson_id, *prerequisite_ids]):
+        # Possibly created through another worker since the graph was loaded
+        skill_tree_cache.invalidate()
+        graph = skill_tree_cache.get(db)
+    if lesson_id not in graph.index:
+        raise ValueError(f"Lesson {lesson_id} not found")
+    unknown = [p for p in prerequisite_ids if p not in graph.index]
+    if unknown:
+        raise ValueError(f"Unknown prerequisite lessons: {unknown}")
+    if graph.would_cycle(lesson_id, prerequisite_ids):
+        raise ValueError("These prerequisites would create a cycle")
+
+    db.query(LessonPrerequisite).filter(LessonPrerequisite.lesson_id == lesson_id).delete()
+    db.add_all(LessonPrerequisite(lesson_id=lesson_id, prerequisite_id=p) for p in set(prerequisite_ids))
+    db.commit()
+    skill_tree_cache.invalidate()
+
+
+# Global instance
+skill_tree_cache = SkillTreeCache()
@@ -0,0 +1,232 @@
+"""
+Server-side spaced repetition (SuperMemo 2), mirroring
+frontend/src/services/spacedRepetitionService.ts so review state can follow a
+user across devices.
+
+Usage (nightly rescheduling job):
+    python spaced_repetition.py --chunk-size 5000
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.orm import Session
+
+from models import ReviewItem
+
+EASE_FACTOR_MIN = 1.3
+EASE_FACTOR_MAX = 2.5
+INITIAL_INTERVAL = 1
+DEFAULT_DIFFICULTY = 0.5
+
+
+def sm2_batch(
+    repetitions: Sequence[int],
+    intervals: Sequence[int],
+    ease_factors: Sequence[float],
+    difficulties: Sequence[float],
+    qualities: Sequence[int],
+) -> Tuple[List[int], List[int], List[float]]:
+    """Apply one SM-2 step to a batch of items.
+
+    Takes parallel sequences (one entry per item) and returns the new
+    (repetitions, intervals, ease_factors).
+    """
+    new_repetitions, new_intervals, new_ease_factors = [], [], []
+
+    for repetition, interval, ease, difficulty, quality in zip(
+        repetitions, intervals, ease_factors, difficulties, qualities
+    ):
+        if quality >= 3:
+            # Successful review
+            repetition += 1
+            ease = max(EASE_FACTOR_MIN, ease + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)))
+
+            if repetition == 1:
+                interval = 1
+            elif repetition == 2:
+                interval = 6
+            else:
+                interval = round(interval * ease)
+
+            # Harder concepts come back sooner
+            interval = max(1, round(interval * (1 - difficulty * 0.3)))
+        else:
+            # Failed review - start over but remember it was hard
+            repetition = 0
+            interval = 1
+            ease = max(EASE_FACTOR_MIN, ease - 0.2)
+
+        new_repetitions.append(repetition)
+        new_intervals.append(interval)
+        new_ease_factors.append(min(EASE_FACTOR_MAX, ease))
+
+    return new_repetitions, new_intervals, new_ease_factors
+
+
+def initialize_concepts(
+    db: Session,
+    user_id: int,
+    concepts: Sequence[str],
+    lesson_id: Optional[int] = None,
+    now: Optional[datetime] = None,
+):
+    """Start tracking concepts a user has just learned. Existing items are left alone."""
+    if not concepts:
+        return
+
+    now = now or datetime.utcnow()
+    existing = set(
+        db.scalars(
+            select(ReviewItem.concept).where(
+                ReviewItem.user_id == user_id, ReviewItem.concept.in_(concepts)
+            )
+        )
+    )
+
+    for concept in dict.fromkeys(concepts):
+        if concept in existing:
+            continue
+        db.add(ReviewItem(
+            user_id=user_id,
+            concept=concept,
+            lesson_id=lesson_id,
+            difficulty=DEFAULT_DIFFICULTY,
+            interval=INITIAL_INTERVAL,
+            repetition=0,
+            ease_factor=EASE_FACTOR_MAX,
+            last_quality=0,
+            total_reviews=0,
+            successful_reviews=0,
+            next_review=now + timedelta(days=INITIAL_INTERVAL),
+        ))
+
+
+def record_reviews(
+    db: Session,
+    user_id: int,
+    results: Dict[str, int],
+    now: Optional[datetime] = None,
+) -> List[ReviewItem]:
+    """Apply review results ({concept: quality}) for one user in a single batch.
+
+    Concepts the user is not tracking yet are created first.
+    """
+    now = now or datetime.utcnow()
+    initialize_concepts(db, user_id, list(results), now=now)
+    db.flush()
+
+    items = list(db.scalars(
+        select(ReviewItem).where(
+            ReviewItem.user_id == user_id, ReviewItem.concept.in_(list(results))
+        )
+    ))
+    qualities = [max(0, min(5, results[item.concept])) for item in items]
+
+    repetitions, intervals, ease_factors = sm2_batch(
+        [item.repetition for item in items],
+        [item.interval for item in items],
+        [item.ease_factor for item in items],
+        [item.difficulty for item in items],
+        qualities,
+    )
+
+    for item, quality, repetition, interval, ease in zip(items, qualities, repetitions, intervals, ease_factors):
+        item.repetition = repetition
+        item.interval = interval
+        item.ease_factor = ease
+        item.last_quality = quality
+        item.total_reviews += 1
+        if quality >= 3:
+            item.successful_reviews += 1
+        item.last_reviewed = now
+        item.next_review = now + timedelta(days=interval)
+
+    return items
+
+
+def due_reviews(db: Session, user_id: int, limit: int = 20, now: Optional[datetime] = None) -> List[ReviewItem]:
+    """Next due items for a user, most overdue first (range scan on the due index)"""
+    now = now or datetime.utcnow()
+    return list(db.scalars(
+        select(ReviewItem)
+        .where(ReviewItem.user_id == user_id, ReviewItem.next_review <= now)
+        .order_by(ReviewItem.next_review)
+        .limit(limit)
+    ))
+
+
+def reschedule_lapsed(db: Session, chunk_size: int = 5000, now: Optional[datetime] = None) -> int:
+    """Nightly job: items left unreviewed for longer than their own interval are
+    treated as forgotten and scheduled like a failed review (repetition 0,
+    1-day interval), due now. The ease factor is kept: SM-2 only lowers it
+    for an answer the learner actually gave, and no review happened here.
+
+    Only overdue rows are read: a lapse needs next_review older than at least
+    one day (the shortest interval), so each chunk is a range scan on
+    ix_review_items_next_review, paginated by (next_review, user_id,
+    concept), and committed on its own. Returns the number of items
+    rescheduled.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=INITIAL_INTERVAL)
+    key = tuple_(ReviewItem.next_review, ReviewItem.user_id, ReviewItem.concept)
+    rescheduled = 0
+    last_key = None
+
+    while True:
+        query = (
+            select(
+                ReviewItem.user_id,
+                ReviewItem.concept,
+                ReviewItem.interval,
+                ReviewItem.next_review,
+            )
+            .where(ReviewItem.next_review < cutoff, ReviewItem.repetition > 0)
+            .order_by(ReviewItem.next_review, ReviewItem.user_id, ReviewItem.concept)
+            .limit(chunk_size)
+        )
+        if last_key is not None:
+            query = query.where(key > last_key)
+
+        rows = db.execute(query).all()
+        if not rows:
+            break
+        last_key = (rows[-1].next_review, rows[-1].user_id, rows[-1].concept)
+
+        # Rescheduled rows move to next_review = now, past the cutoff, so the
+        # scan never sees them again
+        lapsed = [
+            {"user_id": row.user_id, "concept": row.concept, "interval": INITIAL_INTERVAL,
+             "repetition": 0, "next_review": now}
+            for row in rows
+            if row.next_review + timedelta(days=row.interval) < now
+        ]
+        if lapsed:
+            # ORM bulk UPDATE by primary key (executemany)
+            db.execute(update(ReviewItem), lapsed)
+        db.commit()
+        rescheduled += len(lapsed)
+
+    return rescheduled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reschedule lapsed spaced-repetition items")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Rows per transaction")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        count = reschedule_lapsed(db, args.chunk_size)
+        print(f"Rescheduled {count} lapsed review items")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
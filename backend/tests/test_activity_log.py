@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+from activity_log import ActivityBitmap, bridged_streak, current_streak, longest_streak, run_lengths, user_streaks
+
+TODAY = date(2026, 10, 19)
+
+
+def active(*days_ago):
+    return ActivityBitmap.from_days([TODAY - timedelta(days=n) for n in days_ago])
+
+
+def days_ago(*offsets):
+    return [TODAY - timedelta(days=n) for n in offsets]
+
+
+def test_run_lengths():
+    assert list(run_lengths(0b1110110001)) == [1, 2, 3]
+    assert list(run_lengths(0)) == []
+
+
+def test_mark_before_start_shifts_bits():
+    bitmap = active(0)
+    bitmap.mark(TODAY - timedelta(days=3))
+    assert bitmap.start == TODAY - timedelta(days=3)
+    assert bitmap.bits == 0b1001
+
+
+def test_window_is_lsb_first():
+    assert active(0, 2).window(TODAY - timedelta(days=7), TODAY) == bytes([0b10100000])
+    assert ActivityBitmap().window(TODAY, TODAY + timedelta(days=8)) == bytes(2)
+
+
+def test_streak_ends_today_or_yesterday():
+    assert current_streak(active(0, 1, 2), TODAY) == 3
+    assert current_streak(active(1, 2), TODAY) == 2
+    assert current_streak(active(2, 3), TODAY) == 0
+    assert current_streak(ActivityBitmap(), TODAY) == 0
+
+
+def test_freezes_bridge_gaps():
+    assert bridged_streak(active(0, 2, 3), TODAY, 1) == (4, days_ago(1))
+    assert bridged_streak(active(0, 3, 4), TODAY, 1) == (1, [])
+    assert bridged_streak(active(0, 1, 2, 4, 5, 8), TODAY, 3) == (9, days_ago(7, 6, 3))
+
+
+def test_freezes_bridge_the_trailing_gap():
+    assert bridged_streak(active(2, 3), TODAY, 1) == (3, days_ago(1))
+    assert bridged_streak(active(3, 4), TODAY, 2) == (4, days_ago(2, 1))
+    assert bridged_streak(active(3, 4), TODAY, 1) == (0, [])
+
+
+def test_longest_includes_bridged_current():
+    bitmap = active(0, 2, 5, 6, 7)
+    assert longest_streak(bitmap) == 3
+    assert user_streaks(bitmap, TODAY) == (1, 3)
+    assert user_streaks(bitmap, TODAY, 3) == (8, 8)
+
+
+def test_spent_days_keep_the_streak_without_freezes():
+    bitmap = active(0, 3, 4)
+    _, bridged = bridged_streak(bitmap, TODAY, 2)
+    for day in bridged:
+        bitmap.mark(day)
+    assert current_streak(bitmap, TODAY) == 5
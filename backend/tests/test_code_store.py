@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from code_store import CodeStore, code_hash, compress, decompress
+from models import Base, CodeBlob, UserProgress
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def ref_counts(db):
+    return {blob.hash: blob.ref_count for blob in db.query(CodeBlob)}
+
+
+def progress(db, lesson_id):
+    row = UserProgress(user_id=1, lesson_id=lesson_id, completed=False)
+    db.add(row)
+    db.flush()
+    return row
+
+
+@pytest.mark.parametrize("raw", [b"x = 1", b"print('hello')\n" * 20])
+def test_compress_round_trip(raw):
+    codec, data = compress(raw)
+    assert decompress(codec, data) == raw
+
+
+def test_delta_round_trip_against_dictionary():
+    newer = b"for i in range(10):\n    print(i)\n" * 4
+    older = newer.replace(b"10", b"5")
+    codec, delta = compress(older, newer)
+    assert decompress(codec, delta, newer) == older
+
+
+def test_identical_code_is_stored_once(db):
+    store = CodeStore(history_limit=0)
+    starter = "def solve():\n    pass\n"
+    store.save(db, progress(db, 1), starter)
+    store.save(db, progress(db, 2), starter)
+    db.commit()
+    assert ref_counts(db) == {code_hash(starter): 2}
+    assert CodeStore().load(db, code_hash(starter)) == starter
+
+
+def test_last_release_deletes_the_blob(db):
+    store = CodeStore(history_limit=0)
+    first, second = progress(db, 1), progress(db, 2)
+    store.save(db, first, "a = 1")
+    store.save(db, second, "a = 1")
+    store.save(db, first, "a = 2")
+    db.commit()
+    assert ref_counts(db) == {code_hash("a = 1"): 1, code_hash("a = 2"): 1}
+    store.save(db, second, None)
+    db.commit()
+    assert ref_counts(db) == {code_hash("a = 2"): 1}
+    assert second.code_hash is None
+
+
+def test_saving_the_same_text_is_free(db):
+    store = CodeStore(history_limit=0)
+    row = progress(db, 1)
+    store.save(db, row, "a = 1")
+    store.save(db, row, "a = 1")
+    db.commit()
+    assert ref_counts(db) == {code_hash("a = 1"): 1}
+
+
+def test_history_keeps_replaced_versions_up_to_the_limit(db):
+    store = CodeStore(history_limit=2)
+    row = progress(db, 1)
+    for n in range(4):
+        store.save(db, row, f"answer = {n}\n")
+        db.flush()
+    db.commit()
+    versions = store.history(db, 1, 1)
+    assert [v["code"] for v in versions] == ["answer = 2\n", "answer = 1\n"]
+    assert ref_counts(db) == {code_hash("answer = 3\n"): 1}
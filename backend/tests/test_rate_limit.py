@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import rate_limit
+from rate_limit import MemoryTokenBuckets, RateLimiter, parse_quota
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+
+def test_parse_quota():
+    assert parse_quota("10/60") == (10, pytest.approx(10 / 60))
+    assert parse_quota("5") == (5, 5.0)
+
+
+def test_burst_then_refill(clock):
+    buckets = MemoryTokenBuckets()
+    assert all(buckets.take("k", 3, 1.0)[0] for _ in range(3))
+    assert buckets.take("k", 3, 1.0) == (False, 0.0)
+    clock.now += 1.5
+    allowed, tokens = buckets.take("k", 3, 1.0)
+    assert allowed and tokens == pytest.approx(0.5)
+
+
+def test_refill_is_capped(clock):
+    buckets = MemoryTokenBuckets()
+    buckets.take("k", 3, 1.0)
+    clock.now += 100
+    assert buckets.take("k", 3, 1.0) == (True, 2.0)
+
+
+def test_keys_are_separate_and_lru_bounded(clock):
+    buckets = MemoryTokenBuckets(max_keys=2)
+    buckets.take("a", 1, 0.001)
+    buckets.take("b", 1, 0.001)
+    buckets.take("a", 1, 0.001)
+    buckets.take("c", 1, 0.001)
+    assert list(buckets._buckets) == ["a", "c"]
+    # "b" was evicted, so it starts full again
+    assert buckets.take("b", 1, 0.001)[0]
+
+
+def test_check_raises_429_with_retry_after(clock, monkeypatch):
+    monkeypatch.setitem(rate_limit.RATE_LIMITS, "test", (1, 0.5))
+    limiter = RateLimiter(redis_url="")
+    asyncio.run(limiter.check("test", "user:1"))
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(limiter.check("test", "user:1"))
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.headers["Retry-After"] == "2"
+
+
+def load_gunicorn_conf():
+    path = rate_limit.__file__.replace("rate_limit.py", "gunicorn.conf.py")
+    namespace = {}
+    exec(compile(open(path).read(), path, "exec"), namespace)
+    return namespace
+
+
+def test_client_addresses_trust_only_listed_proxies(monkeypatch):
+    monkeypatch.delenv("FORWARDED_ALLOW_IPS", raising=False)
+    assert load_gunicorn_conf()["forwarded_allow_ips"] == "127.0.0.1"
+    monkeypatch.setenv("FORWARDED_ALLOW_IPS", "10.0.0.2, *")
+    with pytest.raises(RuntimeError):
+        load_gunicorn_conf()
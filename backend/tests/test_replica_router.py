@@ -0,0 +1,60 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine
+
+import replica_router
+from replica_router import ReplicaRouter, WriteLog
+
+
+@pytest.fixture
+def router():
+    router = ReplicaRouter(create_engine("sqlite://"), ["sqlite://", "sqlite://"], create_engine)
+    router.writes = WriteLog(redis_url="")
+    for replica in router.replicas:
+        replica.healthy = True
+        replica.heartbeat = time.time()
+    return router
+
+
+def test_no_replicas_reads_the_primary():
+    primary = create_engine("sqlite://")
+    router = ReplicaRouter(primary, [], create_engine)
+    assert router.choose("user:1") is primary
+
+
+def test_reads_rotate_over_healthy_replicas(router):
+    engines = {router.choose("user:1") for _ in range(4)}
+    assert engines == {replica.engine for replica in router.replicas}
+    assert router.stats["replica_reads"] == 4
+
+
+def test_unhealthy_replicas_are_skipped(router):
+    router.replicas[0].healthy = False
+    assert {router.choose() for _ in range(3)} == {router.replicas[1].engine}
+    router.replicas[1].healthy = False
+    assert router.choose() is router.primary
+
+
+def test_reads_stick_to_the_primary_until_a_replica_has_the_write(router):
+    router.record_write("user:1")
+    assert router.choose("user:1") is router.primary
+    assert router.stats["sticky_reads"] == 1
+    # Other users are not affected
+    assert router.choose("user:2") is not router.primary
+
+    router.replicas[1].heartbeat = time.time() + 1
+    assert {router.choose("user:1") for _ in range(3)} == {router.replicas[1].engine}
+
+
+def test_old_writes_expire_from_the_log(router):
+    router.writes.record("user:1", time.time() - replica_router.STICKY_TTL - 1)
+    assert router.writes.last("user:1") is None
+    assert router.choose("user:1") is not router.primary
+
+
+def test_write_log_is_lru_bounded():
+    log = WriteLog(redis_url="", max_users=2)
+    for key in ("a", "b", "a", "c"):
+        log.record(key, time.time())
+    assert list(log._memory) == ["a", "c"]
@@ -0,0 +1,36 @@
+from sandbox_zygote import OutputLimit
+
+
+def test_under_the_limit_passes_through():
+    limit = OutputLimit(100, 10)
+    assert limit.take(b"a\nb\n") == b"a\nb\n"
+    assert (limit.bytes_left, limit.lines_left, limit.truncated) == (96, 8, False)
+
+
+def test_byte_cap_is_shared_across_chunks():
+    limit = OutputLimit(5, 10)
+    assert limit.take(b"abc") == b"abc"
+    assert limit.take(b"defg") == b"de"
+    assert limit.truncated
+    assert limit.take(b"h") == b""
+
+
+def test_line_cap_cuts_after_the_last_allowed_newline():
+    limit = OutputLimit(100, 2)
+    assert limit.take(b"1\n2\n3\n4") == b"1\n2\n"
+    assert limit.truncated
+
+
+def test_line_cap_allows_a_trailing_partial_line():
+    limit = OutputLimit(100, 2)
+    assert limit.take(b"1\n") == b"1\n"
+    assert limit.take(b"2\npartial") == b"2\npartial"
+    assert not limit.truncated
+    assert limit.take(b"\n") == b""
+    assert limit.truncated
+
+
+def test_byte_and_line_caps_together():
+    limit = OutputLimit(6, 2)
+    assert limit.take(b"ab\ncd\nef") == b"ab\ncd\n"
+    assert limit.truncated
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+from skill_tree import PrerequisiteGraph
+
+
+def lesson(lesson_id, track_id, order):
+    return SimpleNamespace(id=lesson_id, track_id=track_id, order_in_track=order, title=f"Lesson {lesson_id}")
+
+
+# Track 1: 1 -> 2 -> 3 by order; track 2: 10 -> 11, with 10 explicitly requiring 2
+LESSONS = [lesson(1, 1, 1), lesson(2, 1, 2), lesson(3, 1, 3), lesson(10, 2, 1), lesson(11, 2, 2)]
+
+
+def graph(edges=()):
+    return PrerequisiteGraph(LESSONS, edges)
+
+
+def test_implicit_track_order():
+    g = graph()
+    assert g.requires[2] == {1}
+    assert g.requires[3] == {2}
+    assert g.requires[10] == set()
+    assert g.roots == [1, 10]
+
+
+def test_closure_is_transitive():
+    g = graph([(10, 2)])
+    assert g.requires_transitively(11, 1)
+    assert g.requires_transitively(11, 2)
+    assert not g.requires_transitively(11, 3)
+    assert not g.requires_transitively(1, 11)
+    assert g.depth[g.index[11]] == 3
+
+
+def test_unlocking_and_frontier():
+    g = graph([(10, 2)])
+    assert g.frontier([], 0) == [1]
+    completed = g.completed_mask([1])
+    assert not g.is_unlocked(10, completed)
+    completed = g.completed_mask([1, 2])
+    assert g.is_unlocked(10, completed)
+    assert sorted(g.frontier([1, 2], completed)) == [3, 10]
+
+
+def test_tree_counts_missing_prerequisites():
+    g = graph([(10, 2)])
+    nodes = {node["lesson_id"]: node for node in g.tree(g.completed_mask([1]))["nodes"]}
+    assert nodes[2]["unlocked"]
+    assert nodes[11]["missing_prerequisites"] == 2
+    assert [node["lesson_id"] for node in g.tree(0, track_id=2)["nodes"]] == [10, 11]
+
+
+def test_would_cycle():
+    g = graph([(10, 2)])
+    assert g.would_cycle(1, [11])
+    assert g.would_cycle(3, [3])
+    assert not g.would_cycle(11, [3])
+
+
+def test_cycle_in_stored_edges_is_broken():
+    # 1 -> 2 by order plus an explicit 1 requires 2 makes a cycle
+    g = graph([(1, 2)])
+    assert sorted(g.order) == [1, 2, 3, 10, 11]
+    assert not (g.requires_transitively(1, 2) and g.requires_transitively(2, 1))
@@ -0,0 +1,49 @@
+import pytest
+from pydantic import ValidationError
+
+from schemas import ReviewResult
+from spaced_repetition import EASE_FACTOR_MAX, EASE_FACTOR_MIN, sm2_batch
+
+
+def step(repetition, interval, ease, quality, difficulty=0.0):
+    repetitions, intervals, eases = sm2_batch([repetition], [interval], [ease], [difficulty], [quality])
+    return repetitions[0], intervals[0], eases[0]
+
+
+def test_first_successes_use_fixed_intervals():
+    assert step(0, 0, 2.5, 5)[:2] == (1, 1)
+    assert step(1, 1, 2.5, 5)[:2] == (2, 6)
+
+
+def test_later_success_multiplies_by_ease():
+    repetition, interval, ease = step(2, 6, 2.0, 4)
+    assert repetition == 3
+    assert ease == pytest.approx(2.0)
+    assert interval == 12
+
+
+def test_difficulty_shortens_interval():
+    assert step(2, 10, 2.0, 4, difficulty=1.0)[1] == 14
+    assert step(0, 0, 2.5, 5, difficulty=1.0)[1] == 1
+
+
+def test_failure_resets_and_lowers_ease():
+    assert step(4, 30, 2.0, 2) == (0, 1, pytest.approx(1.8))
+
+
+def test_ease_stays_within_bounds():
+    assert step(3, 10, EASE_FACTOR_MIN, 0)[2] == EASE_FACTOR_MIN
+    assert step(3, 10, EASE_FACTOR_MIN, 3)[2] == EASE_FACTOR_MIN
+    assert step(3, 10, EASE_FACTOR_MAX, 5)[2] == EASE_FACTOR_MAX
+
+
+def test_batch_items_are_independent():
+    repetitions, intervals, _ = sm2_batch([0, 4], [0, 30], [2.5, 2.5], [0.0, 0.0], [5, 1])
+    assert repetitions == [1, 0]
+    assert intervals == [1, 1]
+
+
+@pytest.mark.parametrize("concept, quality", [("", 3), ("x" * 65, 3), ("loops", -1), ("loops", 6)])
+def test_review_result_rejects_out_of_range(concept, quality):
+    with pytest.raises(ValidationError):
+        ReviewResult(concept=concept, quality=quality)
@@ -57,11 +57,7 @@ sleep 10
 
 # Run database migrations
 echo "🗄️ Running database migrations..."
-docker-compose -f docker-compose.prod.yml run --rm backend python -c "
-from database import create_tables
-create_tables()
-print('Database tables created successfully')
-"
+docker-compose -f docker-compose.prod.yml run --rm backend alembic upgrade head
 
 # Start all services
 echo "🚀 Starting all services..."
@@ -76,7 +76,8 @@ const Lesson: React.FC<LessonProps> = ({ lesson, onComplete, isCompleted }) => {
       result = await executionService.executeWithDocker({
         code,
         requirements,
-        timeout: 30
+        timeout: 30,
+        lesson_id: lesson.id
       });
     } else if (useDocker && !dockerAvailable) {
       // Docker required but not available
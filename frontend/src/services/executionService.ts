@@ -2,21 +2,59 @@ import { authService } from './authService';
 
 const API_BASE_URL = 'https://pylingo-clean-production.up.railway.app';
 
+export interface ExecutionResources {
+  wall_time_ms: number;
+  cpu_time_ms: number;
+  peak_memory_bytes: number;
+  samples: number;
+  limits: {
+    mem_limit: string;
+    cpus: number;
+    pids_limit: number;
+  };
+}
+
 export interface ExecutionResult {
   success: boolean;
   output: string;
   error: string;
+  truncated?: boolean;
+  resources?: ExecutionResources;
+  // Web-app runs only
+  startup_ms?: number;
+  probes?: WebAppProbe[];
+}
+
+export interface WebAppRoute {
+  method?: 'GET' | 'POST' | 'PUT' | 'PATCH' | 'DELETE';
+  path: string;
+  body?: unknown;
+  headers?: Record<string, string>;
+}
+
+export interface WebAppProbe {
+  method: string;
+  path: string;
+  status: number | null;
+  latency_ms: number;
+  content_type?: string;
+  body?: string;
+  truncated?: boolean;
+  error?: string;
 }
 
 export interface DockerExecutionRequest {
   code: string;
   requirements?: string[];
   timeout?: number;
+  lesson_id?: number;
 }
 
 export interface WebAppExecutionRequest {
   code: string;
   app_type?: 'flask' | 'fastapi';
+  routes?: WebAppRoute[];
+  timeout?: number;
 }
 
 class ExecutionService {
@@ -38,6 +38,53 @@ export interface LessonResponse {
   created_at: string;
 }
 
+export interface LessonSearchHit {
+  id: number;
+  track_id: number;
+  order_in_track: number;
+  title: string;
+  concepts: string[];
+  snippet: string; // HTML-escaped description excerpt with matches wrapped in <mark>
+  score: number;
+}
+
+export interface LessonSearchResponse {
+  query: string;
+  total: number;
+  results: LessonSearchHit[];
+  facets: { concept: string; count: number }[];
+}
+
+export interface SkillTreeNode {
+  lesson_id: number;
+  track_id: number;
+  title: string;
+  depth: number;
+  prerequisites: number[];
+  completed: boolean;
+  unlocked: boolean;
+  missing_prerequisites: number;
+}
+
+export interface SkillTreeResponse {
+  nodes: SkillTreeNode[]; // Topological order
+  completed: number;
+  unlocked: number;
+}
+
+export interface RecommendedLesson {
+  lesson_id: number;
+  track_id: number;
+  title: string;
+  score: number;
+  reason: 'in_progress' | 'continue' | 'current_track' | 'goal' | 'new_concepts' | 'next_up';
+}
+
+export interface RecommendationsResponse {
+  items: RecommendedLesson[]; // Best first
+  computed_at: string | null;
+}
+
 class LessonService {
   async createLesson(lessonData: NewLessonData): Promise<LessonResponse> {
     const response = await authService.fetchWithAuth(`${API_BASE_URL}/api/lessons`, {
@@ -63,6 +110,58 @@ class LessonService {
     return response.json();
   }
 
+  async searchLessons(
+    query: string,
+    options: { concept?: string; trackId?: number; limit?: number; offset?: number } = {}
+  ): Promise<LessonSearchResponse> {
+    const params = new URLSearchParams({ q: query });
+    if (options.concept) params.set('concept', options.concept);
+    if (options.trackId !== undefined) params.set('track_id', String(options.trackId));
+    if (options.limit !== undefined) params.set('limit', String(options.limit));
+    if (options.offset !== undefined) params.set('offset', String(options.offset));
+
+    const response = await fetch(`${API_BASE_URL}/api/lessons/search?${params}`);
+
+    if (!response.ok) {
+      throw new Error('Failed to search lessons');
+    }
+
+    return response.json();
+  }
+
+  async getSkillTree(trackId?: number): Promise<SkillTreeResponse> {
+    const query = trackId !== undefined ? `?track_id=${trackId}` : '';
+    const response = await authService.fetchWithAuth(`${API_BASE_URL}/api/skill-tree${query}`);
+
+    if (!response.ok) {
+      throw new Error('Failed to fetch skill tree');
+    }
+
+    return response.json();
+  }
+
+  async getRecommendations(limit: number = 4): Promise<RecommendationsResponse> {
+    const response = await authService.fetchWithAuth(`${API_BASE_URL}/api/recommendations?limit=${limit}`);
+
+    if (!response.ok) {
+      throw new Error('Failed to fetch recommendations');
+    }
+
+    return response.json();
+  }
+
+  async setPrerequisites(lessonId: number, prerequisiteIds: number[]): Promise<void> {
+    const response = await authService.fetchWithAuth(`${API_BASE_URL}/api/lessons/${lessonId}/prerequisites`, {
+      method: 'PUT',
+      body: JSON.stringify({ prerequisite_ids: prerequisiteIds }),
+    });
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.detail || 'Failed to update prerequisites');
+    }
+  }
+
   async deleteLesson(lessonId: number): Promise<void> {
     const response = await authService.fetchWithAuth(`${API_BASE_URL}/api/lessons/${lessonId}`, {
       method: 'DELETE',